@@ -1,12 +1,82 @@
 import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import List
 import requests
 from datetime import datetime
-from config import WEB_API_ENDPOINT, WEB_API_KEY
+from config import (
+    WEB_API_ENDPOINT,
+    WEB_API_KEY,
+    WEB_API_VERIFY_SSL,
+    WEB_API_BATCH_ENDPOINT,
+    WEB_API_BATCH_MAX_SIZE,
+    WEB_API_BATCH_MAX_DELAY,
+)
 import urllib3
+import http_client
+from rate_limiter import get_limiter, parse_retry_after
+from metrics import track_stage
 
 # Potlačení SSL varování pro lokální vývoj
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+def build_headers() -> dict:
+    """
+    Vrátí hlavičky požadavků na webové API (včetně API klíče).
+    """
+    return {
+        "x-api-key": WEB_API_KEY,
+        "Content-Type": "application/json"
+    }
+
+def build_payload(content: str, broadcast_date: datetime, audio_url: str) -> dict:
+    """
+    Sestaví JSON payload jednoho hlášení ve formátu, který očekává webové API.
+    """
+    # Převedeme datetime na ISO 8601 formát, který očekává API
+    return {
+        "Content": content,
+        "broadcastDateTime": broadcast_date.isoformat() + "Z", # Přidání 'Z' pro UTC
+        "audioUrl": audio_url
+    }
+
+def _log_request_error(message: str, e: requests.exceptions.RequestException) -> None:
+    logging.error(f"{message}: {e}")
+    # V případě chyby je dobré zalogovat i tělo odpovědi, pokud existuje
+    if e.response is not None:
+        logging.error(f"Odpověď serveru: {e.response.status_code} - {e.response.text}")
+
+def _limited_post(url: str, payload, timeout: float) -> requests.Response:
+    """
+    Odešle POST na webové API přes sdílený limiter "web_api" (WEB_API_RPM).
+    Odpověď 429 limiter zpomalí podle Retry-After.
+    """
+    limiter = get_limiter("web_api")
+    limiter.acquire()
+    # Pro lokální vývoj s self-signed certifikáty lze SSL verifikaci vypnout (WEB_API_VERIFY_SSL)
+    response = http_client.post(url, json=payload, headers=build_headers(), timeout=timeout,
+                                verify=WEB_API_VERIFY_SSL)
+    if response.status_code == 429:
+        limiter.penalize(parse_retry_after(response.headers.get("Retry-After")))
+    elif response.ok:
+        limiter.record_success()
+    return response
+
+def _post_payload(payload: dict) -> bool:
+    logging.info(f"Odesílám přepis na {WEB_API_ENDPOINT}")
+    with track_stage("send") as observation:
+        try:
+            response = _limited_post(WEB_API_ENDPOINT, payload, timeout=15)
+            observation.bytes = len(response.request.body or b"")
+            response.raise_for_status()
+            logging.info("Přepis byl úspěšně odeslán na webové API.")
+            return True
+        except requests.exceptions.RequestException as e:
+            _log_request_error("Nepodařilo se odeslat přepis na webové API", e)
+            observation.ok = False
+            return False
+
 def send_announcement(content: str, broadcast_date: datetime, audio_url: str) -> bool:
     """
     Odešle přepis hlášení na webové API.
@@ -19,28 +89,139 @@ def send_announcement(content: str, broadcast_date: datetime, audio_url: str) ->
     Returns:
         bool: True, pokud byl požadavek úspěšný, jinak False.
     """
-    headers = {
-        "x-api-key": WEB_API_KEY,
-        "Content-Type": "application/json"
-    }
-    
-    # Převedeme datetime na ISO 8601 formát, který očekává API
-    payload = {
-        "Content": content,
-        "broadcastDateTime": broadcast_date.isoformat() + "Z", # Přidání 'Z' pro UTC
-        "audioUrl": audio_url
-    }
-    
-    logging.info(f"Odesílám přepis na {WEB_API_ENDPOINT}")
+    return _post_payload(build_payload(content, broadcast_date, audio_url))
+
+def _parse_batch_results(response: requests.Response, count: int) -> List[bool]:
+    """
+    Přečte výsledky jednotlivých položek z odpovědi na dávku.
+
+    Příjemce může vrátit pole stejné délky jako dávka s hodnotami true/false
+    nebo objekty s klíčem "success". Jinak úspěšná odpověď znamená, že byly
+    přijaty všechny položky.
+    """
+    try:
+        body = response.json()
+    except ValueError:
+        return [True] * count
+    if not isinstance(body, list) or len(body) != count:
+        return [True] * count
+    results = []
+    for entry in body:
+        if isinstance(entry, dict):
+            results.append(bool(entry.get("success", True)))
+        else:
+            results.append(bool(entry))
+    return results
+
+def send_announcements_batch(payloads: List[dict]) -> List[bool]:
+    """
+    Odešle více hlášení jedním požadavkem (JSON pole) na WEB_API_BATCH_ENDPOINT.
+
+    Pokud příjemce dávku odmítne, hlášení se odešlou jednotlivě.
+
+    Args:
+        payloads (List[dict]): Payloady sestavené funkcí build_payload().
+
+    Returns:
+        List[bool]: Výsledek pro každou položku ve stejném pořadí.
+    """
+    if not payloads:
+        return []
+    logging.info(f"Odesílám dávku {len(payloads)} přepisů na {WEB_API_BATCH_ENDPOINT}")
     try:
-        # Pro lokální vývoj s self-signed certifikáty vypneme SSL verifikaci
-        response = requests.post(WEB_API_ENDPOINT, json=payload, headers=headers, timeout=15, verify=False)
-        response.raise_for_status()
-        logging.info("Přepis byl úspěšně odeslán na webové API.")
-        return True
+        # Výjimka z bloku se v metrikách započítá jako neúspěch
+        with track_stage("send_batch") as observation:
+            response = _limited_post(WEB_API_BATCH_ENDPOINT, payloads, timeout=30)
+            observation.bytes = len(response.request.body or b"")
+            response.raise_for_status()
     except requests.exceptions.RequestException as e:
-        logging.error(f"Nepodařilo se odeslat přepis na webové API: {e}")
-        # V případě chyby je dobré zalogovat i tělo odpovědi, pokud existuje
-        if e.response is not None:
-            logging.error(f"Odpověď serveru: {e.response.status_code} - {e.response.text}")
-        return False 
\ No newline at end of file
+        _log_request_error("Dávka byla odmítnuta, odesílám hlášení jednotlivě", e)
+        return [_post_payload(payload) for payload in payloads]
+
+    results = _parse_batch_results(response, len(payloads))
+    logging.info(f"Dávka odeslána, přijato {sum(results)} z {len(payloads)} přepisů.")
+    return results
+
+
+class AnnouncementBatcher:
+    """
+    Sbírá hotové přepisy a odesílá je dávkově.
+
+    Dávka se odešle, jakmile má WEB_API_BATCH_MAX_SIZE položek, nebo když
+    nejstarší čekající položka čeká déle než WEB_API_BATCH_MAX_DELAY sekund.
+    Výsledek každé položky se vrací přes Future, takže volající označí jako
+    zpracovaná jen skutečně přijatá hlášení.
+
+    Použití:
+        with AnnouncementBatcher() as batcher:
+            future = batcher.submit(content, broadcast_date, audio_url)
+        accepted = future.result()
+    """
+
+    def __init__(self, max_size: int = WEB_API_BATCH_MAX_SIZE, max_delay: float = WEB_API_BATCH_MAX_DELAY):
+        self.max_size = max(1, max_size)
+        self.max_delay = max_delay
+        self._pending: List[tuple[dict, Future]] = []
+        self._oldest: float | None = None
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="api-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, content: str, broadcast_date: datetime, audio_url: str) -> Future:
+        """
+        Zařadí hlášení do dávky.
+
+        Returns:
+            Future: Future s výsledkem True/False pro toto hlášení.
+        """
+        future: Future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("AnnouncementBatcher je již uzavřený.")
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append((build_payload(content, broadcast_date, audio_url), future))
+            self._condition.notify()
+        return future
+
+    def _take_batch(self) -> List[tuple[dict, Future]] | None:
+        with self._condition:
+            while True:
+                if self._pending:
+                    waited = time.monotonic() - self._oldest
+                    if self._closed or len(self._pending) >= self.max_size or waited >= self.max_delay:
+                        batch, self._pending = self._pending[:self.max_size], self._pending[self.max_size:]
+                        self._oldest = time.monotonic() if self._pending else None
+                        return batch
+                    self._condition.wait(self.max_delay - waited)
+                elif self._closed:
+                    return None
+                else:
+                    self._condition.wait()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            try:
+                results = send_announcements_batch([payload for payload, _ in batch])
+            except Exception as e:
+                logging.error(f"Při odesílání dávky došlo k neočekávané chybě: {e}")
+                results = [False] * len(batch)
+            for (_, future), accepted in zip(batch, results):
+                future.set_result(accepted)
+
+    def close(self) -> None:
+        """Odešle zbývající položky a ukončí odesílací vlákno."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def __enter__(self) -> "AnnouncementBatcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,357 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Callable, List
+
+import aiohttp
+
+from scraper import page_request_headers, parse_announcements_page
+from audio_processor import (
+    OGG_DIR,
+    AnnouncementItem,
+    download_file,
+    lookup_cached_transcript,
+    lookup_similar_announcement,
+    stage_download,
+    stage_convert,
+    stage_transcribe,
+    submit_announcement,
+)
+from api_client import AnnouncementBatcher, build_payload, build_headers
+from date_resolver import broadcast_datetime, resolve_pages
+from state_manager import (
+    get_processed_timestamps,
+    save_processed_url,
+    is_processed,
+    record_item_stage,
+)
+from scheduler import AdaptiveScheduler, request_stop, stop_requested
+from rate_limiter import get_limiter, parse_retry_after
+from http_client import RETRY_STATUSES, POST_RETRY_STATUSES, timeout_for
+from main import finish_idle_run, finish_run
+from sources import Source, fair_order, get_sources, local_filename
+import metrics
+from config import (
+    LOGGING_LEVEL,
+    HTTP_RETRIES,
+    HTTP_BACKOFF_FACTOR,
+    HTTP_POOL_MAXSIZE,
+    WEB_API_ENDPOINT,
+    WEB_API_VERIFY_SSL,
+    WEB_API_BATCH_ENABLED,
+    AUDIO_IN_MEMORY,
+    ASYNC_DOWNLOAD_CONCURRENCY,
+    ASYNC_CONVERT_CONCURRENCY,
+    ASYNC_TRANSCRIBE_CONCURRENCY,
+    ASYNC_SEND_CONCURRENCY,
+    validate_config,
+)
+
+# Nastavení logování
+logging.basicConfig(level=LOGGING_LEVEL, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class AsyncRunner:
+    """
+    Asynchronní varianta main(): stránku a odeslání na webové API obsluhuje
+    přes aiohttp a všechna nová hlášení zpracovává souběžně.
+
+    Blokující části (stažení audia přes audio_processor.download_file, aby se
+    navazovalo a ověřovalo stejně jako v synchronním běhu, konverze přes
+    FFmpeg/pydub, volání Gemini SDK) běží ve vláknech executoru. Počet souběžných operací vůči každé službě omezuje
+    vlastní semafor (ASYNC_*_CONCURRENCY). Session, executor i načtené moduly
+    zůstávají mezi koly, takže runner může běžet dlouhodobě jako démon
+    s adaptivním intervalem kontrol (viz scheduler.AdaptiveScheduler).
+
+    Použití:
+        async with AsyncRunner() as runner:
+            await runner.run_once()
+    """
+
+    def __init__(self):
+        self._session: aiohttp.ClientSession | None = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=ASYNC_DOWNLOAD_CONCURRENCY + ASYNC_CONVERT_CONCURRENCY + ASYNC_TRANSCRIBE_CONCURRENCY + 2,
+            thread_name_prefix="async-runner",
+        )
+        self._limits = {
+            "download": asyncio.Semaphore(max(1, ASYNC_DOWNLOAD_CONCURRENCY)),
+            "convert": asyncio.Semaphore(max(1, ASYNC_CONVERT_CONCURRENCY)),
+            "transcribe": asyncio.Semaphore(max(1, ASYNC_TRANSCRIBE_CONCURRENCY)),
+            "send": asyncio.Semaphore(max(1, ASYNC_SEND_CONCURRENCY)),
+        }
+
+    async def __aenter__(self) -> "AsyncRunner":
+        connector = aiohttp.TCPConnector(limit_per_host=HTTP_POOL_MAXSIZE)
+        self._session = aiohttp.ClientSession(connector=connector)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._session.close()
+        self._executor.shutdown(wait=True)
+
+    @asynccontextmanager
+    async def _slot(self, service: str):
+        """Obsadí místo v semaforu služby; počet čekajících se vykazuje jako metrika fronty."""
+        metrics.QUEUE_DEPTH.inc(queue=service)
+        try:
+            await self._limits[service].acquire()
+        finally:
+            metrics.QUEUE_DEPTH.dec(queue=service)
+        try:
+            yield
+        finally:
+            self._limits[service].release()
+
+    async def _in_thread(self, func: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def _request(self, method: str, url: str, timeout: float, **kwargs) -> tuple[int, dict, bytes]:
+        """
+        Provede HTTP požadavek s opakováním podle stejných pravidel jako http_client.
+
+        Returns:
+            tuple[int, dict, bytes]: Stavový kód, hlavičky a tělo poslední odpovědi.
+        """
+        retry_statuses = POST_RETRY_STATUSES if method == "POST" else RETRY_STATUSES
+        client_timeout = aiohttp.ClientTimeout(total=timeout_for(url, timeout))
+        attempt = 0
+        while True:
+            last_attempt = attempt >= HTTP_RETRIES
+            try:
+                async with self._session.request(method, url, timeout=client_timeout, **kwargs) as response:
+                    body = await response.read()
+                    if response.status not in retry_statuses or last_attempt:
+                        return response.status, dict(response.headers), body
+                    logging.warning(f"HTTP {method} {url} vrátil {response.status}, opakuji.")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # POST opakujeme jen při chybě spojení, kdy server požadavek nepřevzal
+                if last_attempt or (method == "POST" and not isinstance(e, aiohttp.ClientConnectionError)):
+                    raise
+                logging.warning(f"HTTP {method} {url} selhal ({e}), opakuji.")
+            # Exponenciální čekání s náhodným rozptylem jako v http_client.JitteredRetry
+            await asyncio.sleep(random.uniform(0, HTTP_BACKOFF_FACTOR * (2 ** attempt)))
+            attempt += 1
+
+    async def fetch_announcements(self, source: Source) -> List[str]:
+        """Asynchronní obdoba scraper.fetch_announcements()."""
+        logging.info(f"Stahuji hlášení z: {source.page_url}")
+        with metrics.track_stage("fetch") as observation:
+            try:
+                status, headers, content = await self._request("GET", source.page_url, timeout=10,
+                                                               headers=page_request_headers(source))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logging.error(f"Nepodařilo se stáhnout stránku {source.name}: {e}")
+                observation.ok = False
+                return []
+            observation.bytes = len(content)
+            if status >= 400:
+                logging.error(f"Nepodařilo se stáhnout stránku {source.name}: HTTP {status}")
+                observation.ok = False
+                return []
+            return await self._in_thread(parse_announcements_page, status, content, headers, is_processed,
+                                         source)
+
+    async def _download(self, item: AnnouncementItem) -> bool:
+        """Fáze 1 (viz audio_processor.stage_download) s omezením souběžných stažení."""
+        if item.posted or item.transcript:
+            return True
+        if AUDIO_IN_MEMORY and not item.ogg_path:
+            # Stahování do paměti teče rovnou do FFmpeg
+            async with self._slot("download"):
+                if stop_requested():
+                    return False
+                return await self._in_thread(stage_download, item)
+        if not item.ogg_path:
+            async with self._slot("download"):
+                if stop_requested():
+                    # Po požadavku na ukončení už nová hlášení nezačínáme
+                    return False
+                # Stejné stahování jako v synchronním běhu: .part soubor, navázání
+                # přes Range a ověření délky a hashe před přejmenováním
+                downloaded = await self._in_thread(download_file, item.url, item.filename)
+            if downloaded is None:
+                return False
+            item.ogg_path, item.audio_hash = downloaded
+            record_item_stage(item.url, "downloaded", ogg_path=item.ogg_path, audio_hash=item.audio_hash)
+
+        item.cache_key, item.transcript = lookup_cached_transcript(item.audio_hash)
+        if item.transcript:
+            logging.info(f"Přepis {item.filename} nalezen v cache, přeskakuji konverzi i přepis.")
+            record_item_stage(item.url, "transcribed", transcript=item.transcript, transcript_key=item.cache_key)
+        else:
+            await self._in_thread(lookup_similar_announcement, item)
+        return True
+
+    async def _send(self, item: AnnouncementItem, batcher: AnnouncementBatcher | None) -> bool:
+        """Fáze 4 (viz audio_processor.stage_send) s odesláním přes aiohttp."""
+        if item.posted:
+            return True
+        if batcher is not None:
+            return await asyncio.wrap_future(submit_announcement(item, batcher)) and item.posted
+        broadcast_date = broadcast_datetime(item.url)
+        if not broadcast_date:
+            return False
+        logging.info(f"Odesílám přepis na {WEB_API_ENDPOINT}")
+        limiter = get_limiter("web_api")
+        payload = json.dumps(build_payload(item.transcript, broadcast_date, item.url)).encode("utf-8")
+        async with self._slot("send"):
+            with metrics.track_stage("send") as observation:
+                observation.bytes = len(payload)
+                try:
+                    await self._in_thread(limiter.acquire, 1, item.priority)
+                    status, headers, body = await self._request(
+                        "POST", WEB_API_ENDPOINT, timeout=15, headers=build_headers(), data=payload,
+                        # Pro lokální vývoj s self-signed certifikáty lze SSL verifikaci vypnout (WEB_API_VERIFY_SSL)
+                        ssl=None if WEB_API_VERIFY_SSL else False,
+                    )
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logging.error(f"Nepodařilo se odeslat přepis na webové API: {e}")
+                    observation.ok = False
+                    return False
+                if status == 429:
+                    limiter.penalize(parse_retry_after(headers.get("Retry-After")))
+                if status >= 400:
+                    logging.error(f"Odpověď serveru: {status} - {body.decode('utf-8', errors='replace')}")
+                    observation.ok = False
+                    return False
+        limiter.record_success()
+        logging.info("Přepis byl úspěšně odeslán na webové API.")
+        item.posted = True
+        record_item_stage(item.url, "posted")
+        return True
+
+    async def process(self, item: AnnouncementItem, batcher: AnnouncementBatcher | None = None) -> bool:
+        """
+        Provede všechny fáze jednoho hlášení. Soubory se po neúspěchu ponechávají
+        pro navázání v dalším kole.
+        """
+        try:
+            if not await self._download(item):
+                return False
+            async with self._slot("convert"):
+                if not await self._in_thread(stage_convert, item):
+                    return False
+            async with self._slot("transcribe"):
+                if not await self._in_thread(stage_transcribe, item):
+                    return False
+            if not await self._send(item, batcher):
+                return False
+        except Exception as e:
+            logging.error(f"Při zpracování souboru {item.filename} došlo k neočekávané chybě: {e}")
+            return False
+        item.cleanup()
+        return True
+
+    async def run_once(self) -> int:
+        """
+        Jedno kolo zpracování: stránka → nová hlášení souběžně → uložení stavu.
+
+        Returns:
+            int: Počet nalezených nových hlášení.
+        """
+        os.makedirs(OGG_DIR, exist_ok=True)
+        os.makedirs(os.path.join("audio_files", "mp3"), exist_ok=True)
+
+        # Stránky všech zdrojů stahujeme souběžně (počet spojení omezuje connector session)
+        sources = get_sources()
+        pages = dict(zip(sources, await asyncio.gather(*(self.fetch_announcements(source) for source in sources))))
+        if not any(pages.values()):
+            finish_idle_run(pages)
+            return 0
+        # Data vysílání určíme pro celé stránky najednou (viz main.main)
+        dates = resolve_pages(pages)
+        new_by_source = {
+            source: [url for url in urls
+                     if not is_processed(url) and dates[url] is not None]
+            for source, urls in pages.items()
+        }
+        new_urls = fair_order(new_by_source)
+        if not new_urls:
+            logging.info("Nebyly nalezeny žádné nové hlášení k zpracování.")
+            finish_run(new_by_source)
+            return 0
+
+        logging.info(f"Nalezeno {len(new_urls)} nových hlášení k zpracování.")
+        validate_config()
+        batcher = AnnouncementBatcher() if WEB_API_BATCH_ENABLED else None
+        items = [AnnouncementItem.resume(url, local_filename(url), priority=index)
+                 for index, url in enumerate(new_urls)]
+        # Při nahromadění hlášení začínáme od nejnovějšího (i limiter upřednostní vyšší prioritu)
+        tasks = {item.url: asyncio.create_task(self.process(item, batcher)) for item in reversed(items)}
+
+        # Výsledky ukládáme v pořadí vysílání, i když doběhnou v jiném pořadí
+        for item in items:
+            if await tasks[item.url]:
+                save_processed_url(item.url)
+                logging.info(f"✅ Úspěšně zpracováno a uloženo: {item.url}")
+            else:
+                item.release_audio()
+                logging.error(f"❌ Nepodařilo se zpracovat: {item.url}")
+        if batcher is not None:
+            await self._in_thread(batcher.close)
+
+        finish_run(new_by_source)
+        return len(new_urls)
+
+    async def run_forever(self) -> None:
+        """
+        Opakuje run_once() s adaptivním intervalem kontrol.
+
+        Po SIGTERM/SIGINT se dokončí rozpracovaná hlášení a smyčka skončí.
+        """
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+
+        def on_signal():
+            request_stop()
+            wakeup.set()
+
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, on_signal)
+
+        metrics_server = metrics.start_http_server()
+        scheduler = AdaptiveScheduler()
+        scheduler.learn(get_processed_timestamps())
+        while not stop_requested():
+            found = 0
+            try:
+                found = await self.run_once()
+            except Exception as e:
+                logging.error(f"Během kola zpracování nastala kritická chyba: {e}")
+            metrics.export_run_metrics()
+            if found:
+                scheduler.learn(get_processed_timestamps())
+            delay = scheduler.next_delay(found_new=bool(found))
+            logging.info(f"Další kontrola za {delay:.0f} s.")
+            try:
+                await asyncio.wait_for(wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        logging.info("Asynchronní běh ukončen.")
+
+
+async def _run(once: bool) -> None:
+    async with AsyncRunner() as runner:
+        if once:
+            try:
+                await runner.run_once()
+            finally:
+                metrics.export_run_metrics()
+        else:
+            await runner.run_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Asynchronní zpracování hlášení rozhlasu.")
+    parser.add_argument("--once", action="store_true", help="provede jedno kolo a skončí (jako main.py)")
+    args = parser.parse_args()
+    asyncio.run(_run(args.once))
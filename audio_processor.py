@@ -2,41 +2,284 @@
 # Pydub ho používá pro konverzi audio formátů.
 # Odkaz na stažení: https://ffmpeg.org/download.html
 
+import base64
+import glob
+import hashlib
+import io
 import logging
 import os
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import BinaryIO
 import requests
-from pydub import AudioSegment
-from transcriber import transcribe_audio, get_broadcast_datetime
-from api_client import send_announcement
+import urllib3
+import http_client
+from transcriber import transcribe_audio_with_model, transcription_model_ids, TRANSCRIPTION_PROMPT
+from transcript_cache import get_transcript_cache, cache_key, file_sha256
+from api_client import send_announcement, AnnouncementBatcher
+from state_manager import get_item_progress, record_item_stage
+from metrics import track_stage, AUDIO_REDUCTION_RATIO
+from date_resolver import broadcast_datetime
+from fingerprint import compute_fingerprint, get_fingerprint_index
+from config import (
+    TRANSCODE_MODE,
+    FFMPEG_BINARY,
+    TRANSCRIBE_CHUNKING,
+    AUDIO_IN_MEMORY,
+    AUDIO_SPOOL_MAX_MB,
+    FINGERPRINT_ACTION,
+    SPEECH_SAMPLE_RATE,
+    SPEECH_BITRATE,
+    SPEECH_KEEP_SILENCE_MS,
+    SILENCE_MIN_MS,
+    SILENCE_THRESH_DBFS,
+    DOWNLOAD_CHUNK_MIN_KB,
+    DOWNLOAD_CHUNK_MAX_KB,
+    DOWNLOAD_RESUME_ATTEMPTS,
+    HTTP_BACKOFF_FACTOR,
+)
 
 OGG_DIR = os.path.join("audio_files", "ogg")
 MP3_DIR = os.path.join("audio_files", "mp3")
 
-def download_file(url: str, filename: str) -> str | None:
+# Rozpracované stažení: data v <soubor>.part, validátor odpovědi (ETag nebo
+# Last-Modified) pro If-Range v <soubor>.part.validator
+PARTIAL_SUFFIX = ".part"
+_VALIDATOR_SUFFIX = ".validator"
+# Blok přečtený rychleji se zdvojnásobí, pomalejší se zmenší na polovinu
+_CHUNK_FAST_SECONDS = 0.25
+_CHUNK_SLOW_SECONDS = 1.0
+
+
+@dataclass
+class UploadAudio:
+    """
+    Audio připravené k nahrání do Gemini.
+
+    Attributes:
+        source (str | BinaryIO): Cesta k souboru nebo souborový objekt v paměti.
+        mime_type (str): MIME typ nahrávaných dat.
+        temp_path (str | None): Soubor vytvořený při přípravě, který je po zpracování potřeba smazat.
+    """
+    source: str | BinaryIO
+    mime_type: str
+    temp_path: str | None = None
+
+def ogg_duration(path: str) -> float | None:
+    """
+    Zjistí délku OGG (Opus/Vorbis) audia z granule position poslední stránky.
+
+    Čte jen začátek a konec souboru, audio nedekóduje.
+
+    Args:
+        path (str): Cesta k OGG souboru.
+
+    Returns:
+        float | None: Délka v sekundách, nebo None, pokud ji nelze zjistit.
+    """
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(4096)
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, size - 65536))
+            tail = f.read()
+    except OSError:
+        return None
+    last_page = tail.rfind(b"OggS")
+    if last_page < 0 or len(tail) < last_page + 14:
+        return None
+    granule = int.from_bytes(tail[last_page + 6:last_page + 14], 'little', signed=True)
+    opus = head.find(b"OpusHead")
+    if opus >= 0:
+        # Opus počítá granule vždy v 48 kHz, na začátku je navíc pre-skip
+        pre_skip = int.from_bytes(head[opus + 10:opus + 12], 'little')
+        return max(0.0, (granule - pre_skip) / 48000)
+    vorbis = head.find(b"\x01vorbis")
+    if vorbis >= 0:
+        rate = int.from_bytes(head[vorbis + 12:vorbis + 16], 'little')
+        if rate:
+            return max(0.0, granule / rate)
+    return None
+
+def _content_total(response: requests.Response) -> int | None:
+    """Celková velikost souboru z Content-Range (odpověď 206/416) nebo Content-Length (200)."""
+    if response.status_code in (206, 416):
+        total = response.headers.get("Content-Range", "").rpartition("/")[2]
+    else:
+        total = response.headers.get("Content-Length", "")
+    return int(total) if total.isdigit() else None
+
+def _expected_sha256(response: requests.Response) -> str | None:
+    """SHA-256 celého souboru z hlavičky Repr-Digest nebo Digest, pokud ho server posílá."""
+    for header in ("Repr-Digest", "Digest"):
+        for entry in response.headers.get(header, "").split(","):
+            algorithm, _, value = entry.strip().partition("=")
+            if algorithm.lower() == "sha-256" and value:
+                try:
+                    return base64.b64decode(value.strip(":"), validate=True).hex()
+                except ValueError:
+                    return None
+    return None
+
+def _next_chunk_size(chunk_size: int, elapsed: float) -> int:
+    """Přizpůsobí velikost bloku době, za kterou přišel poslední blok."""
+    if elapsed < _CHUNK_FAST_SECONDS:
+        return min(chunk_size * 2, DOWNLOAD_CHUNK_MAX_KB * 1024)
+    if elapsed > _CHUNK_SLOW_SECONDS:
+        return max(chunk_size // 2, DOWNLOAD_CHUNK_MIN_KB * 1024)
+    return chunk_size
+
+def _download_part(url: str, part_path: str) -> str | None:
+    """
+    Jeden pokus o stažení: naváže na existující .part soubor, nebo začne od začátku.
+
+    Returns:
+        str | None: SHA-256 kompletního ověřeného souboru, nebo None, pokud
+            stažený soubor neodpovídá Content-Length či hashi ze serveru
+            (neplatná část se smaže, další pokus začne znovu).
+
+    Raises:
+        requests.exceptions.RequestException, urllib3.exceptions.HTTPError: Chyba spojení.
+    """
+    validator_path = part_path + _VALIDATOR_SUFFIX
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    # Rozsahy bajtů platí pro nekomprimovaná data, kompresi proto odmítáme
+    headers = {"Accept-Encoding": "identity"}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        if os.path.exists(validator_path):
+            with open(validator_path, "r", encoding="utf-8") as f:
+                # Pokud se soubor na serveru mezitím změnil, server vrátí celý nový soubor
+                headers["If-Range"] = f.read().strip()
+
+    with http_client.get(url, stream=True, timeout=30, headers=headers) as r:
+        if r.status_code == 416 and offset:
+            # Soubor byl stažen celý už dříve, chybělo jen jeho ověření
+            if _content_total(r) != offset:
+                remove_temp_files(part_path, validator_path)
+                return None
+            return file_sha256(part_path)
+        r.raise_for_status()
+
+        total = _content_total(r)
+        if r.status_code == 206:
+            start = r.headers.get("Content-Range", "").removeprefix("bytes ").partition("-")[0]
+            if start != str(offset):
+                logging.warning(f"Server vrátil pro {url} jiný rozsah ({r.headers.get('Content-Range')}), "
+                                f"stahuji znovu od začátku.")
+                remove_temp_files(part_path, validator_path)
+                return None
+            logging.info(f"Navazuji na přerušené stahování {url} od {offset} B.")
+        else:
+            # Server Range nepodporuje nebo se soubor změnil: začínáme od nuly
+            offset = 0
+        etag = r.headers.get("ETag", "")
+        validator = etag if etag and not etag.startswith("W/") else r.headers.get("Last-Modified")
+        if validator:
+            with open(validator_path, "w", encoding="utf-8") as f:
+                f.write(validator)
+        else:
+            remove_temp_files(validator_path)
+
+        digest = hashlib.sha256()
+        if offset:
+            with open(part_path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(block)
+        chunk_size = DOWNLOAD_CHUNK_MIN_KB * 1024
+        with open(part_path, "ab" if offset else "wb") as f:
+            while True:
+                started = time.monotonic()
+                chunk = r.raw.read(chunk_size, decode_content=False)
+                if not chunk:
+                    break
+                f.write(chunk)
+                digest.update(chunk)
+                chunk_size = _next_chunk_size(chunk_size, time.monotonic() - started)
+            size = f.tell()
+        expected = _expected_sha256(r)
+
+    if total is not None and size != total:
+        logging.warning(f"Stažený soubor {url} má {size} B místo {total} B.")
+        if size > total:
+            remove_temp_files(part_path, validator_path)
+        return None
+    if expected and digest.hexdigest() != expected:
+        logging.error(f"Hash staženého souboru {url} neodpovídá hlavičce Digest, stahuji znovu.")
+        remove_temp_files(part_path, validator_path)
+        return None
+    return digest.hexdigest()
+
+def download_file(url: str, filename: str) -> tuple[str, str] | None:
     """
     Stáhne soubor z dané URL a uloží ho do adresáře pro OGG soubory.
 
+    Data se zapisují do souboru s příponou .part. Po přerušení spojení se
+    stahování až DOWNLOAD_RESUME_ATTEMPTS krát naváže požadavkem Range; část
+    zůstává na disku i po neúspěchu, takže další běh pokračuje tam, kde skončil.
+    Hotový soubor se ověří podle Content-Length (a hashe, pokud ho server
+    posílá) a teprve potom se přejmenuje na výsledný název.
+
     Args:
         url (str): URL adresa souboru ke stažení.
         filename (str): Název souboru, pod kterým bude uložen.
 
     Returns:
-        str | None: Cesta k uloženému souboru, nebo None v případě chyby.
+        tuple[str, str] | None: Cesta k uloženému souboru a jeho SHA-256, nebo None v případě chyby.
     """
     ogg_path = os.path.join(OGG_DIR, filename)
+    part_path = ogg_path + PARTIAL_SUFFIX
     logging.info(f"Stahuji soubor z {url} do {ogg_path}")
-    try:
-        with requests.get(url, stream=True, timeout=30) as r:
-            r.raise_for_status()
-            with open(ogg_path, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
-        logging.info(f"Soubor '{filename}' byl úspěšně stažen.")
-        return ogg_path
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Chyba při stahování souboru {url}: {e}")
+    with track_stage("download") as observation:
+        for attempt in range(DOWNLOAD_RESUME_ATTEMPTS + 1):
+            if attempt:
+                # Exponenciální čekání s náhodným rozptylem jako v http_client.JitteredRetry
+                time.sleep(random.uniform(0, HTTP_BACKOFF_FACTOR * (2 ** attempt)))
+            try:
+                audio_hash = _download_part(url, part_path)
+            except requests.exceptions.HTTPError as e:
+                # Chybový stav opakoval už http_client, další pokusy nemají smysl
+                logging.error(f"Chyba při stahování souboru {url}: {e}")
+                observation.ok = False
+                return None
+            except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError) as e:
+                logging.warning(f"Stahování souboru {url} bylo přerušeno: {e}")
+                continue
+            if audio_hash is None:
+                continue
+            os.replace(part_path, ogg_path)
+            remove_temp_files(part_path + _VALIDATOR_SUFFIX)
+            logging.info(f"Soubor '{filename}' byl úspěšně stažen.")
+            observation.bytes = os.path.getsize(ogg_path)
+            observation.audio_seconds = ogg_duration(ogg_path)
+            return ogg_path, audio_hash
+        kept = " (stažená část zůstává pro další běh)" if os.path.exists(part_path) else ""
+        logging.error(f"Soubor {url} se nepodařilo stáhnout{kept}.")
+        observation.ok = False
         return None
 
+def remove_stale_downloads(days: float) -> None:
+    """
+    Smaže rozpracovaná stažení (.part), na která se déle než `days` dní nenavázalo.
+
+    Args:
+        days (float): Stáří posledního zápisu ve dnech.
+    """
+    cutoff = time.time() - days * 24 * 3600
+    for part_path in glob.glob(os.path.join(glob.escape(OGG_DIR), "*" + PARTIAL_SUFFIX)):
+        try:
+            stale = os.path.getmtime(part_path) < cutoff
+        except OSError:
+            continue
+        if stale:
+            remove_temp_files(part_path, part_path + _VALIDATOR_SUFFIX)
+
 def convert_ogg_to_mp3(ogg_path: str) -> str | None:
     """
     Konvertuje audio soubor z formátu OGG do MP3.
@@ -57,6 +300,8 @@ def convert_ogg_to_mp3(ogg_path: str) -> str | None:
 
     logging.info(f"Konvertuji {ogg_path} na {mp3_path}")
     try:
+        # pydub načítáme až při konverzi, režimy "direct" a "stream" ho nepotřebují
+        from pydub import AudioSegment
         audio = AudioSegment.from_ogg(ogg_path)
         audio.export(mp3_path, format="mp3")
         logging.info("Konverze na MP3 byla úspěšná.")
@@ -66,48 +311,531 @@ def convert_ogg_to_mp3(ogg_path: str) -> str | None:
         logging.error("Ujistěte se, že máte nainstalovaný a v systémové cestě (PATH) dostupný FFmpeg.")
         return None 
 
-def download_and_process_audio(url: str, filename: str) -> bool:
+def _ffmpeg_output_args() -> tuple[list, str]:
     """
-    Orchestruje celý proces: stažení, konverze, přepis a odeslání.
+    Vrátí výstupní parametry FFmpeg podle TRANSCODE_MODE a MIME typ výsledku.
+
+    V režimu "speech" filtr silenceremove ořízne ticho na začátku, všechny pauzy
+    delší než SILENCE_MIN_MS (včetně ticha na konci) zkrátí na SPEECH_KEEP_SILENCE_MS
+    a výsledek se uloží jako mono Opus s profilem pro řeč. Ostatní režimy dávají MP3.
+    """
+    if TRANSCODE_MODE != "speech":
+        return ["-vn", "-f", "mp3"], "audio/mpeg"
+    threshold = f"{SILENCE_THRESH_DBFS}dB"
+    silence_filter = (
+        f"silenceremove=start_periods=1:start_duration=0:start_threshold={threshold}"
+        f":stop_periods=-1:stop_duration={SILENCE_MIN_MS / 1000}:stop_threshold={threshold}"
+        f":stop_silence={SPEECH_KEEP_SILENCE_MS / 1000}"
+    )
+    return ["-vn", "-af", silence_filter, "-ac", "1", "-ar", str(SPEECH_SAMPLE_RATE),
+            "-c:a", "libopus", "-b:a", SPEECH_BITRATE, "-application", "voip", "-f", "ogg"], "audio/ogg"
+
+def report_reduction(filename: str, bytes_before: int, bytes_after: int,
+                     seconds_before: float | None = None, seconds_after: float | None = None) -> None:
+    """
+    Zaznamená, o kolik předzpracování zmenšilo audio (do logu a metriky announcer_audio_reduction_ratio).
+    """
+    message = f"Audio {filename}: {bytes_before} B → {bytes_after} B"
+    if bytes_before:
+        AUDIO_REDUCTION_RATIO.observe(bytes_after / bytes_before, measure="bytes")
+        message += f" ({bytes_after / bytes_before:.0%})"
+    if seconds_before and seconds_after is not None:
+        AUDIO_REDUCTION_RATIO.observe(seconds_after / seconds_before, measure="seconds")
+        message += f", {seconds_before:.1f} s → {seconds_after:.1f} s ({seconds_after / seconds_before:.0%})"
+    logging.info(message)
+
+def transcode_speech(ogg_path: str) -> str | None:
+    """
+    Připraví OGG k přepisu: ořízne a zkrátí ticho, převede na mono a do Opus pro řeč.
 
     Args:
-        url (str): URL originálního .ogg souboru.
-        filename (str): Název souboru.
+        ogg_path (str): Cesta k OGG souboru.
 
     Returns:
-        bool: True, pokud vše proběhlo úspěšně, jinak False.
+        str | None: Cesta k výslednému souboru v MP3_DIR, nebo None v případě chyby.
     """
-    ogg_path = None
-    mp3_path = None
-    success = False
+    speech_path = os.path.join(MP3_DIR, os.path.splitext(os.path.basename(ogg_path))[0] + ".speech.ogg")
+    output_args, _ = _ffmpeg_output_args()
+    command = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y", "-i", ogg_path,
+               *output_args, speech_path]
+    logging.info(f"Připravuji {ogg_path} k přepisu (ořez ticha, mono {SPEECH_SAMPLE_RATE} Hz Opus)")
     try:
-        ogg_path = download_file(url, filename)
-        if not ogg_path:
-            return False
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        stderr = getattr(e, 'stderr', None)
+        details = stderr.decode('utf-8', errors='replace').strip() if stderr else e
+        logging.error(f"Chyba při přípravě souboru {ogg_path} k přepisu: {details}")
+        remove_temp_files(speech_path)
+        return None
+    report_reduction(os.path.basename(ogg_path), os.path.getsize(ogg_path), os.path.getsize(speech_path),
+                     ogg_duration(ogg_path), ogg_duration(speech_path))
+    return speech_path
+
+def transcode_stream(ogg_path: str) -> io.BytesIO | None:
+    """
+    Konvertuje OGG na MP3 rourou přes FFmpeg (stdin → stdout).
+
+    Na rozdíl od convert_ogg_to_mp3 nevytváří v paměti celý dekódovaný
+    AudioSegment ani mezisoubor na disku - v paměti je jen výsledné MP3.
+
+    Args:
+        ogg_path (str): Cesta k OGG souboru.
+
+    Returns:
+        io.BytesIO | None: MP3 data, nebo None v případě chyby.
+    """
+    command = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error",
+               "-i", "pipe:0", "-vn", "-f", "mp3", "pipe:1"]
+    logging.info(f"Konvertuji {ogg_path} na MP3 rourou přes FFmpeg")
+    try:
+        with open(ogg_path, 'rb') as src:
+            result = subprocess.run(command, stdin=src, stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE, check=True)
+        logging.info(f"Konverze rourou byla úspěšná ({len(result.stdout)} B).")
+        return io.BytesIO(result.stdout)
+    except (OSError, subprocess.CalledProcessError) as e:
+        stderr = getattr(e, 'stderr', None)
+        details = stderr.decode('utf-8', errors='replace').strip() if stderr else e
+        logging.error(f"Chyba při konverzi souboru {ogg_path} rourou přes FFmpeg: {details}")
+        return None
+
+def download_to_memory(url: str, filename: str) -> tuple[UploadAudio, str] | None:
+    """
+    Stáhne audio bez zápisu do audio_files/ a rovnou ho připraví k nahrání.
+
+    Stahovaná data tečou přímo do stdin FFmpeg (konverze na MP3 za běhu
+    stahování), v režimu TRANSCODE_MODE=direct se ukládají beze změny.
+    Výsledek se drží v SpooledTemporaryFile, který se do dočasného souboru
+    přelije až nad AUDIO_SPOOL_MAX_MB. Hash se počítá z OGG během stahování.
+
+    Args:
+        url (str): URL adresa souboru ke stažení.
+        filename (str): Název souboru (pro logování).
+
+    Returns:
+        tuple[UploadAudio, str] | None: Audio k nahrání a SHA-256 hash OGG, nebo None v případě chyby.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=int(AUDIO_SPOOL_MAX_MB * 1024 * 1024))
+    digest = hashlib.sha256()
+    direct = TRANSCODE_MODE == "direct"
+    output_args, mime_type = _ffmpeg_output_args()
+    process = None
+    logging.info(f"Stahuji soubor z {url} do paměti" + ("" if direct else f" s konverzí na {mime_type} přes FFmpeg"))
+    with track_stage("download") as observation:
+        try:
+            with http_client.get(url, stream=True, timeout=30) as r:
+                r.raise_for_status()
+                if direct:
+                    target = spool
+                else:
+                    command = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error",
+                               "-i", "pipe:0", *output_args, "pipe:1"]
+                    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                               stderr=subprocess.PIPE)
+                    target = process.stdin
+                    # Výstup čteme souběžně se zápisem, jinak by se FFmpeg zablokoval na plné rouře
+                    reader = threading.Thread(target=shutil.copyfileobj, args=(process.stdout, spool), daemon=True)
+                    reader.start()
+                size = 0
+                for chunk in r.iter_content(chunk_size=65536):
+                    digest.update(chunk)
+                    target.write(chunk)
+                    size += len(chunk)
+            if process is not None:
+                process.stdin.close()
+                stderr = process.stderr.read()
+                reader.join()
+                if process.wait() != 0:
+                    raise subprocess.CalledProcessError(process.returncode, process.args, stderr=stderr)
+        except (requests.exceptions.RequestException, OSError, subprocess.CalledProcessError) as e:
+            if process is not None:
+                process.kill()
+                process.wait()
+            stderr = getattr(e, 'stderr', None)
+            details = stderr.decode('utf-8', errors='replace').strip() if stderr else e
+            logging.error(f"Chyba při stahování souboru {url} do paměti: {details}")
+            spool.close()
+            observation.ok = False
+            return None
+
+        observation.bytes = size
+        logging.info(f"Soubor '{filename}' byl stažen do paměti ({size} B).")
+        if TRANSCODE_MODE == "speech":
+            # Délka originálu se při stahování do paměti nezjišťuje, hlásíme jen objem
+            report_reduction(filename, size, spool.tell())
+        spool.seek(0)
+        return UploadAudio(source=spool, mime_type="audio/ogg" if direct else mime_type), digest.hexdigest()
+
+def prepare_audio(ogg_path: str) -> UploadAudio | None:
+    """
+    Připraví stažené OGG k nahrání podle nastaveného TRANSCODE_MODE.
+
+    Args:
+        ogg_path (str): Cesta ke staženému OGG souboru.
+
+    Returns:
+        UploadAudio | None: Audio k nahrání, nebo None v případě chyby.
+    """
+    if TRANSCODE_MODE == "direct":
+        # Gemini přijímá OGG/Opus přímo, konverzi úplně přeskočíme
+        return UploadAudio(source=ogg_path, mime_type="audio/ogg")
+
+    with track_stage("convert") as observation:
+        observation.audio_seconds = ogg_duration(ogg_path)
+        if TRANSCODE_MODE == "speech":
+            speech_path = transcode_speech(ogg_path)
+            if not speech_path:
+                observation.ok = False
+                return None
+            observation.bytes = os.path.getsize(speech_path)
+            return UploadAudio(source=speech_path, mime_type="audio/ogg", temp_path=speech_path)
+        if TRANSCODE_MODE == "stream":
+            mp3_data = transcode_stream(ogg_path)
+            if mp3_data is None:
+                observation.ok = False
+                return None
+            observation.bytes = len(mp3_data.getbuffer())
+            return UploadAudio(source=mp3_data, mime_type="audio/mpeg")
 
         mp3_path = convert_ogg_to_mp3(ogg_path)
         if not mp3_path:
-            return False
+            observation.ok = False
+            return None
+        observation.bytes = os.path.getsize(mp3_path)
+        return UploadAudio(source=mp3_path, mime_type="audio/mpeg", temp_path=mp3_path)
+
+def lookup_cached_transcript(audio_hash: str) -> tuple[str | None, str | None]:
+    """
+    Vyhledá přepis audia v cache přepisů.
+
+    Args:
+        audio_hash (str): SHA-256 hash staženého OGG souboru.
+
+    Přepis se hledá pod klíči všech modelů, které aktuální TRANSCRIBE_BACKEND
+    může použít (v režimu "auto" lokálního i vzdáleného).
+
+    Returns:
+        tuple[str | None, str | None]: Klíč cache (None, pokud je cache vypnutá)
+            a nalezený přepis (None, pokud v cache není). Bez nalezeného přepisu
+            je to klíč prvního z modelů; po přepisu ho nahradí transcript_key().
+    """
+    cache = get_transcript_cache()
+    if cache is None:
+        return None, None
+    keys = [transcript_key(audio_hash, model_id) for model_id in transcription_model_ids()]
+    for key in keys:
+        transcript = cache.get(key)
+        if transcript:
+            return key, transcript
+    return keys[0], None
+
+def transcript_key(audio_hash: str, model_id: str) -> str:
+    """Klíč cache přepisů pro audio s daným hashem přepsané modelem `model_id`."""
+    return cache_key(audio_hash, model_id, TRANSCRIPTION_PROMPT)
+
+def store_cached_transcript(key: str | None, transcript: str) -> None:
+    """
+    Uloží přepis do cache přepisů pod klíčem z lookup_cached_transcript().
+    """
+    cache = get_transcript_cache()
+    if cache is not None and key:
+        cache.put(key, transcript)
+
+
+@dataclass
+class AnnouncementItem:
+    """
+    Rozpracované hlášení. Jednotlivé fáze (stage_*) postupně doplňují jeho pole
+    a dokončení každé fáze zaznamenávají v state_manager, takže po chybě nebo
+    pádu procesu lze pokračovat od poslední dokončené fáze.
+    """
+    url: str
+    filename: str
+    ogg_path: str | None = None
+    audio_hash: str | None = None
+    cache_key: str | None = None
+    audio: UploadAudio | None = None
+    transcript: str | None = None
+    posted: bool = False
+    # Priorita při čekání na limity služeb (vyšší = dřív), při souběžném
+    # zpracování dostávají novější hlášení vyšší prioritu
+    priority: int = 0
+    # Akustický otisk (numpy.ndarray), uloží se do indexu po přepisu
+    fingerprint: "numpy.ndarray | None" = None
+
+    @classmethod
+    def resume(cls, url: str, filename: str, priority: int = 0) -> "AnnouncementItem":
+        """
+        Vytvoří položku a obnoví ji z uloženého rozpracovaného stavu.
+
+        Soubory z dřívějších fází se použijí jen tehdy, pokud stále existují
+        (u staženého OGG se navíc ověří hash), jinak se fáze zopakuje.
+        """
+        item = cls(url=url, filename=filename, priority=priority)
+        progress = get_item_progress(url)
+        if not progress:
+            return item
+
+        stage = progress["stage"]
+        logging.info(f"Obnovuji rozpracované hlášení {filename} (dokončená fáze: {stage}).")
+        if stage == "posted":
+            item.posted = True
+            return item
+        item.cache_key = progress.get("transcript_key")
+        if stage == "transcribed":
+            item.transcript = progress.get("transcript")
+
+        # Soubory obnovujeme i u přepsaného hlášení, aby se po odeslání smazaly
+        ogg_path, audio_hash = progress.get("ogg_path"), progress.get("audio_hash")
+        if ogg_path and os.path.exists(ogg_path) and file_sha256(ogg_path) == audio_hash:
+            item.ogg_path, item.audio_hash = ogg_path, audio_hash
+        audio_path = progress.get("audio_path")
+        if item.ogg_path and audio_path and os.path.exists(audio_path):
+            item.audio = UploadAudio(source=audio_path, mime_type=progress.get("mime_type", "audio/mpeg"),
+                                     temp_path=audio_path)
+        return item
+
+    def release_audio(self) -> None:
+        """Uvolní audio v paměti; soubory na disku zůstanou pro navázání v dalším běhu."""
+        if self.audio and not isinstance(self.audio.source, str):
+            self.audio.source.close()
+        self.audio = None
+
+    def cleanup(self) -> None:
+        """Smaže soubory, které položka během zpracování vytvořila, a uvolní audio v paměti."""
+        remove_temp_files(self.ogg_path, self.audio.temp_path if self.audio else None)
+        self.release_audio()
 
-        transcript = transcribe_audio(mp3_path)
-        if not transcript:
-            return False
 
-        broadcast_date = get_broadcast_datetime(filename)
-        if not broadcast_date:
+def stage_download(item: AnnouncementItem) -> bool:
+    """
+    Fáze 1: stažení OGG souboru a dohledání přepisu v cache podle jeho hashe.
+
+    Při AUDIO_IN_MEMORY se audio stáhne do paměti a rovnou zkonvertuje (viz download_to_memory).
+    """
+    if item.posted or item.transcript:
+        return True
+    if AUDIO_IN_MEMORY and not item.ogg_path:
+        # Stažení rovnou připraví audio k přepisu, fáze konverze se přeskočí.
+        # Nic se neukládá na disk, proto se fáze ani nezaznamenává pro navázání.
+        if not item.audio:
+            downloaded = download_to_memory(item.url, item.filename)
+            if downloaded is None:
+                return False
+            item.audio, item.audio_hash = downloaded
+    elif not item.ogg_path:
+        downloaded = download_file(item.url, item.filename)
+        if downloaded is None:
             return False
-        
-        success = send_announcement(transcript, broadcast_date, url)
-        return success
+        item.ogg_path, item.audio_hash = downloaded
+        record_item_stage(item.url, "downloaded", ogg_path=item.ogg_path, audio_hash=item.audio_hash)
+
+    item.cache_key, item.transcript = lookup_cached_transcript(item.audio_hash)
+    if item.transcript:
+        logging.info(f"Přepis {item.filename} nalezen v cache, přeskakuji konverzi i přepis.")
+        record_item_stage(item.url, "transcribed", transcript=item.transcript, transcript_key=item.cache_key)
+    else:
+        lookup_similar_announcement(item)
+    return True
+
+def lookup_similar_announcement(item: AnnouncementItem) -> None:
+    """
+    Porovná akustický otisk staženého audia s dříve přepsanými hlášeními.
+
+    Při shodě podle FINGERPRINT_ACTION použije přepis podobného hlášení
+    z cache ("link"), nebo hlášení označí jako odeslané bez odeslání ("skip").
+    Bez shody si otisk ponechá, aby se po přepisu uložil do indexu.
+    """
+    index = get_fingerprint_index()
+    audio = item.ogg_path or (item.audio.source if item.audio else None)
+    if index is None or audio is None:
+        return
+    with track_stage("fingerprint") as observation:
+        item.fingerprint = compute_fingerprint(audio)
+        if item.fingerprint is None:
+            return
+        observation.audio_seconds = ogg_duration(item.ogg_path) if item.ogg_path else None
+        match = index.find(item.fingerprint)
+    if match is None:
+        return
+
+    if FINGERPRINT_ACTION == "skip":
+        logging.info(f"Hlášení {item.filename} je shodné s {match.url} (podobnost {match.similarity:.2f}), "
+                     f"neodesílám ho.")
+        item.posted = True
+        record_item_stage(item.url, "posted")
+        return
+    cache = get_transcript_cache()
+    transcript = cache.get(match.transcript_key) if cache is not None and match.transcript_key else None
+    if not transcript:
+        logging.info(f"Hlášení {item.filename} je shodné s {match.url}, jeho přepis ale už v cache není.")
+        return
+    logging.info(f"Hlášení {item.filename} je shodné s {match.url} (podobnost {match.similarity:.2f}), "
+                 f"přebírám jeho přepis.")
+    item.transcript = transcript
+    store_cached_transcript(item.cache_key, transcript)
+    record_item_stage(item.url, "transcribed", transcript=item.transcript, transcript_key=item.cache_key)
+
+def remember_fingerprint(item: AnnouncementItem) -> None:
+    """
+    Uloží otisk přepsaného hlášení do indexu pro pozdější porovnání.
+    """
+    index = get_fingerprint_index()
+    if index is not None and item.fingerprint is not None:
+        index.add(item.url, item.fingerprint, item.cache_key)
+
+def stage_convert(item: AnnouncementItem) -> bool:
+    """
+    Fáze 2: příprava audia k nahrání podle TRANSCODE_MODE.
+    """
+    if item.posted or item.transcript or item.audio:
+        return True
+    item.audio = prepare_audio(item.ogg_path)
+    if not item.audio:
+        return False
+    # Zaznamenáváme jen výsledek uložený na disku, audio v paměti pád procesu nepřežije
+    if item.audio.temp_path:
+        record_item_stage(item.url, "converted", audio_path=item.audio.temp_path, mime_type=item.audio.mime_type)
+    return True
+
+def stage_transcribe(item: AnnouncementItem) -> bool:
+    """
+    Fáze 3: přepis audia (backend podle TRANSCRIBE_BACKEND) a jeho uložení do cache.
+    """
+    if item.posted or item.transcript:
+        return True
+    if TRANSCRIBE_CHUNKING:
+        # Import až zde, rozdělování na úseky se bez TRANSCRIBE_CHUNKING nepoužívá
+        from chunking import transcribe_chunked_with_model
+        transcribe = transcribe_chunked_with_model
+    else:
+        transcribe = transcribe_audio_with_model
+    # Účtuje se délka nahraného audia, u předzpracovaného OGG tedy délka po ořezu ticha
+    if isinstance(item.audio.source, str) and item.audio.mime_type == "audio/ogg":
+        audio_seconds = ogg_duration(item.audio.source)
+    else:
+        audio_seconds = ogg_duration(item.ogg_path) if item.ogg_path else None
+    item.transcript, model_id = transcribe(item.audio.source, mime_type=item.audio.mime_type,
+                                           display_name=item.filename, priority=item.priority,
+                                           audio_seconds=audio_seconds)
+    if not item.transcript:
+        return False
+    if item.cache_key and item.audio_hash:
+        # Klíč podle backendu, který přepis skutečně vytvořil (v režimu "auto" se liší)
+        item.cache_key = transcript_key(item.audio_hash, model_id)
+    # Přepis uložíme hned, aby se při selhání odeslání nemusel opakovat
+    store_cached_transcript(item.cache_key, item.transcript)
+    remember_fingerprint(item)
+    record_item_stage(item.url, "transcribed", transcript=item.transcript, transcript_key=item.cache_key)
+    return True
+
+def submit_announcement(item: AnnouncementItem, batcher: AnnouncementBatcher) -> Future:
+    """
+    Fáze 4 v dávkovém režimu: zařadí přepis do dávky a vrátí Future s výsledkem.
+
+    Po přijetí hlášení příjemcem se fáze "posted" zaznamená automaticky.
+    """
+    if item.posted:
+        future: Future = Future()
+        future.set_result(True)
+        return future
+    broadcast_date = broadcast_datetime(item.url)
+    if not broadcast_date:
+        future = Future()
+        future.set_result(False)
+        return future
+
+    def on_done(done: Future) -> None:
+        item.posted = done.result()
+        if item.posted:
+            record_item_stage(item.url, "posted")
+
+    future = batcher.submit(item.transcript, broadcast_date, item.url)
+    future.add_done_callback(on_done)
+    return future
+
+def stage_send(item: AnnouncementItem, batcher: AnnouncementBatcher | None = None) -> bool:
+    """
+    Fáze 4: odeslání přepisu na webové API, samostatně nebo přes dávku.
+    """
+    if item.posted:
+        return True
+    if batcher is not None:
+        return submit_announcement(item, batcher).result() and item.posted
+    broadcast_date = broadcast_datetime(item.url)
+    if not broadcast_date:
+        return False
+    item.posted = send_announcement(item.transcript, broadcast_date, item.url)
+    if item.posted:
+        record_item_stage(item.url, "posted")
+    return item.posted
+
+def prepare_announcement(url: str, filename: str) -> AnnouncementItem | None:
+    """
+    Provede fáze stažení, konverze a přepisu (bez odeslání).
+
+    Používá se v dávkovém režimu, kdy se hotové přepisy odesílají společně.
+
+    Args:
+        url (str): URL originálního .ogg souboru.
+        filename (str): Název souboru.
+
+    Returns:
+        AnnouncementItem | None: Hlášení připravené k odeslání, nebo None při chybě.
+    """
+    item = AnnouncementItem.resume(url, filename)
+    try:
+        for stage in (stage_download, stage_convert, stage_transcribe):
+            if not stage(item):
+                return None
+        # Audio už není potřeba, uvolníme paměť do odeslání dávky
+        if item.audio and not item.audio.temp_path:
+            item.audio = None
+        return item
+    except Exception as e:
+        logging.error(f"Při zpracování souboru {filename} došlo k neočekávané chybě: {e}")
+        return None
+
+def download_and_process_audio(url: str, filename: str) -> bool:
+    """
+    Orchestruje celý proces: stažení, konverze, přepis a odeslání.
+
+    Pokud bylo hlášení dříve rozpracováno, pokračuje od poslední dokončené
+    fáze. Stažené a konvertované soubory se při neúspěchu ponechávají
+    pro další pokus a mažou se až po úspěšném odeslání.
+
+    Args:
+        url (str): URL originálního .ogg souboru.
+        filename (str): Název souboru.
+
+    Returns:
+        bool: True, pokud vše proběhlo úspěšně, jinak False.
+    """
+    item = AnnouncementItem.resume(url, filename)
+    success = False
+    try:
+        for stage in (stage_download, stage_convert, stage_transcribe, stage_send):
+            if not stage(item):
+                return False
+        success = True
+        return True
 
     except Exception as e:
         logging.error(f"Při zpracování souboru {filename} došlo k neočekávané chybě: {e}")
         return False
     finally:
-        # Úklid stažených souborů po zpracování
-        if ogg_path and os.path.exists(ogg_path):
-            os.remove(ogg_path)
-            logging.info(f"Smazán dočasný soubor: {ogg_path}")
-        if mp3_path and os.path.exists(mp3_path):
-            os.remove(mp3_path)
-            logging.info(f"Smazán dočasný soubor: {mp3_path}") 
\ No newline at end of file
+        # Úklid stažených souborů po úspěšném zpracování
+        if success:
+            item.cleanup()
+
+def remove_temp_files(*paths: str | None) -> None:
+    """
+    Smaže dočasné audio soubory, pokud existují.
+
+    Args:
+        *paths (str | None): Cesty k souborům. Hodnoty None jsou ignorovány.
+    """
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
+            logging.info(f"Smazán dočasný soubor: {path}")
@@ -0,0 +1,329 @@
+"""
+End-to-end benchmark celého běhu main.main() proti lokálním náhradám služeb.
+
+Spustí lokální servery:
+    - stránku ve stylu rozhlas.php s N odkazy "Hlášení D.M..ogg" a vygenerovaným OGG audiem,
+    - příjemce přepisů (WEB_API_ENDPOINT i WEB_API_BATCH_ENDPOINT),
+a v procesu běhu nahradí Gemini SDK falešným backendem s nastavitelnou latencí
+a chybovostí. Pro každou velikost backlogu (výchozí 1, 50 a 500 hlášení) spustí
+main.main() v samostatném procesu s čistým stavem a změří propustnost,
+p50/p99 latenci jednotlivých fází (z metrik modulu metrics) a peak RSS.
+
+Výsledky se uloží jako JSON (včetně commitu), aby šlo porovnat výkon mezi commity:
+    python benchmarks/bench_e2e.py --output before.json
+    git checkout ...
+    python benchmarks/bench_e2e.py --compare before.json
+
+Použití:
+    python benchmarks/bench_e2e.py [--backlogs 1,50,500] [--latency 0.5] [--error-rate 0.02]
+                                   [--seconds 20] [--output vysledky.json] [--compare predchozi.json]
+
+Režim zpracování, TRANSCODE_MODE atd. se berou z prostředí jako u běžného běhu.
+Limity GEMINI_RPM/WEB_API_RPM jsou vypnuté (měří se vlastní propustnost), lze je
+nastavit proměnnými prostředí. Vyžaduje FFmpeg.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def generate_ogg(path: str, seconds: int) -> None:
+    """Vygeneruje testovací OGG/Opus s tónem a šumem o zadané délce."""
+    subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+         "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+         "-f", "lavfi", "-i", f"anoisesrc=d={seconds}:a=0.05",
+         "-filter_complex", "amix=inputs=2", "-ac", "1", "-ar", "48000",
+         "-c:a", "libopus", "-b:a", "32k", path],
+        check=True,
+    )
+
+
+def announcement_names(count: int) -> list:
+    """Jedinečné názvy hlášení s platným datem, od nejnovějšího (jako na skutečné stránce)."""
+    return [f"Hlášení {i % 28 + 1}.{i // 28 % 12 + 1}.{i}.ogg" for i in range(count, 0, -1)]
+
+
+def generate_page(names: list) -> bytes:
+    rows = "".join(f'<tr><td><a href="rozhlas/{name}">{name}</a></td>'
+                   f'<td><a href="rozhlas/{name}.xml">xml</a></td></tr>' for name in names)
+    return f'<html><head><meta charset="utf-8"></head><body><table>{rows}</table></body></html>'.encode("utf-8")
+
+
+class _SiteHandler(BaseHTTPRequestHandler):
+    """Stránka s hlášeními a audio soubory (všechny odkazy vrací stejné OGG)."""
+
+    def do_GET(self):
+        if self.path.endswith(".ogg"):
+            body, content_type = self.server.audio, "audio/ogg"
+        else:
+            body, content_type = self.server.page, "text/html; charset=utf-8"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _ReceiverHandler(BaseHTTPRequestHandler):
+    """Příjemce přepisů: počítá přijatá hlášení (jednotlivě i v dávce)."""
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        with self.server.lock:
+            self.server.received += len(payload) if isinstance(payload, list) else 1
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_server(handler, **attributes) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    for name, value in attributes.items():
+        setattr(server, name, value)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class FakeGenai:
+    """
+    Náhrada Gemini SDK s latencí kolem `latency` sekund a chybovostí `error_rate`.
+    """
+
+    def __init__(self, latency: float, error_rate: float, seed: int):
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._uploads = 0
+
+    def _draw(self) -> tuple:
+        with self._lock:
+            return self._random.uniform(0.5, 1.5) * self.latency, self._random.random() < self.error_rate
+
+    def upload_file(self, path, mime_type=None, display_name=None):
+        with self._lock:
+            self._uploads += 1
+            name = f"files/{self._uploads}"
+
+        class File:
+            pass
+        uploaded = File()
+        uploaded.name, uploaded.uri = name, f"https://fake-gemini/{name}"
+        return uploaded
+
+    def delete_file(self, name):
+        pass
+
+    def GenerativeModel(self, name):
+        fake = self
+
+        class Model:
+            def generate_content(self, parts):
+                delay, fail = fake._draw()
+                time.sleep(delay)
+                if fail:
+                    raise RuntimeError("Simulovaná chyba Gemini (500)")
+
+                class Response:
+                    text = "Vážení občané, obecní úřad oznamuje, že zítra bude přerušena dodávka vody."
+                    usage_metadata = None
+                return Response()
+        return Model()
+
+
+def percentile(values: list, share: float) -> float | None:
+    """Percentil metodou nejbližšího pořadí."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(share * len(ordered)) - 1)]
+
+
+def run_worker(site_url: str, latency: float, error_rate: float, seed: int) -> None:
+    """Provede jeden main.main() v aktuálním (čistém) adresáři a vypíše naměřené hodnoty jako JSON."""
+    sys.path.insert(0, ROOT)
+    import metrics
+    import sources
+    import transcriber
+    import main
+
+    sources.register_sources([sources.Source("bench", f"{site_url}/rozhlas.php", f"{site_url}/")])
+    transcriber._genai = FakeGenai(latency, error_rate, seed)
+
+    # Kromě histogramů si pro přesné percentily ukládáme i jednotlivé doby fází
+    durations = defaultdict(list)
+    observe = metrics.STAGE_DURATION.observe
+
+    def record(value, **labels):
+        durations[labels["stage"]].append(value)
+        observe(value, **labels)
+    metrics.STAGE_DURATION.observe = record
+
+    start = time.perf_counter()
+    found = main.main()
+    elapsed = time.perf_counter() - start
+    transcriber.get_transcription_client().flush()
+
+    stages = {}
+    for stage, values in sorted(durations.items()):
+        stages[stage] = {
+            "count": len(values),
+            "failures": metrics.STAGE_RESULTS.value(stage=stage, result="failure"),
+            "p50_s": percentile(values, 0.5),
+            "p99_s": percentile(values, 0.99),
+        }
+    # ru_maxrss je na Linuxu v KiB; FFmpeg běží jako podproces, proto sledujeme i děti
+    print(json.dumps({
+        "found": found,
+        "wall_s": elapsed,
+        "peak_rss_python_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_rss_children_mib": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        "stages": stages,
+    }))
+
+
+def run_backlog(backlog: int, audio: bytes, args) -> dict:
+    """Spustí servery s backlogem `backlog` hlášení a změří jeden běh main.main() v podprocesu."""
+    names = announcement_names(backlog)
+    site = _start_server(_SiteHandler, page=generate_page(names), audio=audio)
+    receiver = _start_server(_ReceiverHandler, lock=threading.Lock(), received=0)
+    site_url = f"http://127.0.0.1:{site.server_address[1]}"
+    receiver_url = f"http://127.0.0.1:{receiver.server_address[1]}"
+
+    env = dict(os.environ)
+    for key, value in {
+        "GEMINI_API_KEY": "benchmark", "WEB_API_KEY": "benchmark", "GEMINI_RPM": "0", "GEMINI_TPM": "0",
+        "WEB_API_RPM": "0", "SCRAPER_STOP_AFTER_KNOWN": "0",
+    }.items():
+        env.setdefault(key, value)
+    env["WEB_API_ENDPOINT"] = f"{receiver_url}/single"
+    env["WEB_API_BATCH_ENDPOINT"] = f"{receiver_url}/batch"
+    # Všechna hlášení mají stejné audio, cache přepisů by přepis přeskočila
+    env["TRANSCRIPT_CACHE_ENABLED"] = "false"
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_e2e_") as workdir:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", site_url,
+                 "--latency", str(args.latency), "--error-rate", str(args.error_rate), "--seed", str(args.seed)],
+                cwd=workdir, env=env, check=True, capture_output=True, text=True,
+            ).stdout
+    finally:
+        site.shutdown()
+        receiver.shutdown()
+
+    result = json.loads(output.strip().splitlines()[-1])
+    result["backlog"] = backlog
+    result["received"] = receiver.received
+    result["throughput_per_s"] = receiver.received / result["wall_s"] if result["wall_s"] else None
+    return result
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: list, baseline: dict | None) -> None:
+    base_runs = {run["backlog"]: run for run in baseline["runs"]} if baseline else {}
+    print(f"{'backlog':>7} {'přijato':>8} {'čas [s]':>9} {'hlášení/s':>10} {'RSS [MiB]':>10}  změna propustnosti")
+    for run in results:
+        base = base_runs.get(run["backlog"])
+        change = ""
+        if base and base.get("throughput_per_s") and run["throughput_per_s"]:
+            change = f"{run['throughput_per_s'] / base['throughput_per_s'] - 1:+.1%}"
+        print(f"{run['backlog']:>7} {run['received']:>8} {run['wall_s']:>9.2f} {run['throughput_per_s'] or 0:>10.2f} "
+              f"{run['peak_rss_python_mib']:>10.1f}  {change}")
+        for stage, values in run["stages"].items():
+            base_p99 = base["stages"].get(stage, {}).get("p99_s") if base else None
+            delta = f" (dříve {base_p99 * 1000:.0f} ms)" if base_p99 is not None else ""
+            print(f"{'':>9}{stage:<11} n={values['count']:<5} chyb={values['failures']:<4.0f} "
+                  f"p50={values['p50_s'] * 1000:8.1f} ms  p99={values['p99_s'] * 1000:8.1f} ms{delta}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backlogs", default="1,50,500", help="Čárkou oddělené velikosti backlogu.")
+    parser.add_argument("--latency", type=float, default=0.5, help="Průměrná latence falešného Gemini v sekundách.")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="Podíl přepisů, které falešné Gemini odmítne.")
+    parser.add_argument("--seconds", type=int, default=20, help="Délka generovaného audia v sekundách.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed náhodné latence a chyb.")
+    parser.add_argument("--output", help="Cesta k JSON s výsledky (výchozí benchmarks/results/e2e_<commit>.json).")
+    parser.add_argument("--compare", help="JSON s dřívějšími výsledky, se kterými se má porovnat.")
+    parser.add_argument("--worker", metavar="SITE_URL", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.latency, args.error_rate, args.seed)
+        return
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        ogg_path = os.path.join(tmpdir, "audio.ogg")
+        generate_ogg(ogg_path, args.seconds)
+        with open(ogg_path, "rb") as f:
+            audio = f.read()
+
+    results = []
+    for backlog in (int(value) for value in args.backlogs.split(",")):
+        print(f"Backlog {backlog} hlášení...", flush=True)
+        results.append(run_backlog(backlog, audio, args))
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "settings": {
+            "latency_s": args.latency, "error_rate": args.error_rate, "audio_seconds": args.seconds,
+            "seed": args.seed,
+            "processing_mode": os.getenv("PROCESSING_MODE", "sequential"),
+            "transcode_mode": os.getenv("TRANSCODE_MODE", "mp3"),
+        },
+        "runs": results,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"Porovnání s commitem {baseline.get('commit')} ({args.compare})")
+    print_results(results, baseline)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"e2e_{commit or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Výsledky uloženy do {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Mikro-benchmark vyhledání odkazů na hlášení ve stránce rozhlas.php.
+
+Porovnává původní řešení (celý strom BeautifulSoup) s backendy modulu
+link_extractor (html.parser, lxml) a s předčasným ukončením po již
+zpracovaných odkazech. Zároveň ověřuje, že všechny backendy vrací
+stejné odkazy jako BeautifulSoup.
+
+Použití:
+    python benchmarks/bench_link_extraction.py [--page ulozena_stranka.html] [--links 5000] [--repeat 5]
+
+Bez --page se vygeneruje velká syntetická stránka ve stylu rozhlas.php
+a uloží se do benchmarks/fixtures/.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from link_extractor import decode_html, iter_announcement_links, resolve_backend  # noqa: E402
+
+PREFIX = "rozhlas/Hlášení"
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def generate_page(links: int) -> bytes:
+    """Vygeneruje stránku s `links` hlášeními seřazenými od nejnovějšího."""
+    rows = []
+    for i in range(links, 0, -1):
+        day, month = i % 28 + 1, i // 28 % 12 + 1
+        name = f"Hlášení {day}.{month}.{i % 3 or ''}.ogg"
+        rows.append(
+            f'<tr><td class="datum">{day}.{month}.</td>'
+            f'<td><a href="rozhlas/{name}" title="Přehrát">{name}</a></td>'
+            f'<td><a href="rozhlas/{name}.xml">xml</a></td>'
+            f'<td><a href="index.php?id={i}&amp;sort=desc">detail</a></td></tr>'
+        )
+    html = (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Rozhlas</title></head><body>'
+        '<div id="menu"><a href="index.php">Úvod</a><a href="rozhlas.php">Rozhlas</a></div>'
+        '<table class="hlaseni">' + "".join(rows) + '</table></body></html>'
+    )
+    return html.encode('utf-8')
+
+
+def bs4_links(content: bytes) -> list:
+    """Původní implementace ze scraper.py (bez ladicích výpisů)."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, 'html.parser')
+    links = []
+    for link_tag in soup.find_all('a', href=True):
+        href = link_tag['href']
+        if not href.startswith(PREFIX):
+            continue
+        if href.endswith('.xml'):
+            continue
+        links.append(href)
+    return links
+
+
+def measure(func, repeat: int) -> tuple:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page", help="Uložená HTML stránka s hlášeními.")
+    parser.add_argument("--links", type=int, default=5000, help="Počet hlášení v generované stránce.")
+    parser.add_argument("--repeat", type=int, default=5, help="Počet opakování každého měření.")
+    parser.add_argument("--known-after", type=int, default=20,
+                        help="Kolik nejnovějších hlášení považovat za nová při měření předčasného ukončení.")
+    args = parser.parse_args()
+
+    if args.page:
+        page_path = args.page
+    else:
+        os.makedirs(FIXTURE_DIR, exist_ok=True)
+        page_path = os.path.join(FIXTURE_DIR, f"rozhlas_{args.links}.html")
+        if not os.path.exists(page_path):
+            with open(page_path, 'wb') as f:
+                f.write(generate_page(args.links))
+
+    with open(page_path, 'rb') as f:
+        content = f.read()
+    print(f"Stránka: {page_path} ({len(content) / 1024:.0f} KiB)")
+
+    results = {}
+    try:
+        results["bs4 (původní)"] = measure(lambda: bs4_links(content), args.repeat)
+    except ImportError:
+        print("BeautifulSoup není nainstalovaný, referenční měření přeskakuji.")
+
+    for backend in ("htmlparser", "lxml"):
+        if resolve_backend(backend) != backend:
+            print(f"Backend {backend} není k dispozici, přeskakuji.")
+            continue
+        results[backend] = measure(
+            lambda: list(iter_announcement_links(decode_html(content), PREFIX, backend=backend)), args.repeat)
+
+        all_links = results[backend][1]
+        new_links = set(all_links[:args.known_after])
+        results[f"{backend} + stop po 5 známých"] = measure(
+            lambda: list(iter_announcement_links(decode_html(content), PREFIX, backend=backend,
+                                                 is_known=lambda href: href not in new_links,
+                                                 stop_after_known=5)),
+            args.repeat)
+
+    reference = results.get("bs4 (původní)", next(iter(results.values())))[1]
+    print(f"{'varianta':<32} {'čas [ms]':>10} {'odkazů':>8} {'shoda':>6}")
+    for name, (elapsed, links) in results.items():
+        if "stop" in name:
+            same = links == reference[:len(links)]
+        else:
+            same = links == reference
+        print(f"{name:<32} {elapsed * 1000:>10.2f} {len(links):>8} {'ano' if same else 'NE':>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark přípravy audia před nahráním do Gemini.
+
+Porovnává čas a špičkovou paměť (peak RSS) pro režimy TRANSCODE_MODE:
+    mp3    - pydub dekóduje celý AudioSegment a exportuje MP3 na disk
+    stream - FFmpeg rourou stdin → stdout, bez AudioSegmentu a mezisouboru
+    direct - žádná konverze, nahrává se původní OGG
+    speech - FFmpeg ořízne ticho a uloží mono Opus pro řeč
+
+Každý režim běží v samostatném procesu, aby se peak RSS neovlivňovaly.
+
+Použití:
+    python benchmarks/bench_transcode.py [cesta_k_ogg] [--seconds 300] [--repeat 3]
+
+Bez zadaného souboru se vygeneruje testovací OGG (vyžaduje FFmpeg).
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("mp3", "stream", "direct", "speech")
+
+
+def generate_ogg(path: str, seconds: int) -> None:
+    """Vygeneruje testovací OGG/Opus s tónem a šumem o zadané délce."""
+    subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+         "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+         "-f", "lavfi", "-i", f"anoisesrc=d={seconds}:a=0.05",
+         "-filter_complex", "amix=inputs=2", "-ac", "1", "-ar", "48000",
+         "-c:a", "libopus", "-b:a", "32k", path],
+        check=True,
+    )
+
+
+def run_worker(mode: str, ogg_path: str) -> None:
+    """Provede přípravu audia v daném režimu a vypíše naměřené hodnoty jako JSON."""
+    # Klíče vyžaduje config.validate_config(), pro benchmark stačí fiktivní hodnoty
+    for key in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT"):
+        os.environ.setdefault(key, "benchmark")
+    os.environ["TRANSCODE_MODE"] = mode
+    sys.path.insert(0, ROOT)
+
+    import audio_processor
+
+    workdir = tempfile.mkdtemp(prefix="bench_transcode_")
+    audio_processor.MP3_DIR = workdir
+
+    start = time.perf_counter()
+    audio = audio_processor.prepare_audio(ogg_path)
+    elapsed = time.perf_counter() - start
+    if audio is None:
+        raise SystemExit(f"Příprava audia v režimu {mode} selhala")
+
+    if isinstance(audio.source, str):
+        output_bytes = os.path.getsize(audio.source)
+    else:
+        output_bytes = len(audio.source.getbuffer())
+    audio_processor.remove_temp_files(audio.temp_path)
+    os.rmdir(workdir)
+
+    # ru_maxrss je na Linuxu v KiB; FFmpeg běží jako podproces, proto sledujeme i děti
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(json.dumps({
+        "mode": mode,
+        "wall_s": elapsed,
+        "peak_rss_python_mib": self_rss / 1024,
+        "peak_rss_ffmpeg_mib": child_rss / 1024,
+        "output_bytes": output_bytes,
+    }))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("ogg", nargs="?", help="Cesta k OGG souboru; bez ní se vygeneruje testovací soubor.")
+    parser.add_argument("--seconds", type=int, default=300, help="Délka generovaného audia v sekundách.")
+    parser.add_argument("--repeat", type=int, default=3, help="Počet opakování každého režimu.")
+    parser.add_argument("--modes", default=",".join(MODES), help="Čárkou oddělené režimy k měření.")
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.ogg)
+        return
+
+    ogg_path = args.ogg
+    generated = None
+    if not ogg_path:
+        generated = tempfile.NamedTemporaryFile(suffix=".ogg", delete=False).name
+        generate_ogg(generated, args.seconds)
+        ogg_path = generated
+
+    try:
+        print(f"Vstup: {ogg_path} ({os.path.getsize(ogg_path) / 1024:.0f} KiB)")
+        print(f"{'režim':<8} {'čas [s]':>9} {'RSS py [MiB]':>13} {'RSS ffmpeg [MiB]':>17} {'výstup [KiB]':>13}")
+        for mode in args.modes.split(","):
+            runs = []
+            for _ in range(args.repeat):
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--worker", mode, ogg_path],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                runs.append(json.loads(output.strip().splitlines()[-1]))
+            best = min(runs, key=lambda r: r["wall_s"])
+            print(f"{mode:<8} {best['wall_s']:>9.3f} {max(r['peak_rss_python_mib'] for r in runs):>13.1f} "
+                  f"{max(r['peak_rss_ffmpeg_mib'] for r in runs):>17.1f} {best['output_bytes'] / 1024:>13.0f}")
+    finally:
+        if generated:
+            os.unlink(generated)
+
+
+if __name__ == "__main__":
+    main()
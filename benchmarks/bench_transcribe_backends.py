@@ -0,0 +1,189 @@
+"""
+Benchmark backendů přepisu (TRANSCRIBE_BACKEND) na stejné sadě nahrávek.
+
+Sada je adresář s audio soubory (.ogg, .mp3, .wav); k nahrávce může ležet
+referenční přepis se stejným názvem a příponou .txt, pak se počítá i WER
+(podíl chybných slov). Bez adresáře se vygenerují syntetické nahrávky (tón
+a šum), které měří jen rychlost, nikoli kvalitu přepisu.
+
+Pro každý backend (gemini, local, auto) se v samostatném procesu přepíše celá
+sada s `--concurrency` souběžnými přepisy a změří se celkový čas, p50/p95
+latence jednoho přepisu, real-time factor (čas / délka audia), počet chyb,
+WER a peak RSS (u lokálního backendu včetně pracovních procesů).
+
+Použití:
+    python benchmarks/bench_transcribe_backends.py [adresar_se_sadou] [--backends gemini,local]
+        [--concurrency 2] [--generate 5 --seconds 60] [--output vysledky.json]
+
+Backend gemini volá skutečné API (GEMINI_API_KEY, účtuje se), backend local
+vyžaduje faster-whisper (LOCAL_WHISPER_MODEL atd. z prostředí).
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKENDS = ("gemini", "local", "auto")
+AUDIO_EXTENSIONS = (".ogg", ".mp3", ".wav")
+
+
+def generate_fixtures(directory: str, count: int, seconds: int) -> None:
+    """Vygeneruje syntetické OGG/Opus nahrávky (vyžaduje FFmpeg)."""
+    for index in range(count):
+        subprocess.run(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+             "-f", "lavfi", "-i", f"sine=frequency={300 + 50 * index}:duration={seconds}",
+             "-f", "lavfi", "-i", f"anoisesrc=d={seconds}:a=0.05",
+             "-filter_complex", "amix=inputs=2", "-ac", "1", "-ar", "48000",
+             "-c:a", "libopus", "-b:a", "32k", os.path.join(directory, f"synteticke_{index + 1}.ogg")],
+            check=True,
+        )
+
+
+def list_fixtures(directory: str) -> list:
+    return sorted(path for path in glob.glob(os.path.join(directory, "*"))
+                  if os.path.splitext(path)[1].lower() in AUDIO_EXTENSIONS)
+
+
+def _words(text: str) -> list:
+    return re.findall(r"\w+", text.lower())
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """WER: editační vzdálenost po slovech dělená počtem slov reference."""
+    ref, hyp = _words(reference), _words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / max(1, len(ref))
+
+
+def percentile(values: list, share: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def run_worker(backend_name: str, directory: str, concurrency: int) -> None:
+    """Přepíše sadu zvoleným backendem a vypíše naměřené hodnoty jako JSON."""
+    os.environ["TRANSCRIBE_BACKEND"] = backend_name
+    # Měří se backend, ne cache ani limity na straně klienta
+    os.environ.setdefault("GEMINI_RPM", "0")
+    os.environ.setdefault("GEMINI_TPM", "0")
+    sys.path.insert(0, ROOT)
+
+    import transcriber
+    from audio_processor import ogg_duration
+
+    fixtures = list_fixtures(directory)
+    backend = transcriber.get_transcription_backend()
+
+    def transcribe(path: str) -> dict:
+        audio_seconds = ogg_duration(path) if path.endswith(".ogg") else None
+        start = time.perf_counter()
+        text = backend.transcribe(path, display_name=os.path.basename(path), audio_seconds=audio_seconds)
+        result = {"file": os.path.basename(path), "latency_s": time.perf_counter() - start,
+                  "audio_seconds": audio_seconds, "ok": text is not None}
+        reference_path = os.path.splitext(path)[0] + ".txt"
+        if text is not None and os.path.exists(reference_path):
+            with open(reference_path, "r", encoding="utf-8") as f:
+                result["wer"] = word_error_rate(f.read(), text)
+        return result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        files = list(executor.map(transcribe, fixtures))
+    wall = time.perf_counter() - start
+    backend.close()
+
+    latencies = [f["latency_s"] for f in files if f["ok"]]
+    audio_total = sum(f["audio_seconds"] or 0 for f in files)
+    wers = [f["wer"] for f in files if "wer" in f]
+    print(json.dumps({
+        "backend": backend_name,
+        "model": backend.model_id,
+        "files": len(files),
+        "failures": sum(1 for f in files if not f["ok"]),
+        "wall_s": wall,
+        "p50_s": percentile(latencies, 0.5),
+        "p95_s": percentile(latencies, 0.95),
+        "realtime_factor": wall / audio_total if audio_total else None,
+        "wer": sum(wers) / len(wers) if wers else None,
+        # ru_maxrss je na Linuxu v KiB; pracovní procesy lokálního přepisu jsou děti
+        "peak_rss_python_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_rss_children_mib": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        "details": files,
+    }))
+
+
+def _format(value: float | None, width: int) -> str:
+    return f"{'-':>{width}}" if value is None else f"{value:>{width}.2f}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixtures", nargs="?", help="Adresář s nahrávkami (a referenčními .txt přepisy).")
+    parser.add_argument("--backends", default="gemini,local", help="Čárkou oddělené backendy k měření.")
+    parser.add_argument("--concurrency", type=int, default=2, help="Počet souběžných přepisů.")
+    parser.add_argument("--generate", type=int, default=5, help="Počet syntetických nahrávek bez zadané sady.")
+    parser.add_argument("--seconds", type=int, default=60, help="Délka syntetických nahrávek v sekundách.")
+    parser.add_argument("--output", help="Cesta k JSON s výsledky.")
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.fixtures, args.concurrency)
+        return
+
+    generated = None
+    directory = args.fixtures
+    if not directory:
+        generated = tempfile.TemporaryDirectory(prefix="bench_transcribe_")
+        directory = generated.name
+        generate_fixtures(directory, args.generate, args.seconds)
+
+    try:
+        print(f"Sada: {directory} ({len(list_fixtures(directory))} nahrávek)")
+        print(f"{'backend':<8} {'čas [s]':>9} {'p50 [s]':>8} {'p95 [s]':>8} {'RTF':>6} {'WER':>6} "
+              f"{'chyby':>6} {'RSS [MiB]':>10}")
+        results = []
+        for backend in args.backends.split(","):
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", backend,
+                 "--concurrency", str(args.concurrency), directory],
+                capture_output=True, text=True,
+            )
+            lines = completed.stdout.strip().splitlines()
+            if completed.returncode != 0 or not lines:
+                print(f"{backend:<8} selhal: {completed.stderr.strip().splitlines()[-1:]}")
+                continue
+            run = json.loads(lines[-1])
+            results.append(run)
+            print(f"{backend:<8} {run['wall_s']:>9.2f} {_format(run['p50_s'], 8)} "
+                  f"{_format(run['p95_s'], 8)} {_format(run['realtime_factor'], 6)} "
+                  f"{_format(run['wer'], 6)} {run['failures']:>6} "
+                  f"{run['peak_rss_python_mib'] + run['peak_rss_children_mib']:>10.0f}")
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump({"fixtures": directory, "concurrency": args.concurrency, "runs": results}, f,
+                          ensure_ascii=False, indent=2)
+            print(f"Výsledky uloženy do {args.output}")
+    finally:
+        if generated:
+            generated.cleanup()
+
+
+if __name__ == "__main__":
+    main()
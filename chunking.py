@@ -0,0 +1,250 @@
+import hashlib
+import io
+import logging
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, List, Tuple
+
+from config import (
+    FFMPEG_BINARY,
+    TRANSCRIBE_CHUNK_MAX_SECONDS,
+    TRANSCRIBE_CHUNK_OVERLAP_MS,
+    TRANSCRIBE_CHUNK_WORKERS,
+    TRANSCRIBE_CHUNK_RETRIES,
+    SILENCE_MIN_MS,
+    SILENCE_THRESH_DBFS,
+)
+from transcriber import transcribe_audio_with_model, transcription_model_ids, TRANSCRIPTION_PROMPT
+from transcript_cache import get_transcript_cache, cache_key
+
+# Audio pro detekci ticha a úseky k přepisu: mono, 16 kHz, 16 bit - pro řeč stačí
+_SAMPLE_RATE = 16000
+_SAMPLE_WIDTH = 2
+# Kolik slov na konci předchozího úseku se porovnává se začátkem dalšího
+_MAX_OVERLAP_WORDS = 40
+
+
+def plan_chunks(duration_ms: int, silences: List[Tuple[int, int]], max_chunk_ms: int,
+                overlap_ms: int = 0) -> List[Tuple[int, int]]:
+    """
+    Rozdělí audio na úseky nejvýše `max_chunk_ms` dlouhé, přednostně uprostřed ticha.
+
+    Úsek se řízne v posledním tichu v jeho druhé polovině. Pokud tam žádné
+    ticho není, řízne se natvrdo na maximální délce a další úsek začne o
+    `overlap_ms` dříve, aby se nerozdělené slovo objevilo celé alespoň
+    v jednom z nich (duplicitu odstraní merge_transcripts).
+
+    Args:
+        duration_ms (int): Délka audia v ms.
+        silences (List[Tuple[int, int]]): Úseky ticha (začátek, konec) v ms.
+        max_chunk_ms (int): Maximální délka úseku v ms.
+        overlap_ms (int): Překryv úseků při řezu mimo ticho.
+
+    Returns:
+        List[Tuple[int, int]]: Úseky (začátek, konec) v ms seřazené podle času.
+    """
+    overlap_ms = min(overlap_ms, max_chunk_ms // 4)
+    midpoints = [(start + end) // 2 for start, end in silences]
+    chunks = []
+    start = 0
+    while duration_ms - start > max_chunk_ms:
+        limit = start + max_chunk_ms
+        cuts = [point for point in midpoints if start + max_chunk_ms // 2 < point <= limit]
+        if cuts:
+            chunks.append((start, cuts[-1]))
+            start = cuts[-1]
+        else:
+            chunks.append((start, limit))
+            start = limit - overlap_ms
+    chunks.append((start, duration_ms))
+    return chunks
+
+
+def _words(text: str) -> List[str]:
+    return [re.sub(r'\W+', '', word).lower() for word in text.split()]
+
+
+def merge_transcripts(parts: List[str]) -> str:
+    """
+    Spojí přepisy úseků v pořadí a odstraní text zopakovaný v překryvu.
+
+    Za opakování se považuje nejdelší shoda (alespoň dvou slov) mezi koncem
+    předchozího a začátkem následujícího přepisu; porovnává se bez ohledu na
+    velikost písmen a interpunkci.
+
+    Args:
+        parts (List[str]): Přepisy jednotlivých úseků v časovém pořadí.
+
+    Returns:
+        str: Spojený přepis.
+    """
+    merged: List[str] = []
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+        if merged:
+            previous, current = _words(merged[-1])[-_MAX_OVERLAP_WORDS:], _words(part)
+            overlap = next((size for size in range(min(len(previous), len(current)), 1, -1)
+                            if previous[-size:] == current[:size]), 0)
+            if overlap:
+                # Vynecháme prvních `overlap` slov, zbytek textu včetně formátování zachováme
+                part = re.sub(r'^\s*(?:\S+\s+){%d}' % overlap, '', part + ' ', count=1).strip()
+                if not part:
+                    continue
+        merged.append(part)
+    return "\n".join(merged)
+
+
+def _read_source(source: str | BinaryIO) -> bytes:
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return f.read()
+    source.seek(0)
+    data = source.read()
+    source.seek(0)
+    return data
+
+
+def _decode_pcm(data: bytes) -> bytes:
+    """Dekóduje audio libovolného formátu přes FFmpeg na mono 16 kHz PCM."""
+    command = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+               "-vn", "-ac", "1", "-ar", str(_SAMPLE_RATE), "-f", "s16le", "pipe:1"]
+    return subprocess.run(command, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          check=True).stdout
+
+
+def split_audio(source: str | BinaryIO, max_chunk_ms: int = int(TRANSCRIBE_CHUNK_MAX_SECONDS * 1000),
+                overlap_ms: int = TRANSCRIBE_CHUNK_OVERLAP_MS,
+                audio_seconds: float | None = None) -> List[Tuple[io.BytesIO, float]]:
+    """
+    Rozdělí audio na MP3 úseky v místech ticha (pydub.silence.detect_silence).
+
+    Délka audia se nejprve zjistí bez dekódování (`audio_seconds` nebo
+    ogg_duration u OGG souboru); audio se dekóduje, jen pokud je delší
+    než `max_chunk_ms` nebo jeho délku nelze takto zjistit.
+
+    Args:
+        source (str | BinaryIO): Cesta k audio souboru nebo data v paměti.
+        max_chunk_ms (int): Maximální délka úseku v ms.
+        overlap_ms (int): Překryv úseků při řezu mimo ticho.
+        audio_seconds (float | None): Délka audia, pokud ji volající zná.
+
+    Returns:
+        List[Tuple[io.BytesIO, float]]: MP3 data úseků a jejich délka v sekundách,
+            v časovém pořadí. Krátké audio vrací jediný úsek s původními daty
+            (bez nového kódování).
+    """
+    from pydub import AudioSegment
+    from pydub.silence import detect_silence
+
+    if audio_seconds is None and isinstance(source, str):
+        from audio_processor import ogg_duration
+        audio_seconds = ogg_duration(source)
+    data = _read_source(source)
+    if audio_seconds is not None and audio_seconds * 1000 <= max_chunk_ms:
+        return [(io.BytesIO(data), audio_seconds)]
+
+    audio = AudioSegment(data=_decode_pcm(data), sample_width=_SAMPLE_WIDTH,
+                         frame_rate=_SAMPLE_RATE, channels=1)
+    if len(audio) <= max_chunk_ms:
+        return [(io.BytesIO(data), len(audio) / 1000)]
+
+    silences = detect_silence(audio, min_silence_len=SILENCE_MIN_MS, silence_thresh=SILENCE_THRESH_DBFS,
+                              seek_step=10)
+    chunks = []
+    for start, end in plan_chunks(len(audio), silences, max_chunk_ms, overlap_ms):
+        buffer = io.BytesIO()
+        audio[start:end].export(buffer, format="mp3")
+        buffer.seek(0)
+        chunks.append((buffer, (end - start) / 1000))
+    logging.info(f"Audio ({len(audio) / 1000:.0f} s) rozděleno na {len(chunks)} úseků.")
+    return chunks
+
+
+def _transcribe_chunk(index: int, chunk: Tuple[io.BytesIO, float], display_name: str,
+                      priority: int = 0) -> tuple[str | None, str | None]:
+    """
+    Přepíše jeden úsek. Při chybě ho zkusí znovu (jen tento úsek) a hotové
+    úseky ukládá do cache přepisů, takže se po selhání neopakují ani v dalším běhu.
+
+    Returns:
+        tuple[str | None, str | None]: Přepis úseku a model_id backendu, který ho vytvořil.
+    """
+    data, seconds = chunk
+    cache = get_transcript_cache()
+    chunk_hash = hashlib.sha256(data.getvalue()).hexdigest()
+    if cache is not None:
+        for model_id in transcription_model_ids():
+            cached = cache.get(cache_key(chunk_hash, model_id, TRANSCRIPTION_PROMPT))
+            if cached:
+                return cached, model_id
+
+    for attempt in range(TRANSCRIBE_CHUNK_RETRIES + 1):
+        data.seek(0)
+        # Délka úseku rozhoduje v režimu "auto" o backendu přepisu
+        transcript, model_id = transcribe_audio_with_model(
+            data, mime_type="audio/mpeg", display_name=f"{display_name} #{index + 1}", priority=priority,
+            audio_seconds=seconds)
+        if transcript:
+            if cache is not None:
+                cache.put(cache_key(chunk_hash, model_id, TRANSCRIPTION_PROMPT), transcript)
+            return transcript, model_id
+        logging.warning(f"Přepis úseku {index + 1} souboru {display_name} selhal (pokus {attempt + 1}).")
+    return None, None
+
+
+def transcribe_chunked_with_model(source: str | BinaryIO, mime_type: str | None = None,
+                                  display_name: str | None = None, priority: int = 0,
+                                  audio_seconds: float | None = None) -> tuple[str | None, str | None]:
+    """
+    Přepíše audio po úsecích rozdělených v tichu, souběžně v TRANSCRIBE_CHUNK_WORKERS vláknech.
+
+    Krátké audio (do TRANSCRIBE_CHUNK_MAX_SECONDS) se přepíše najednou jako dosud.
+
+    Args:
+        source (str | BinaryIO): Cesta k audio souboru nebo data v paměti.
+        mime_type (str | None): MIME typ audia (použije se jen u krátkého audia).
+        display_name (str | None): Název souboru zobrazený v Gemini.
+        priority (int): Priorita při čekání na limiter Gemini (platí pro všechny úseky).
+        audio_seconds (float | None): Délka audia, pokud je známa (pro metriky a volbu backendu).
+
+    Returns:
+        tuple[str | None, str | None]: Spojený přepis (None, pokud některý úsek nejde
+            přepsat) a model_id backendu, který ho vytvořil. Přepsaly-li úseky různé
+            backendy, jsou jejich model_id spojena znakem '+'.
+    """
+    display_name = display_name or (source if isinstance(source, str) else "audio")
+    try:
+        chunks = split_audio(source, audio_seconds=audio_seconds)
+    except (OSError, subprocess.CalledProcessError) as e:
+        logging.error(f"Audio {display_name} se nepodařilo rozdělit na úseky, přepisuji najednou: {e}")
+        chunks = None
+    if not chunks or len(chunks) == 1:
+        return transcribe_audio_with_model(source, mime_type=mime_type, display_name=display_name,
+                                           priority=priority, audio_seconds=audio_seconds)
+
+    with ThreadPoolExecutor(max_workers=max(1, TRANSCRIBE_CHUNK_WORKERS),
+                            thread_name_prefix="transcribe-chunk") as executor:
+        results = list(executor.map(_transcribe_chunk, range(len(chunks)), chunks,
+                                    [display_name] * len(chunks), [priority] * len(chunks)))
+    failed = [index + 1 for index, (part, _) in enumerate(results) if part is None]
+    if failed:
+        logging.error(f"Přepis souboru {display_name} selhal, nepřepsané úseky: {failed}")
+        return None, None
+    model_id = "+".join(sorted({model_id for _, model_id in results}))
+    return merge_transcripts([part for part, _ in results]), model_id
+
+
+def transcribe_chunked(source: str | BinaryIO, mime_type: str | None = None,
+                       display_name: str | None = None, priority: int = 0,
+                       audio_seconds: float | None = None) -> str | None:
+    """
+    Přepíše audio po úsecích, viz transcribe_chunked_with_model().
+
+    Returns:
+        str | None: Spojený přepis, nebo None, pokud některý úsek nejde přepsat.
+    """
+    return transcribe_chunked_with_model(source, mime_type=mime_type, display_name=display_name,
+                                         priority=priority, audio_seconds=audio_seconds)[0]
@@ -8,6 +8,80 @@ load_dotenv()
 
 # URL adresa pro stahování hlášení
 BROADCAST_URL = "https://rozhlas.milesovice.cz/rozhlas.php"
+# Adresa, ke které se připojují relativní odkazy na hlášení, a jejich povinný začátek
+BROADCAST_BASE_URL = "https://rozhlas.milesovice.cz/"
+ANNOUNCEMENT_LINK_PREFIX = "rozhlas/Hlášení"
+# Datum vysílání v názvu souboru ('Hlášení DD.M..ogg'): skupiny day, month a volitelně year
+ANNOUNCEMENT_DATE_PATTERN = r"(?P<day>\d{1,2})\.(?P<month>\d{1,2})\."
+
+# Více obcí v jednom procesu: JSON soubor se seznamem zdrojů (viz sources.py).
+# Bez něj se zpracovává jediná stránka podle BROADCAST_URL výše.
+SOURCES_FILE = os.getenv("SOURCES_FILE", "")
+# Kolik stránek zdrojů se stahuje souběžně
+SOURCES_FETCH_CONCURRENCY = int(os.getenv("SOURCES_FETCH_CONCURRENCY", "8"))
+
+# Backend pro vyhledání odkazů na stránce: "auto" (lxml, je-li nainstalované),
+# "lxml" nebo "htmlparser" (standardní knihovna)
+SCRAPER_BACKEND = os.getenv("SCRAPER_BACKEND", "auto")
+# Stránka je řazena od nejnovějšího hlášení. Po tolika již zpracovaných
+# odkazech po sobě se zbytek stránky neprochází (0 = projít vždy celou stránku).
+# Starší hlášení, jehož zpracování selhalo, se pak už znovu nezkusí, proto je
+# ve výchozím stavu vypnuto.
+SCRAPER_STOP_AFTER_KNOWN = int(os.getenv("SCRAPER_STOP_AFTER_KNOWN", "0"))
+
+# Podmíněné stahování stránky s hlášeními (ETag/Last-Modified a hash obsahu).
+# Pokud se stránka od posledního úspěšně zpracovaného stavu nezměnila,
+# celé zpracování se přeskočí.
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+HTTP_CACHE_FILE = os.getenv("HTTP_CACHE_FILE", "http_cache.json")
+
+# Sdílená HTTP vrstva (http_client.py): pool spojení s keep-alive a opakování
+# požadavků s exponenciálním čekáním a náhodným rozptylem
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+# Počet hostitelů, pro které se drží pool spojení, a max. spojení na hostitele
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "8"))
+# Timeouty pro jednotlivé hostitele ve tvaru "host=sekundy,host=sekundy",
+# např. "rozhlas.milesovice.cz=10,www.grznar.eu=20"
+HTTP_HOST_TIMEOUTS = {
+    host.strip(): float(seconds)
+    for host, _, seconds in (
+        item.partition("=") for item in os.getenv("HTTP_HOST_TIMEOUTS", "").split(",") if "=" in item
+    )
+}
+
+# Cache přepisů adresovaná hashem audia (a modelem/promptem). Umožní po
+# selhání odeslání navázat bez nového přepisu a pozná znovu nahrané audio.
+TRANSCRIPT_CACHE_ENABLED = os.getenv("TRANSCRIPT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+TRANSCRIPT_CACHE_FILE = os.getenv("TRANSCRIPT_CACHE_FILE", "transcript_cache.db")
+TRANSCRIPT_CACHE_MAX_MB = float(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "50"))
+TRANSCRIPT_CACHE_MAX_AGE_DAYS = float(os.getenv("TRANSCRIPT_CACHE_MAX_AGE_DAYS", "90"))
+
+# Akustické otisky (fingerprint.py, vyžaduje NumPy) odhalí znovu nahrané hlášení
+# pod jiným názvem nebo opakovanou znělku ještě před přepisem. Za shodu se považuje
+# podobnost alespoň FINGERPRINT_THRESHOLD (0.5 = nesouvisející audio, 1 = totožné).
+#   "link" - použije se přepis podobného hlášení z cache přepisů a hlášení se odešle
+#   "skip" - hlášení se neodešle a jen se označí jako zpracované
+FINGERPRINT_ENABLED = os.getenv("FINGERPRINT_ENABLED", "false").lower() in ("1", "true", "yes")
+FINGERPRINT_FILE = os.getenv("FINGERPRINT_FILE", "fingerprints.db")
+FINGERPRINT_THRESHOLD = float(os.getenv("FINGERPRINT_THRESHOLD", "0.85"))
+FINGERPRINT_ACTION = os.getenv("FINGERPRINT_ACTION", "link")
+# O kolik sekund se smí nahrávky posunout (jinak dlouhé ticho na začátku)
+FINGERPRINT_MAX_SHIFT_SECONDS = float(os.getenv("FINGERPRINT_MAX_SHIFT_SECONDS", "2"))
+FINGERPRINT_MAX_AGE_DAYS = float(os.getenv("FINGERPRINT_MAX_AGE_DAYS", "365"))
+
+# Úložiště stavu: "sqlite" (výchozí, indexovaná databáze v režimu WAL,
+# při prvním spuštění převezme data z processed_urls.json) nebo "json" (původní soubor)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "sqlite")
+# Po kolika dnech se zpracované URL přesune z nedávné historie do archivu otisků
+STATE_HOT_DAYS = int(os.getenv("STATE_HOT_DAYS", "30"))
+# Kolik nejvýše záznamů se archivuje při jednom běhu (zbytek se dorovná v dalších během)
+STATE_ARCHIVE_BATCH = int(os.getenv("STATE_ARCHIVE_BATCH", "1000"))
+
+# Rozpracovaná hlášení (stažené/konvertované soubory a přepisy čekající na odeslání)
+# se po tolika dnech bez úspěchu zahodí i se soubory
+ITEM_PROGRESS_MAX_AGE_DAYS = int(os.getenv("ITEM_PROGRESS_MAX_AGE_DAYS", "7"))
 
 # Konfigurace logování
 LOGGING_LEVEL = logging.INFO
@@ -20,10 +94,151 @@ WEB_API_ENDPOINT = os.getenv("WEB_API_ENDPOINT")
 # Konfigurace pro odesílání na web API
 # WEB_API_ENDPOINT = "https://localhost:7075/api/BroadcastAnnouncement/"
 
-# Validace, zda byly klíče načteny
-if not GEMINI_API_KEY:
-    raise ValueError("Chybí proměnná prostředí GEMINI_API_KEY.")
-if not WEB_API_KEY:
-    raise ValueError("Chybí proměnná prostředí WEB_API_KEY.")
-if not WEB_API_ENDPOINT:
-    raise ValueError("Chybí proměnná prostředí WEB_API_ENDPOINT.") 
\ No newline at end of file
+# Ověřování SSL certifikátu webového API. Pro lokální vývoj se self-signed
+# certifikátem je vypnuté (výchozí), na produkci ho lze zapnout.
+WEB_API_VERIFY_SSL = os.getenv("WEB_API_VERIFY_SSL", "false").lower() in ("1", "true", "yes")
+
+# Dávkové odesílání hotových přepisů jedním požadavkem (JSON pole) pro příjemce,
+# kteří pole přijímají. Dávka se odešle po dosažení max. velikosti nebo max. zdržení.
+WEB_API_BATCH_ENABLED = os.getenv("WEB_API_BATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+WEB_API_BATCH_ENDPOINT = os.getenv("WEB_API_BATCH_ENDPOINT", WEB_API_ENDPOINT)
+WEB_API_BATCH_MAX_SIZE = int(os.getenv("WEB_API_BATCH_MAX_SIZE", "20"))
+WEB_API_BATCH_MAX_DELAY = float(os.getenv("WEB_API_BATCH_MAX_DELAY", "5"))
+
+# Režim zpracování nových hlášení:
+#   "sequential" - hlášení se zpracovávají postupně jedno po druhém (výchozí)
+#   "pipeline"   - stahování, konverze, přepis a odeslání běží v oddělených
+#                  fázích s vlastními pracovními vlákny a frontami mezi nimi
+PROCESSING_MODE = os.getenv("PROCESSING_MODE", "sequential")
+
+# Počet souběžných pracovníků pro jednotlivé fáze pipeline.
+# Konverze je náročná na CPU, proto se ve výchozím stavu řídí počtem jader.
+# Síťové fáze omezujeme podle limitů vzdálených služeb.
+PIPELINE_DOWNLOAD_WORKERS = int(os.getenv("PIPELINE_DOWNLOAD_WORKERS", "4"))
+PIPELINE_CONVERT_WORKERS = int(os.getenv("PIPELINE_CONVERT_WORKERS", str(os.cpu_count() or 1)))
+PIPELINE_TRANSCRIBE_WORKERS = int(os.getenv("PIPELINE_TRANSCRIBE_WORKERS", "2"))
+PIPELINE_SEND_WORKERS = int(os.getenv("PIPELINE_SEND_WORKERS", "2"))
+# Maximální počet položek čekajících ve frontě mezi dvěma fázemi
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+
+# Asynchronní běh (async_runner.py): max. počet souběžných operací vůči
+# jednotlivým službám. Výchozí hodnoty odpovídají počtu pracovníků pipeline.
+ASYNC_DOWNLOAD_CONCURRENCY = int(os.getenv("ASYNC_DOWNLOAD_CONCURRENCY", str(PIPELINE_DOWNLOAD_WORKERS)))
+ASYNC_CONVERT_CONCURRENCY = int(os.getenv("ASYNC_CONVERT_CONCURRENCY", str(PIPELINE_CONVERT_WORKERS)))
+ASYNC_TRANSCRIBE_CONCURRENCY = int(os.getenv("ASYNC_TRANSCRIBE_CONCURRENCY", str(PIPELINE_TRANSCRIBE_WORKERS)))
+ASYNC_SEND_CONCURRENCY = int(os.getenv("ASYNC_SEND_CONCURRENCY", str(PIPELINE_SEND_WORKERS)))
+
+# Režim sledování (main.py --watch, async_runner.py): interval kontrol stránky
+# v sekundách. V hodinách, kdy hlášení obvykle vycházejí (podíl hlášení
+# v historii alespoň WATCH_ACTIVE_HOUR_SHARE), se kontroluje po WATCH_MIN_INTERVAL,
+# jinak se interval po každé kontrole bez nového hlášení násobí WATCH_BACKOFF
+# až do WATCH_MAX_INTERVAL.
+WATCH_MIN_INTERVAL = float(os.getenv("WATCH_MIN_INTERVAL", "60"))
+WATCH_MAX_INTERVAL = float(os.getenv("WATCH_MAX_INTERVAL", "1800"))
+WATCH_BACKOFF = float(os.getenv("WATCH_BACKOFF", "2"))
+WATCH_ACTIVE_HOUR_SHARE = float(os.getenv("WATCH_ACTIVE_HOUR_SHARE", "0.05"))
+
+# Způsob přípravy audia před nahráním do Gemini:
+#   "mp3"    - dekódování přes pydub a export do MP3 souboru (výchozí)
+#   "direct" - nahraje se původní OGG bez jakékoliv konverze
+#   "stream" - konverze na MP3 rourou ffmpeg stdin → stdout bez mezisouboru
+#   "speech" - FFmpeg ořízne ticho na začátku a konci, zkrátí dlouhé pauzy uvnitř
+#              (ticho podle SILENCE_MIN_MS a SILENCE_THRESH_DBFS) a uloží mono
+#              Opus optimalizovaný pro řeč (menší upload i méně účtovaných sekund)
+TRANSCODE_MODE = os.getenv("TRANSCODE_MODE", "mp3")
+# Vzorkovací frekvence (8000, 12000, 16000, 24000 nebo 48000 Hz) a datový tok Opus
+# v režimu "speech" a kolik ticha se ponechá v místě každé zkrácené pauzy
+SPEECH_SAMPLE_RATE = int(os.getenv("SPEECH_SAMPLE_RATE", "16000"))
+SPEECH_BITRATE = os.getenv("SPEECH_BITRATE", "24k")
+SPEECH_KEEP_SILENCE_MS = int(os.getenv("SPEECH_KEEP_SILENCE_MS", "300"))
+# Cesta ke spustitelnému souboru FFmpeg pro režim "stream"
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+
+# Audio mezi fázemi v paměti místo souborů v audio_files/: stahování teče rovnou
+# do FFmpeg (stdin) a výsledek se drží v SpooledTemporaryFile, který se na disk
+# přelije až nad AUDIO_SPOOL_MAX_MB. Šetří zápisy na SD kartu, stažené OGG se ale
+# neuchovává, takže po pádu se hlášení stahuje znovu.
+AUDIO_IN_MEMORY = os.getenv("AUDIO_IN_MEMORY", "false").lower() in ("1", "true", "yes")
+AUDIO_SPOOL_MAX_MB = float(os.getenv("AUDIO_SPOOL_MAX_MB", "16"))
+
+# Stahování OGG na disk: data se zapisují do souboru .part a po přerušení se
+# navazuje požadavkem Range od již stažené části (i v dalším běhu). Velikost
+# bloku se přizpůsobuje rychlosti spojení v rozsahu MIN až MAX (KiB).
+# DOWNLOAD_RESUME_ATTEMPTS je počet navázání v rámci jednoho stahování.
+DOWNLOAD_CHUNK_MIN_KB = int(os.getenv("DOWNLOAD_CHUNK_MIN_KB", "64"))
+DOWNLOAD_CHUNK_MAX_KB = int(os.getenv("DOWNLOAD_CHUNK_MAX_KB", "1024"))
+DOWNLOAD_RESUME_ATTEMPTS = int(os.getenv("DOWNLOAD_RESUME_ATTEMPTS", "3"))
+
+# Audio do této velikosti (MB) se posílá do Gemini přímo v požadavku bez
+# nahrání přes Files API (limit celého požadavku je 20 MB)
+TRANSCRIBE_INLINE_MAX_MB = float(os.getenv("TRANSCRIBE_INLINE_MAX_MB", "15"))
+
+# Limity externích služeb na straně klienta (token bucket, 0 = bez omezení).
+# Gemini: požadavky a tokeny za minutu podle kvóty projektu, webové API: požadavky za minutu.
+# Počet požadavků na Gemini se ve výchozím stavu neomezuje, kvóty se liší podle projektu.
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "0"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "250000"))
+WEB_API_RPM = float(os.getenv("WEB_API_RPM", "60"))
+# Kolik požadavků smí odejít najednou bez čekání
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "1"))
+# Po odpovědi 429 se rychlost snižuje na polovinu, nejníže na tento podíl limitu
+RATE_LIMIT_MIN_FACTOR = float(os.getenv("RATE_LIMIT_MIN_FACTOR", "0.1"))
+# Kolikrát zopakovat přepis odmítnutý kvůli překročení kvóty (429)
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "3"))
+
+# Přepis dlouhých hlášení po úsecích rozdělených v tichu. Úseky se přepisují
+# souběžně a neúspěšný úsek se opakuje samostatně. Kratší audio se přepíše najednou.
+TRANSCRIBE_CHUNKING = os.getenv("TRANSCRIBE_CHUNKING", "false").lower() in ("1", "true", "yes")
+TRANSCRIBE_CHUNK_MAX_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_MAX_SECONDS", "120"))
+TRANSCRIBE_CHUNK_WORKERS = int(os.getenv("TRANSCRIBE_CHUNK_WORKERS", "3"))
+TRANSCRIBE_CHUNK_RETRIES = int(os.getenv("TRANSCRIBE_CHUNK_RETRIES", "2"))
+
+# Backend přepisu:
+#   "gemini" - Gemini API (výchozí)
+#   "local"  - lokální model faster-whisper na CPU (pip install faster-whisper),
+#              bez síťového spojení, kvót a plateb za přepis
+#   "auto"   - krátká hlášení lokálně, dlouhá hlášení a přetečení fronty
+#              lokálního přepisu do Gemini (viz TRANSCRIBE_LOCAL_MAX_*)
+TRANSCRIBE_BACKEND = os.getenv("TRANSCRIBE_BACKEND", "gemini")
+# Model faster-whisper (název nebo cesta k převedenému modelu), jazyk a přesnost výpočtu na CPU
+LOCAL_WHISPER_MODEL = os.getenv("LOCAL_WHISPER_MODEL", "small")
+LOCAL_WHISPER_LANGUAGE = os.getenv("LOCAL_WHISPER_LANGUAGE", "cs")
+LOCAL_WHISPER_COMPUTE_TYPE = os.getenv("LOCAL_WHISPER_COMPUTE_TYPE", "int8")
+# Počet procesů s vlastní instancí modelu (jádra CPU se mezi ně rozdělí) a počet
+# úseků jednoho hlášení dekódovaných v jedné dávce (1 = bez dávkování)
+LOCAL_TRANSCRIBE_WORKERS = int(os.getenv("LOCAL_TRANSCRIBE_WORKERS", "1"))
+LOCAL_TRANSCRIBE_BATCH_SIZE = int(os.getenv("LOCAL_TRANSCRIBE_BATCH_SIZE", "8"))
+# Režim "auto": lokálně se přepisuje audio nejvýše této délky (s), a to jen
+# tehdy, když na lokální přepis čeká méně než TRANSCRIBE_LOCAL_MAX_QUEUE hlášení
+TRANSCRIBE_LOCAL_MAX_SECONDS = float(os.getenv("TRANSCRIBE_LOCAL_MAX_SECONDS", "180"))
+TRANSCRIBE_LOCAL_MAX_QUEUE = int(os.getenv("TRANSCRIBE_LOCAL_MAX_QUEUE", "2"))
+# Překryv úseků (ms), pokud se v úseku nenajde ticho a řeže se natvrdo
+TRANSCRIBE_CHUNK_OVERLAP_MS = int(os.getenv("TRANSCRIBE_CHUNK_OVERLAP_MS", "1500"))
+# Za ticho se považuje úsek alespoň SILENCE_MIN_MS dlouhý a tišší než SILENCE_THRESH_DBFS
+SILENCE_MIN_MS = int(os.getenv("SILENCE_MIN_MS", "700"))
+SILENCE_THRESH_DBFS = float(os.getenv("SILENCE_THRESH_DBFS", "-40"))
+
+# Metriky fází zpracování ve formátu Prometheus. V trvalém běhu (--watch,
+# async_runner.py) je vystaví HTTP endpoint /metrics na METRICS_PORT (0 = vypnuto),
+# v režimu CRON se po každém běhu zapíší do METRICS_TEXTFILE pro node_exporter.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE", "")
+
+def validate_config() -> None:
+    """
+    Ověří, že byly načteny klíče a endpoint potřebné ke zpracování hlášení.
+
+    Nevolá se při importu, ale až když je co přepisovat a odesílat, aby běh
+    bez nových hlášení nic dalšího nepotřeboval.
+
+    Raises:
+        ValueError: Pokud některá z povinných proměnných prostředí chybí.
+    """
+    # Čistě lokální přepis Gemini nepotřebuje
+    if not GEMINI_API_KEY and TRANSCRIBE_BACKEND != "local":
+        raise ValueError("Chybí proměnná prostředí GEMINI_API_KEY.")
+    if not WEB_API_KEY:
+        raise ValueError("Chybí proměnná prostředí WEB_API_KEY.")
+    if not WEB_API_ENDPOINT:
+        raise ValueError("Chybí proměnná prostředí WEB_API_ENDPOINT.") 
\ No newline at end of file
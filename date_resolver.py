@@ -0,0 +1,146 @@
+import logging
+import re
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Mapping, Sequence
+from urllib.parse import unquote
+
+from config import ANNOUNCEMENT_DATE_PATTERN
+from sources import Source, source_for_url
+
+# Čas vysílání se z názvu souboru nepozná, hlášení dostávají poledne jako dosud
+_BROADCAST_HOUR = 12
+# Další hlášení téhož dne dostane o tento krok pozdější čas, aby měla různé časy
+_SAME_DAY_STEP = timedelta(minutes=1)
+# Nejnovější hlášení smí mít datum nejvýše o tolik dní v budoucnosti (časová pásma),
+# jinak patří do minulého roku
+_TODAY_TOLERANCE = timedelta(days=1)
+# Starší hlášení smí mít datum o tolik dní pozdější než následující hlášení na
+# stránce (nedůsledné řazení), větší skok znamená přechod přes Nový rok
+_ORDER_TOLERANCE = timedelta(days=31)
+# Kolik let zpět se hledá platné datum (29. 2. existuje jen v přestupném roce)
+_MAX_YEARS_BACK = 8
+
+# Data hlášení z posledního vyhodnocení stránek (viz resolve_pages)
+_resolved: Dict[str, datetime | None] = {}
+
+
+@lru_cache(maxsize=32)
+def _compiled(pattern: str) -> re.Pattern:
+    return re.compile(pattern)
+
+
+def _infer_date(day: int, month: int, reference: date, tolerance: timedelta) -> date | None:
+    """Vrátí nejbližší platné datum day.month, které není pozdější než reference + tolerance."""
+    for year in range(reference.year, reference.year - _MAX_YEARS_BACK, -1):
+        try:
+            candidate = date(year, month, day)
+        except ValueError:
+            continue
+        if candidate <= reference + tolerance:
+            return candidate
+    return None
+
+
+def resolve_broadcast_dates(filenames: Sequence[str], pattern: str = ANNOUNCEMENT_DATE_PATTERN,
+                            today: date | None = None) -> List[datetime | None]:
+    """
+    Určí data vysílání všech hlášení jedné stránky najednou.
+
+    Názvy souborů obvykle obsahují jen den a měsíc ('Hlášení 12.3..ogg'). Rok
+    se odvodí od nejnovějšího hlášení: to nesmí být v budoucnosti, každé starší
+    hlášení pak nesmí být (až na drobné nepřesnosti řazení) pozdější než
+    hlášení po něm, takže při zpětném zpracování se přes leden přejde do
+    minulého roku. Rok uvedený v názvu má přednost. Více hlášení téhož dne
+    dostane postupně časy 12:00, 12:01, ... v pořadí na stránce.
+
+    Args:
+        filenames (Sequence[str]): Názvy souborů seřazené od nejstaršího (pořadí ze scraperu).
+        pattern (str): Regulární výraz se skupinami day, month a volitelně year
+            (viz sources.Source.date_pattern).
+        today (date | None): Dnešní datum, výchozí je date.today().
+
+    Returns:
+        List[datetime | None]: Data vysílání ve stejném pořadí, None u názvu bez platného data.
+    """
+    regex = _compiled(pattern)
+    reference = today or date.today()
+    tolerance = _TODAY_TOLERANCE
+    dates: List[date | None] = [None] * len(filenames)
+
+    # Od nejnovějšího k nejstaršímu, rok každého hlášení navazuje na novější
+    for index in range(len(filenames) - 1, -1, -1):
+        match = regex.search(filenames[index])
+        if not match:
+            logging.error(f"Nepodařilo se extrahovat datum z názvu souboru: {filenames[index]}")
+            continue
+        groups = match.groupdict()
+        day, month = int(groups["day"]), int(groups["month"])
+        if groups.get("year"):
+            try:
+                resolved = date(int(groups["year"]), month, day)
+            except ValueError:
+                resolved = None
+        else:
+            resolved = _infer_date(day, month, reference, tolerance)
+        if resolved is None:
+            logging.error(f"Nalezeno neplatné datum v názvu souboru: {filenames[index]}")
+            continue
+        dates[index] = resolved
+        reference, tolerance = resolved, _ORDER_TOLERANCE
+
+    results: List[datetime | None] = []
+    per_day: Dict[date, int] = {}
+    for resolved in dates:
+        if resolved is None:
+            results.append(None)
+            continue
+        order = per_day.get(resolved, 0)
+        per_day[resolved] = order + 1
+        results.append(datetime(resolved.year, resolved.month, resolved.day, _BROADCAST_HOUR) + order * _SAME_DAY_STEP)
+    repeated = sum(1 for count in per_day.values() if count > 1)
+    if repeated:
+        logging.debug(f"{repeated} dní má více hlášení, dostala postupné časy vysílání.")
+    return results
+
+
+def _url_filename(url: str) -> str:
+    return unquote(url.split('/')[-1])
+
+
+def resolve_pages(pages: Mapping[Source, List[str]], today: date | None = None) -> Dict[str, datetime | None]:
+    """
+    Určí data vysílání všech hlášení ze stránek zdrojů a zapamatuje si je pro odeslání.
+
+    Volá se hned po stažení stránek, před stahováním audia: hlášení bez
+    platného data lze vyřadit dřív, než se stáhne a přepíše.
+
+    Args:
+        pages (Mapping[Source, List[str]]): URL hlášení jednotlivých zdrojů seřazená od nejstaršího.
+        today (date | None): Dnešní datum, výchozí je date.today().
+
+    Returns:
+        Dict[str, datetime | None]: Datum vysílání podle URL hlášení.
+    """
+    global _resolved
+    resolved = {}
+    for source, urls in pages.items():
+        dates = resolve_broadcast_dates([_url_filename(url) for url in urls], source.date_pattern, today)
+        resolved.update(zip(urls, dates))
+    _resolved = resolved
+    return resolved
+
+
+def broadcast_datetime(url: str) -> datetime | None:
+    """
+    Vrátí datum vysílání hlášení.
+
+    Použije výsledek posledního resolve_pages(), hlášení mimo něj (např. při
+    přímém volání zpracování) vyhodnotí samostatně podle vzoru jeho zdroje.
+
+    Args:
+        url (str): URL hlášení.
+    """
+    if url in _resolved:
+        return _resolved[url]
+    return resolve_broadcast_dates([_url_filename(url)], source_for_url(url).date_pattern)[0]
@@ -0,0 +1,209 @@
+import logging
+import sqlite3
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from config import (
+    FFMPEG_BINARY,
+    FINGERPRINT_ENABLED,
+    FINGERPRINT_FILE,
+    FINGERPRINT_THRESHOLD,
+    FINGERPRINT_MAX_SHIFT_SECONDS,
+    FINGERPRINT_MAX_AGE_DAYS,
+)
+
+# Akustický otisk podle Haitsmy a Kalkera: audio se převede na mono 5512 Hz,
+# v překrývajících se oknech se spočítá energie 33 pásem 300-2000 Hz a každé
+# okno se zakóduje do 32 bitů podle znaménka změny rozdílu sousedních pásem
+# oproti předchozímu oknu. Otisk přežije překódování i změnu hlasitosti.
+# NumPy se načítá až při výpočtu, běh bez nových hlášení ho nepotřebuje.
+SAMPLE_RATE = 5512
+FRAME_SIZE = 2048
+HOP_SIZE = 256
+_BANDS = 33
+_MIN_FREQ, _MAX_FREQ = 300, 2000
+# Kratší audio (v oknech, zhruba sekunda) se neotiskuje, shoda by byla náhodná
+_MIN_FRAMES = 20
+# Porovnávají se jen nahrávky, jejichž délky se liší nejvýše o tento podíl
+_LENGTH_TOLERANCE = 0.2
+
+_index: "FingerprintIndex | None" = None
+_index_lock = threading.Lock()
+
+
+def _decode_pcm(audio: str | BinaryIO) -> bytes | None:
+    """Dekóduje audio (cesta nebo otevřený soubor) přes FFmpeg na 16bit mono PCM."""
+    command = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-i",
+               audio if isinstance(audio, str) else "pipe:0",
+               "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1"]
+    data = None
+    if not isinstance(audio, str):
+        audio.seek(0)
+        data = audio.read()
+        audio.seek(0)
+    try:
+        result = subprocess.run(command, input=data, capture_output=True, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        stderr = getattr(e, "stderr", b"") or b""
+        logging.error(f"Nepodařilo se dekódovat audio pro otisk: {e} {stderr.decode('utf-8', errors='replace')}")
+        return None
+    return result.stdout
+
+
+def compute_fingerprint(audio: str | BinaryIO):
+    """
+    Spočítá akustický otisk audia.
+
+    Args:
+        audio (str | BinaryIO): Cesta k souboru, nebo otevřený soubor (po výpočtu se vrátí na začátek).
+
+    Returns:
+        numpy.ndarray | None: Pole 32bitových otisků oken (uint32), nebo None,
+            pokud audio nelze dekódovat nebo je příliš krátké.
+    """
+    import numpy as np
+
+    pcm = _decode_pcm(audio)
+    if pcm is None:
+        return None
+    samples = np.frombuffer(pcm[:len(pcm) // 2 * 2], dtype="<i2").astype(np.float32)
+    frames = 1 + (len(samples) - FRAME_SIZE) // HOP_SIZE
+    if frames < _MIN_FRAMES + 1:
+        return None
+
+    windows = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)[::HOP_SIZE][:frames]
+    spectrum = np.abs(np.fft.rfft(windows * np.hanning(FRAME_SIZE), axis=1)) ** 2
+    edges = np.geomspace(_MIN_FREQ, _MAX_FREQ, _BANDS + 1) * FRAME_SIZE / SAMPLE_RATE
+    energies = np.add.reduceat(spectrum, edges.astype(int), axis=1)[:, :_BANDS]
+
+    band_diff = energies[:, :-1] - energies[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+    return np.packbits(bits, axis=1, bitorder="little").view("<u4").ravel()
+
+
+def similarity(a, b, max_shift: int = 0) -> float:
+    """
+    Podobnost dvou otisků: 1 - podíl rozdílných bitů při nejlepším posunu.
+
+    Nesouvisející nahrávky mají podobnost kolem 0.5, stejná nahrávka po
+    překódování obvykle nad 0.9.
+
+    Args:
+        a, b (numpy.ndarray): Otisky z compute_fingerprint().
+        max_shift (int): Nejvyšší zkoušený posun v oknech (jiné ticho na začátku).
+
+    Returns:
+        float: Podobnost v rozsahu 0 až 1.
+    """
+    import numpy as np
+
+    longest = max(len(a), len(b))
+    best = 0.0
+    for shift in range(-max_shift, max_shift + 1):
+        x, y = (a[shift:], b) if shift >= 0 else (a, b[-shift:])
+        overlap = min(len(x), len(y))
+        # Překryv musí pokrývat většinu delší nahrávky, jinak nejde o stejné hlášení
+        if overlap < longest * (1 - _LENGTH_TOLERANCE):
+            continue
+        differing = np.unpackbits(np.bitwise_xor(x[:overlap], y[:overlap]).view(np.uint8)).sum()
+        best = max(best, 1 - differing / (overlap * 32))
+    return best
+
+
+@dataclass
+class FingerprintMatch:
+    """
+    Nalezená podobná nahrávka.
+
+    Attributes:
+        url (str): URL dříve zpracovaného hlášení.
+        similarity (float): Podobnost otisků (viz similarity()).
+        transcript_key (str | None): Klíč jeho přepisu v cache přepisů.
+    """
+    url: str
+    similarity: float
+    transcript_key: str | None
+
+
+class FingerprintIndex:
+    """
+    Index akustických otisků zpracovaných hlášení v SQLite.
+
+    Kandidáti se vybírají podle délky (indexovaný sloupec), s otiskem
+    se tak porovná jen malá část historie. Záznamy starší než
+    `max_age_seconds` se při ukládání mažou.
+    """
+
+    def __init__(self, path: str, threshold: float = FINGERPRINT_THRESHOLD,
+                 max_shift_seconds: float = FINGERPRINT_MAX_SHIFT_SECONDS,
+                 max_age_seconds: float = FINGERPRINT_MAX_AGE_DAYS * 24 * 3600):
+        self.path = path
+        self.threshold = threshold
+        self.max_shift = int(max_shift_seconds * SAMPLE_RATE / HOP_SIZE)
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    url TEXT PRIMARY KEY,
+                    frames INTEGER NOT NULL,
+                    fingerprint BLOB NOT NULL,
+                    transcript_key TEXT,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_fingerprints_frames ON fingerprints(frames);
+            """)
+
+    def find(self, fingerprint) -> FingerprintMatch | None:
+        """
+        Najde nejpodobnější uloženou nahrávku s podobností alespoň `threshold`.
+        """
+        import numpy as np
+
+        frames = len(fingerprint)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, fingerprint, transcript_key FROM fingerprints WHERE frames BETWEEN ? AND ?",
+                (int(frames * (1 - _LENGTH_TOLERANCE)), int(frames / (1 - _LENGTH_TOLERANCE)) + 1),
+            ).fetchall()
+        best = None
+        for url, blob, transcript_key in rows:
+            score = similarity(fingerprint, np.frombuffer(blob, dtype="<u4"), self.max_shift)
+            if score >= self.threshold and (best is None or score > best.similarity):
+                best = FingerprintMatch(url, score, transcript_key)
+        return best
+
+    def add(self, url: str, fingerprint, transcript_key: str | None) -> None:
+        """
+        Uloží otisk zpracovaného hlášení a odstraní prošlé záznamy.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fingerprints (url, frames, fingerprint, transcript_key, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, len(fingerprint), fingerprint.astype("<u4").tobytes(), transcript_key, now),
+            )
+            self._conn.execute("DELETE FROM fingerprints WHERE created_at < ?", (now - self.max_age_seconds,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def get_fingerprint_index() -> FingerprintIndex | None:
+    """
+    Vrátí sdílený index otisků podle konfigurace, nebo None, pokud je vypnutý.
+    """
+    global _index
+    if not FINGERPRINT_ENABLED:
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = FingerprintIndex(FINGERPRINT_FILE)
+        return _index
@@ -0,0 +1,117 @@
+import os
+import json
+import logging
+import threading
+from typing import Dict
+
+
+class ValidatorCache:
+    """
+    Perzistentní cache HTTP validátorů (ETag, Last-Modified) a hashů obsahu stránek.
+
+    Validátory nové verze stránky se nejprve drží jako "čekající" a do cache
+    se potvrdí až voláním commit(), typicky po úspěšném zpracování všech
+    hlášení ze stránky. Pokud zpracování selže, další běh dostane stránku
+    znovu celou a neúspěšná hlášení se zopakují. Na disk se cache zapisuje
+    jen v commit(), a to pouze při změně (nové validátory nebo počítadla).
+
+    Statistiky:
+        hits        - stránka se nezměnila (304 Not Modified nebo stejný hash obsahu)
+        misses      - stránka se změnila nebo ještě nebyla v cache
+        bytes_saved - bajty, které se díky 304 nemusely přenést
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+        self._pending: Dict[str, dict] = {}
+        self._stats = {"hits": 0, "misses": 0, "bytes_saved": 0}
+        # Zda se od posledního uložení změnily potvrzené validátory nebo počítadla
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._entries = data.get("entries", {})
+            self._stats.update(data.get("stats", {}))
+        except (IOError, json.JSONDecodeError) as e:
+            logging.warning(f"Nepodařilo se načíst HTTP cache {self.path}, začínám s prázdnou: {e}")
+
+    def _save(self) -> None:
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"entries": self._entries, "stats": self._stats}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except IOError as e:
+            logging.error(f"Chyba při ukládání HTTP cache: {e}")
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        Vrátí hlavičky pro podmíněný požadavek na základě potvrzené verze stránky.
+        """
+        with self._lock:
+            entry = self._entries.get(url, {})
+            headers = {}
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+            return headers
+
+    def record_not_modified(self, url: str) -> None:
+        """Zaznamená odpověď 304 Not Modified."""
+        with self._lock:
+            self._stats["hits"] += 1
+            self._stats["bytes_saved"] += self._entries.get(url, {}).get("content_length", 0)
+            self._dirty = True
+
+    def check_content(self, url: str, content_hash: str, content_length: int,
+                      etag: str | None = None, last_modified: str | None = None) -> bool:
+        """
+        Porovná hash staženého obsahu s potvrzenou verzí stránky.
+
+        Při změně si zapamatuje nové validátory jako čekající na commit().
+
+        Returns:
+            bool: True, pokud se obsah od potvrzené verze nezměnil.
+        """
+        with self._lock:
+            self._dirty = True
+            if self._entries.get(url, {}).get("content_hash") == content_hash:
+                self._stats["hits"] += 1
+                return True
+            self._stats["misses"] += 1
+            self._pending[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "content_hash": content_hash,
+                "content_length": content_length,
+            }
+            return False
+
+    def commit(self, url: str) -> None:
+        """
+        Potvrdí čekající verzi stránky jako plně zpracovanou a uloží změny cache.
+
+        Volá se i pro nezměněnou stránku (viz main.finish_idle_run), aby se
+        uložila počítadla z tohoto běhu.
+        """
+        with self._lock:
+            entry = self._pending.pop(url, None)
+            if entry is not None and entry != self._entries.get(url):
+                self._entries[url] = entry
+                self._dirty = True
+            if self._dirty:
+                self._save()
+
+    def stats(self) -> Dict[str, int]:
+        """Vrátí kopii počítadel hits/misses/bytes_saved."""
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,131 @@
+import logging
+import random
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import (
+    HTTP_RETRIES,
+    HTTP_BACKOFF_FACTOR,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_HOST_TIMEOUTS,
+)
+
+# Stavové kódy, při kterých se opakuje každý požadavek (GET/HEAD/...)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# POST není idempotentní - opakujeme ho jen tehdy, když server požadavek
+# zjevně nepřevzal ke zpracování (přetížení, nedostupná aplikace za proxy)
+POST_RETRY_STATUSES = (429, 502, 503)
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+class JitteredRetry(Retry):
+    """
+    Retry s exponenciálním čekáním a náhodným rozptylem ("full jitter").
+
+    Náhodný rozptyl zabrání tomu, aby se souběžné požadavky po výpadku
+    opakovaly ve stejný okamžik.
+    """
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff > 0 else 0
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method and method.upper() == "POST":
+            return bool(self.total) and status_code in POST_RETRY_STATUSES
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def _build_retry() -> Retry:
+    return JitteredRetry(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        read=HTTP_RETRIES,
+        status=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=True,
+        # Po vyčerpání pokusů vrátíme poslední odpověď, chybu vyvolá raise_for_status()
+        raise_on_status=False,
+    )
+
+
+def get_session() -> requests.Session:
+    """
+    Vrátí sdílenou HTTP session s poolem spojení (keep-alive) a opakováním požadavků.
+
+    Session drží pro každého hostitele vlastní pool spojení, takže opakované
+    požadavky na stejný server nepotřebují nový TCP+TLS handshake.
+
+    Returns:
+        requests.Session: Sdílená session pro celý proces.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_CONNECTIONS,
+                pool_maxsize=HTTP_POOL_MAXSIZE,
+                max_retries=_build_retry(),
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def close_session() -> None:
+    """Zavře sdílenou session a všechna otevřená spojení."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def timeout_for(url: str, default: float) -> float:
+    """
+    Vrátí timeout pro daného hostitele z HTTP_HOST_TIMEOUTS, jinak výchozí hodnotu.
+
+    Args:
+        url (str): URL požadavku.
+        default (float): Timeout použitý, pokud hostitel nemá vlastní nastavení.
+
+    Returns:
+        float: Timeout v sekundách.
+    """
+    host = urlsplit(url).hostname or ""
+    return HTTP_HOST_TIMEOUTS.get(host, default)
+
+
+def request(method: str, url: str, timeout: float = 30, **kwargs) -> requests.Response:
+    """
+    Provede HTTP požadavek přes sdílenou session.
+
+    Args:
+        method (str): HTTP metoda.
+        url (str): URL požadavku.
+        timeout (float): Výchozí timeout, pokud hostitel nemá vlastní v HTTP_HOST_TIMEOUTS.
+        **kwargs: Další parametry pro requests.Session.request.
+
+    Returns:
+        requests.Response: Odpověď serveru.
+    """
+    logging.debug(f"HTTP {method} {url}")
+    return get_session().request(method, url, timeout=timeout_for(url, timeout), **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
@@ -0,0 +1,162 @@
+import logging
+import re
+from html.parser import HTMLParser
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+# Velikost části textu, po kterých se stránka předává parseru
+CHUNK_SIZE = 16 * 1024
+
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+_HEADER_CHARSET = re.compile(r'charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+def decode_html(content: bytes, content_type: str | None = None) -> str:
+    """
+    Dekóduje HTML stránku podle kódování z hlavičky, z <meta charset>, jinak UTF-8.
+
+    Args:
+        content (bytes): Tělo odpovědi.
+        content_type (str | None): Hodnota hlavičky Content-Type.
+
+    Returns:
+        str: Dekódovaný text stránky.
+    """
+    candidates = []
+    header_match = _HEADER_CHARSET.search(content_type or '')
+    if header_match:
+        candidates.append(header_match.group(1))
+    match = _META_CHARSET.search(content[:2048])
+    if match:
+        candidates.append(match.group(1).decode('ascii', errors='ignore'))
+    candidates.append('utf-8')
+    for encoding in candidates:
+        try:
+            return content.decode(encoding)
+        except (LookupError, UnicodeDecodeError):
+            continue
+    # Česká stránka v neznámém kódování - windows-1250 je nejpravděpodobnější
+    return content.decode('cp1250', errors='replace')
+
+
+def _is_announcement(href: str, prefix: str, exclude_suffixes: Tuple[str, ...]) -> bool:
+    return href.startswith(prefix) and not href.endswith(exclude_suffixes)
+
+
+class _AnchorParser(HTMLParser):
+    """
+    Streamovací parser, který si z dokumentu pamatuje jen odpovídající href odkazů.
+    """
+
+    def __init__(self, prefix: str, exclude_suffixes: Tuple[str, ...]):
+        super().__init__(convert_charrefs=True)
+        self.prefix = prefix
+        self.exclude_suffixes = exclude_suffixes
+        self.found: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a':
+            return
+        # Při opakovaném atributu platí poslední hodnota, stejně jako v BeautifulSoup
+        href = dict(attrs).get('href')
+        if href is not None and _is_announcement(href, self.prefix, self.exclude_suffixes):
+            self.found.append(href)
+
+
+def _iter_htmlparser(chunks: Iterable[str], prefix: str, exclude_suffixes: Tuple[str, ...]) -> Iterator[str]:
+    parser = _AnchorParser(prefix, exclude_suffixes)
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.found:
+            yield from parser.found
+            parser.found.clear()
+    parser.close()
+    yield from parser.found
+
+
+def _iter_lxml(chunks: Iterable[str], prefix: str, exclude_suffixes: Tuple[str, ...]) -> Iterator[str]:
+    from lxml import etree
+
+    parser = etree.HTMLPullParser(events=('start',), tag='a')
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            href = element.get('href')
+            if href is not None and _is_announcement(href, prefix, exclude_suffixes):
+                yield href
+    parser.close()
+    for _, element in parser.read_events():
+        href = element.get('href')
+        if href is not None and _is_announcement(href, prefix, exclude_suffixes):
+            yield href
+
+
+def _lxml_available() -> bool:
+    try:
+        import lxml.etree  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def resolve_backend(backend: str = "auto") -> str:
+    """
+    Určí backend pro extrakci odkazů.
+
+    Args:
+        backend (str): "lxml", "htmlparser", nebo "auto" (lxml, pokud je nainstalované).
+
+    Returns:
+        str: Skutečně použitý backend.
+    """
+    if backend == "auto":
+        return "lxml" if _lxml_available() else "htmlparser"
+    if backend == "lxml" and not _lxml_available():
+        logging.warning("Backend lxml není nainstalovaný, používám html.parser.")
+        return "htmlparser"
+    return backend
+
+
+def _chunks(text: str, size: int = CHUNK_SIZE) -> Iterator[str]:
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+def iter_announcement_links(html: str | Iterable[str], prefix: str,
+                            exclude_suffixes: Tuple[str, ...] = ('.xml',),
+                            backend: str = "auto",
+                            is_known: Callable[[str], bool] | None = None,
+                            stop_after_known: int = 0) -> Iterator[str]:
+    """
+    Postupně vrací href odkazů na hlášení v pořadí, v jakém jsou na stránce.
+
+    Args:
+        html (str | Iterable[str]): Celý text stránky, nebo její postupně přicházející části.
+        prefix (str): Začátek href, který odkaz na hlášení musí mít.
+        exclude_suffixes (Tuple[str, ...]): Přípony, které se přeskakují (např. '.xml').
+        backend (str): "lxml", "htmlparser", nebo "auto".
+        is_known (Callable[[str], bool] | None): Zjistí, zda byl odkaz už zpracován.
+            Přijímá href tak, jak je na stránce.
+        stop_after_known (int): Po kolika po sobě jdoucích již zpracovaných odkazech
+            se parsování ukončí (stránka je řazena od nejnovějšího). 0 = neukončovat.
+
+    Yields:
+        str: Hodnota href odpovídajícího odkazu.
+    """
+    chunks = _chunks(html) if isinstance(html, str) else html
+    if resolve_backend(backend) == "lxml":
+        links = _iter_lxml(chunks, prefix, exclude_suffixes)
+    else:
+        links = _iter_htmlparser(chunks, prefix, exclude_suffixes)
+
+    known_in_row = 0
+    for href in links:
+        yield href
+        if not (is_known and stop_after_known):
+            continue
+        if is_known(href):
+            known_in_row += 1
+            if known_in_row >= stop_after_known:
+                logging.info(f"Nalezeno {known_in_row} již zpracovaných hlášení po sobě, starší odkazy přeskakuji.")
+                return
+        else:
+            known_in_row = 0
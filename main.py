@@ -1,9 +1,28 @@
+import argparse
 import logging
 import os
-from scraper import fetch_announcements
-from audio_processor import download_and_process_audio
-from state_manager import get_processed_urls, save_processed_url, cleanup_old_urls
-from config import LOGGING_LEVEL
+from scraper import fetch_all_announcements, confirm_page_processed
+from audio_processor import (
+    download_and_process_audio,
+    prepare_announcement,
+    submit_announcement,
+    remove_temp_files,
+    remove_stale_downloads,
+)
+from api_client import AnnouncementBatcher
+from state_manager import (
+    get_processed_urls,
+    get_processed_timestamps,
+    save_processed_url,
+    cleanup_old_urls,
+    is_processed,
+    cleanup_stale_progress,
+)
+from scheduler import AdaptiveScheduler, install_signal_handlers, stop_requested, wait_for_stop
+from metrics import export_run_metrics, start_http_server
+from sources import fair_order, local_filename
+from date_resolver import resolve_pages
+from config import LOGGING_LEVEL, PROCESSING_MODE, ITEM_PROGRESS_MAX_AGE_DAYS, WEB_API_BATCH_ENABLED, validate_config
 
 # Nastavení logování
 logging.basicConfig(level=LOGGING_LEVEL, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -14,6 +33,9 @@ def main():
     
     Nová logika podporuje více hlášení za den tím, že si udržuje sadu všech 
     zpracovaných URL místo jen posledního souboru.
+
+    Returns:
+        int: Počet nalezených nových hlášení.
     """
     logging.info("Spouštím proces zpracování hlášení rozhlasu.")
 
@@ -21,43 +43,194 @@ def main():
     os.makedirs("audio_files/ogg", exist_ok=True)
     os.makedirs("audio_files/mp3", exist_ok=True)
 
+    new_urls = []
     try:
-        all_urls = fetch_announcements()
-        if not all_urls:
-            return
+        # Stránky všech zdrojů (obcí) se stahují souběžně
+        pages = fetch_all_announcements(is_known=is_processed)
+        if not any(pages.values()):
+            finish_idle_run(pages)
+            return 0
 
         # Načteme sadu všech zpracovaných URL
         processed_urls = get_processed_urls()
         logging.info(f"Celkem máme {len(processed_urls)} zpracovaných URL v historii.")
 
-        # Najdeme nová URL - ta, která ještě nejsou v sadě zpracovaných
-        new_urls = [url for url in all_urls if url not in processed_urls]
+        # Data vysílání určíme pro celé stránky najednou; hlášení bez platného data
+        # vyřadíme dřív, než se stáhne jeho audio
+        dates = resolve_pages(pages)
+
+        # Najdeme nová URL - ta, která nejsou v nedávné historii ani v archivu
+        new_by_source = {
+            source: [url for url in urls
+                     if not is_processed(url) and dates[url] is not None]
+            for source, urls in pages.items()
+        }
+        # Hlášení všech zdrojů jdou do jednoho zpracování, zdroje se v něm střídají
+        new_urls = fair_order(new_by_source)
 
         if new_urls:
             logging.info(f"Nalezeno {len(new_urls)} nových hlášení k zpracování.")
-            for url in new_urls:
-                filename = url.split('/')[-1]
-                logging.info(f"--- Zpracovávám: {filename} ---")
-                try:
-                    success = download_and_process_audio(url, filename)
-                    if success:
-                        save_processed_url(url)
-                        logging.info(f"✅ Úspěšně zpracováno a uloženo: {url}")
-                    else:
-                        logging.error(f"❌ Nepodařilo se zpracovat: {url}")
-                except Exception as e:
-                    logging.error(f"Při zpracování souboru {filename} došlo k chybě: {e}")
+            # Klíče ověřujeme až teď, běh bez nových hlášení je nepotřebuje
+            validate_config()
+            if PROCESSING_MODE == "pipeline":
+                # Import až zde, sekvenční režim pipeline nepotřebuje
+                from pipeline import run_pipeline
+                run_pipeline(new_urls, on_success=save_processed_url)
+            else:
+                process_sequentially(new_urls)
         else:
             logging.info("Nebyly nalezeny žádné nové hlášení k zpracování.")
 
-        # Vyčistíme staré záznamy (starší než 30 dní) pro úsporu místa
-        cleanup_old_urls(days=30)
+        finish_run(new_by_source)
 
     except Exception as e:
         logging.error(f"Během hlavního procesu nastala kritická chyba: {e}")
-        
+    finally:
+        # V režimu CRON se metriky zapíší do METRICS_TEXTFILE pro node_exporter
+        export_run_metrics()
+
     logging.info("Proces zpracování hlášení dokončen.")
+    return len(new_urls)
+
+
+def watch():
+    """
+    Trvalý režim sledování: opakuje main() s adaptivním intervalem kontrol.
+
+    Moduly, HTTP session, model i otevřené úložiště stavu zůstávají mezi koly
+    načtené. Po SIGTERM/SIGINT se dokončí rozpracovaná hlášení a smyčka skončí.
+    """
+    install_signal_handlers()
+    metrics_server = start_http_server()
+    scheduler = AdaptiveScheduler()
+    scheduler.learn(get_processed_timestamps())
+    logging.info("Spouštím sledování stránky s hlášeními.")
+
+    while not stop_requested():
+        found = main()
+        if found:
+            scheduler.learn(get_processed_timestamps())
+        delay = scheduler.next_delay(found_new=bool(found))
+        logging.info(f"Další kontrola za {delay:.0f} s.")
+        wait_for_stop(delay)
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    logging.info("Sledování ukončeno.")
+
+
+def finish_idle_run(sources):
+    """
+    Dokončí běh, ve kterém žádná stránka nepřinesla odkazy (304, nezměněný obsah nebo chyba).
+
+    Stránky nemají nová hlášení, jejich potvrzením se tedy nic nezmění, uloží
+    se ale počítadla cache validátorů (hits, bytes_saved) z tohoto běhu.
+
+    Args:
+        sources (Iterable[Source]): Zdroje kontrolované v tomto běhu.
+    """
+    for source in sources:
+        confirm_page_processed(source)
+
+
+def finish_run(new_urls_by_source):
+    """
+    Dokončí jeden běh: potvrdí zpracované stránky zdrojů a uklidí starý stav.
+
+    Args:
+        new_urls_by_source (Mapping[Source, List[str]]): Nová hlášení jednotlivých zdrojů v tomto běhu.
+    """
+    # Stránku zdroje označíme jako zpracovanou jen tehdy, když se uložila všechna její
+    # nová hlášení, jinak by se neúspěšná hlášení při nezměněné stránce už nezopakovala
+    for source, urls in new_urls_by_source.items():
+        if all(is_processed(url) for url in urls):
+            confirm_page_processed(source)
+
+    # Staré záznamy přesuneme do archivu otisků pro úsporu místa
+    cleanup_old_urls()
+    # Zahodíme hlášení, která se dlouho nedaří dokončit, i s jejich soubory
+    for entry in cleanup_stale_progress(days=ITEM_PROGRESS_MAX_AGE_DAYS):
+        remove_temp_files(entry.get("ogg_path"), entry.get("audio_path"))
+    remove_stale_downloads(ITEM_PROGRESS_MAX_AGE_DAYS)
+
+
+def process_sequentially(new_urls):
+    """
+    Zpracuje nová hlášení postupně jedno po druhém.
+
+    Args:
+        new_urls (list): URL nových hlášení seřazená od nejstaršího.
+
+    Returns:
+        bool: True, pokud se podařilo zpracovat všechna hlášení.
+    """
+    if WEB_API_BATCH_ENABLED:
+        return process_sequentially_batched(new_urls)
+
+    all_succeeded = True
+    for url in new_urls:
+        if stop_requested():
+            # Zbylá hlášení se zpracují po dalším spuštění
+            return False
+        filename = local_filename(url)
+        logging.info(f"--- Zpracovávám: {filename} ---")
+        try:
+            success = download_and_process_audio(url, filename)
+            if success:
+                save_processed_url(url)
+                logging.info(f"✅ Úspěšně zpracováno a uloženo: {url}")
+            else:
+                all_succeeded = False
+                logging.error(f"❌ Nepodařilo se zpracovat: {url}")
+        except Exception as e:
+            all_succeeded = False
+            logging.error(f"Při zpracování souboru {filename} došlo k chybě: {e}")
+    return all_succeeded
+
+
+def process_sequentially_batched(new_urls):
+    """
+    Postupně připraví přepisy všech nových hlášení a odešle je dávkově.
+
+    Jako zpracovaná se uloží jen hlášení, která příjemce skutečně přijal.
+
+    Args:
+        new_urls (list): URL nových hlášení seřazená od nejstaršího.
+
+    Returns:
+        bool: True, pokud se podařilo zpracovat všechna hlášení.
+    """
+    all_succeeded = True
+    submitted = []
+    with AnnouncementBatcher() as batcher:
+        for url in new_urls:
+            if stop_requested():
+                all_succeeded = False
+                break
+            filename = local_filename(url)
+            logging.info(f"--- Připravuji: {filename} ---")
+            item = prepare_announcement(url, filename)
+            if item is None:
+                all_succeeded = False
+                logging.error(f"❌ Nepodařilo se zpracovat: {url}")
+                continue
+            submitted.append((item, submit_announcement(item, batcher)))
+
+    for item, future in submitted:
+        if future.result():
+            save_processed_url(item.url)
+            item.cleanup()
+            logging.info(f"✅ Úspěšně zpracováno a uloženo: {item.url}")
+        else:
+            all_succeeded = False
+            logging.error(f"❌ Nepodařilo se odeslat: {item.url}")
+    return all_succeeded
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Zpracování hlášení rozhlasu.")
+    parser.add_argument("--watch", action="store_true",
+                        help="běží trvale a kontroluje stránku s adaptivním intervalem (místo CRONu)")
+    if parser.parse_args().watch:
+        watch()
+    else:
+        main() 
\ No newline at end of file
@@ -0,0 +1,290 @@
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from config import METRICS_HOST, METRICS_PORT, METRICS_TEXTFILE
+
+# Bez závislosti na prometheus_client: metriky jsou jednoduché a export v textovém
+# formátu Prometheus (čte ho Prometheus, node_exporter i OpenMetrics scrapery) je pár řádků.
+
+_DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+_BYTES_BUCKETS = (10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000, 10_000_000, 50_000_000)
+_AUDIO_SECONDS_BUCKETS = (5, 15, 30, 60, 120, 300, 600, 1800)
+_REALTIME_FACTOR_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5)
+_RATIO_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1, 1.5)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric(ABC):
+    """
+    Společný základ metrik: hodnoty podle kombinace štítků, zámek a zápis do textového formátu.
+    """
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metrika {self.name} očekává štítky {self.labelnames}, dostala {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Řádky s hodnotami metriky v textovém formátu (volá se pod zámkem)."""
+
+    def render(self) -> List[str]:
+        with self._lock:
+            samples = self._samples()
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *samples]
+
+
+class Counter(_Metric):
+    """Monotónně rostoucí čítač (název má končit na _total)."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{self._labels(key)} {_format_value(value)}" for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """Hodnota, která může růst i klesat (např. délka fronty)."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Rozložení hodnot do kumulativních intervalů (buckets) se součtem a počtem."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = _DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][index] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state["count"] if state else 0
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, state in self._values.items():
+            for bound, count in zip(self.buckets, state["buckets"]):
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{self._labels(key, le)} {count}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{self._labels(key)} {state['count']}")
+        return lines
+
+
+class Registry:
+    """Sada metrik vykreslovaná společně pro /metrics i textový soubor."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "announcer_stage_duration_seconds", "Doba trvání fáze zpracování.", ("stage",), _DURATION_BUCKETS))
+STAGE_BYTES = REGISTRY.register(Histogram(
+    "announcer_stage_bytes", "Objem dat zpracovaných ve fázi (stažená stránka/audio, výstup konverze, "
+    "audio k přepisu, odeslaný payload).", ("stage",), _BYTES_BUCKETS))
+STAGE_AUDIO_SECONDS = REGISTRY.register(Histogram(
+    "announcer_stage_audio_seconds", "Délka audia zpracovaného ve fázi.", ("stage",), _AUDIO_SECONDS_BUCKETS))
+STAGE_REALTIME_FACTOR = REGISTRY.register(Histogram(
+    "announcer_stage_realtime_factor", "Doba fáze dělená délkou audia (méně než 1 = rychleji než v reálném čase).",
+    ("stage",), _REALTIME_FACTOR_BUCKETS))
+STAGE_RESULTS = REGISTRY.register(Counter(
+    "announcer_stage_runs_total", "Počet dokončených fází podle výsledku.", ("stage", "result")))
+STAGE_IN_PROGRESS = REGISTRY.register(Gauge(
+    "announcer_stage_in_progress", "Počet právě probíhajících fází.", ("stage",)))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "announcer_queue_depth", "Počet položek čekajících ve frontě (fáze pipeline, semafor, limiter).", ("queue",)))
+AUDIO_REDUCTION_RATIO = REGISTRY.register(Histogram(
+    "announcer_audio_reduction_ratio", "Objem (bytes) a délka (seconds) audia po předzpracování vůči staženému "
+    "originálu, jedno pozorování na hlášení.", ("measure",), _RATIO_BUCKETS))
+TRANSCRIBE_BACKEND_RUNS = REGISTRY.register(Counter(
+    "announcer_transcribe_backend_total", "Počet přepisů podle backendu zvoleného směrováním (TRANSCRIBE_BACKEND=auto).",
+    ("backend",)))
+LAST_RUN = REGISTRY.register(Gauge(
+    "announcer_last_run_timestamp_seconds", "Čas dokončení posledního běhu (Unix timestamp)."))
+
+
+@dataclass
+class StageObservation:
+    """
+    Údaje o jednom průběhu fáze, které doplňuje měřený kód.
+
+    Attributes:
+        ok (bool): Výsledek fáze; funkce, které chyby nevyhazují, ho při neúspěchu nastaví na False.
+        bytes (int | None): Objem zpracovaných dat.
+        audio_seconds (float | None): Délka zpracovaného audia (pro real-time factor).
+    """
+    ok: bool = True
+    bytes: int | None = None
+    audio_seconds: float | None = None
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[StageObservation]:
+    """
+    Změří jeden průběh fáze a zaznamená dobu, objem dat, délku audia a výsledek.
+
+    Použití:
+        with track_stage("download") as observation:
+            ...
+            observation.bytes = os.path.getsize(path)
+    """
+    observation = StageObservation()
+    STAGE_IN_PROGRESS.inc(stage=stage)
+    start = time.perf_counter()
+    try:
+        yield observation
+    except BaseException:
+        observation.ok = False
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_IN_PROGRESS.dec(stage=stage)
+        STAGE_DURATION.observe(duration, stage=stage)
+        STAGE_RESULTS.inc(stage=stage, result="success" if observation.ok else "failure")
+        if observation.bytes is not None:
+            STAGE_BYTES.observe(observation.bytes, stage=stage)
+        if observation.audio_seconds:
+            STAGE_AUDIO_SECONDS.observe(observation.audio_seconds, stage=stage)
+            STAGE_REALTIME_FACTOR.observe(duration / observation.audio_seconds, stage=stage)
+
+
+def write_textfile(path: str = METRICS_TEXTFILE) -> None:
+    """
+    Zapíše metriky do souboru pro textfile collector node_exporteru.
+
+    Zapisuje se do dočasného souboru a ten se atomicky přejmenuje, aby
+    node_exporter nikdy nepřečetl rozepsaný soubor.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".metrics-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(REGISTRY.render())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def export_run_metrics() -> None:
+    """
+    Zaznamená dokončení běhu a zapíše metriky do METRICS_TEXTFILE (pokud je nastaven).
+    """
+    LAST_RUN.set(time.time())
+    if not METRICS_TEXTFILE:
+        return
+    try:
+        write_textfile(METRICS_TEXTFILE)
+    except OSError as e:
+        logging.error(f"Metriky se nepodařilo zapsat do {METRICS_TEXTFILE}: {e}")
+
+
+def start_http_server(port: int = METRICS_PORT, host: str = METRICS_HOST):
+    """
+    Spustí na pozadí HTTP server s endpointem /metrics (pro trvalý běh).
+
+    Args:
+        port (int): Port serveru, 0 = server se nespouští.
+        host (str): Adresa, na které server naslouchá.
+
+    Returns:
+        ThreadingHTTPServer | None: Běžící server (zastaví se voláním shutdown()), nebo None.
+    """
+    if not port:
+        return None
+    # Import až zde, v režimu CRON se server nespouští
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logging.info(f"Metriky jsou dostupné na http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,212 @@
+import functools
+import logging
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Callable, List
+
+from api_client import AnnouncementBatcher
+from scheduler import stop_requested
+from metrics import QUEUE_DEPTH
+from sources import local_filename
+from audio_processor import (
+    AnnouncementItem,
+    stage_download,
+    stage_convert,
+    stage_transcribe,
+    stage_send,
+)
+from config import (
+    PIPELINE_DOWNLOAD_WORKERS,
+    PIPELINE_CONVERT_WORKERS,
+    PIPELINE_TRANSCRIBE_WORKERS,
+    PIPELINE_SEND_WORKERS,
+    PIPELINE_QUEUE_SIZE,
+    WEB_API_BATCH_ENABLED,
+    WEB_API_BATCH_MAX_SIZE,
+)
+
+# Značka pro ukončení pracovníků jedné fáze
+_STOP = object()
+
+
+@dataclass
+class PipelineItem:
+    """
+    Jedno hlášení procházející pipeline.
+
+    Attributes:
+        index (int): Pořadí hlášení (od nejstaršího), podle něj se výsledky ukládají.
+        announcement (AnnouncementItem): Rozpracované hlášení, se kterým pracují jednotlivé fáze.
+        failed_stage (str | None): Název fáze, ve které zpracování selhalo.
+    """
+    index: int
+    announcement: AnnouncementItem
+    failed_stage: str | None = None
+
+    @property
+    def url(self) -> str:
+        return self.announcement.url
+
+    @property
+    def filename(self) -> str:
+        return self.announcement.filename
+
+    @property
+    def success(self) -> bool:
+        return self.failed_stage is None
+
+
+class _MeteredQueue(queue.Queue):
+    """
+    Fronta mezi fázemi, která průběžně vykazuje svou délku v metrice announcer_queue_depth.
+    """
+
+    def __init__(self, name: str, maxsize: int = 0):
+        self.name = name
+        super().__init__(maxsize)
+
+    def _put(self, item) -> None:
+        super()._put(item)
+        QUEUE_DEPTH.set(len(self.queue), queue=self.name)
+
+    def _get(self):
+        item = super()._get()
+        QUEUE_DEPTH.set(len(self.queue), queue=self.name)
+        return item
+
+
+class Stage:
+    """
+    Jedna fáze pipeline s vlastní sadou pracovních vláken.
+
+    Pracovníci berou položky ze vstupní fronty, zpracují je funkcí `func`
+    a předají je do výstupní fronty. Položky, které v některé dřívější fázi
+    selhaly, se jen propustí dál bez zpracování.
+    """
+
+    def __init__(self, name: str, func: Callable[[AnnouncementItem], bool], workers: int,
+                 inbox: queue.Queue, outbox: queue.Queue, next_workers: int):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.inbox = inbox
+        self.outbox = outbox
+        self.next_workers = next_workers
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        # Po doběhnutí všech pracovníků pošleme ukončovací značky další fázi
+        threading.Thread(target=self._close, name=f"{self.name}-close", daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            item = self.inbox.get()
+            if item is _STOP:
+                return
+            if item.success:
+                try:
+                    if not self.func(item.announcement):
+                        item.failed_stage = self.name
+                except Exception as e:
+                    logging.error(f"Ve fázi '{self.name}' došlo u {item.filename} k neočekávané chybě: {e}")
+                    item.failed_stage = self.name
+            self.outbox.put(item)
+
+    def _close(self) -> None:
+        for thread in self._threads:
+            thread.join()
+        for _ in range(self.next_workers):
+            self.outbox.put(_STOP)
+
+
+def run_pipeline(urls: List[str], on_success: Callable[[str], None]) -> List[PipelineItem]:
+    """
+    Zpracuje seznam URL ve fázích stažení → konverze → přepis → odeslání.
+
+    Každá fáze má vlastní počet pracovníků a mezi fázemi jsou omezené fronty,
+    takže pomalejší fáze přirozeně brzdí rychlejší. Výsledky se potvrzují
+    voláním `on_success` ve stejném pořadí, v jakém byla URL předána, a to
+    průběžně, jakmile je dokončen souvislý úsek od nejstaršího hlášení.
+
+    Args:
+        urls (List[str]): URL hlášení seřazená od nejstaršího.
+        on_success (Callable[[str], None]): Voláno pro každé úspěšně zpracované URL.
+
+    Returns:
+        List[PipelineItem]: Výsledky pro všechna URL ve vstupním pořadí.
+    """
+    if not urls:
+        return []
+
+    send, send_workers = stage_send, PIPELINE_SEND_WORKERS
+    batcher = None
+    if WEB_API_BATCH_ENABLED:
+        # Každý pracovník čeká na výsledek své položky, aby se dávka mohla
+        # naplnit, potřebujeme jich alespoň tolik, kolik je max. velikost dávky
+        batcher = AnnouncementBatcher()
+        send = functools.partial(stage_send, batcher=batcher)
+        send_workers = max(send_workers, WEB_API_BATCH_MAX_SIZE)
+
+    definitions = [
+        ("stahování", stage_download, PIPELINE_DOWNLOAD_WORKERS),
+        ("konverze", stage_convert, PIPELINE_CONVERT_WORKERS),
+        ("přepis", stage_transcribe, PIPELINE_TRANSCRIBE_WORKERS),
+        ("odeslání", send, send_workers),
+    ]
+    logging.info("Spouštím pipeline: " + ", ".join(f"{name}={max(1, workers)}" for name, _, workers in definitions))
+
+    queues = [_MeteredQueue(name, maxsize=PIPELINE_QUEUE_SIZE) for name, _, _ in definitions]
+    # Výstupní fronta poslední fáze není omezená, vybírá ji sběrač v tomto vlákně
+    results: queue.Queue = queue.Queue()
+    queues.append(results)
+
+    for i, (name, func, workers) in enumerate(definitions):
+        next_workers = max(1, definitions[i + 1][2]) if i + 1 < len(definitions) else 0
+        Stage(name, func, workers, queues[i], queues[i + 1], next_workers).start()
+
+    def feed():
+        # Hlášení vstupují v pořadí, ve kterém se potvrzují, takže se stav ukládá průběžně
+        # a pád uprostřed běhu nepřijde o dokončená hlášení. Novější hlášení mají přesto
+        # vyšší prioritu při čekání na limity služeb.
+        for index, url in enumerate(urls):
+            filename = local_filename(url)
+            if stop_requested():
+                # Po požadavku na ukončení už nová hlášení nezačínáme, jen dokončíme rozpracovaná
+                results.put(PipelineItem(index=index, announcement=AnnouncementItem(url, filename),
+                                         failed_stage="přerušeno"))
+                continue
+            announcement = AnnouncementItem.resume(url, filename, priority=index)
+            queues[0].put(PipelineItem(index=index, announcement=announcement))
+        for _ in range(max(1, definitions[0][2])):
+            queues[0].put(_STOP)
+
+    threading.Thread(target=feed, name="pipeline-feed", daemon=True).start()
+
+    finished: dict[int, PipelineItem] = {}
+    ordered: List[PipelineItem] = []
+    while len(ordered) < len(urls):
+        item = results.get()
+        if item.success:
+            item.announcement.cleanup()
+        else:
+            # Soubory necháváme pro navázání v dalším běhu, uvolníme jen audio v paměti
+            item.announcement.release_audio()
+        finished[item.index] = item
+        # Potvrzujeme jen souvislý úsek od nejstaršího dosud nepotvrzeného hlášení
+        while len(ordered) in finished:
+            done = finished.pop(len(ordered))
+            ordered.append(done)
+            if done.success:
+                on_success(done.url)
+                logging.info(f"✅ Úspěšně zpracováno a uloženo: {done.url}")
+            else:
+                logging.error(f"❌ Nepodařilo se zpracovat ({done.failed_stage}): {done.url}")
+
+    if batcher is not None:
+        batcher.close()
+    return ordered
@@ -0,0 +1,191 @@
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict
+
+from config import (
+    GEMINI_RPM,
+    GEMINI_TPM,
+    WEB_API_RPM,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_MIN_FACTOR,
+)
+from metrics import QUEUE_DEPTH
+
+# Pauza po 429 bez Retry-After u limiteru bez omezení rychlosti (s)
+_DEFAULT_PAUSE = 1.0
+
+_limiters: Dict[str, "RateLimiter"] = {}
+_limiters_lock = threading.Lock()
+
+
+class RateLimiter:
+    """
+    Token bucket s prioritami a adaptivním zpomalením pro jednu externí službu.
+
+    Žetony přibývají rychlostí `rate_per_minute` až do kapacity `burst`.
+    Čekající požadavky se obsluhují podle priority (vyšší dřív, při shodě
+    v pořadí příchodu). Po odpovědi 429 služba dostane pauzu podle
+    Retry-After a rychlost se sníží na polovinu (nejníže na `min_factor`);
+    každý úspěšný požadavek ji pak postupně vrací zpět (AIMD). Limiter bez
+    omezení rychlosti (0) požadavky nezdržuje, pauzu po 429 ale dodrží také.
+
+    Kapacitu lze čerpat i dodatečně (consume), např. skutečně spotřebované
+    tokeny modelu. Dluh pak zdrží další požadavky.
+
+    Použití:
+        limiter = get_limiter("gemini")
+        limiter.acquire(priority=index)
+        ...
+        limiter.record_success()  # nebo limiter.penalize(retry_after)
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, burst: float = RATE_LIMIT_BURST,
+                 min_factor: float = RATE_LIMIT_MIN_FACTOR):
+        self.name = name
+        self.base_rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, burst)
+        self.min_factor = min_factor
+        self.factor = 1.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiters: list = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    @property
+    def rate(self) -> float:
+        """Aktuální rychlost v žetonech za sekundu (po adaptivním zpomalení)."""
+        return self.base_rate * self.factor
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, cost: float = 1.0, priority: int = 0) -> float:
+        """
+        Počká, až bude k dispozici `cost` žetonů, a odebere je.
+
+        Args:
+            cost (float): Počet žetonů (0 = jen počkat, až limiter není v dluhu ani v pauze).
+            priority (int): Priorita požadavku, vyšší se obslouží dřív.
+
+        Returns:
+            float: Doba čekání v sekundách.
+        """
+        started = time.monotonic()
+        if self.base_rate <= 0:
+            if started >= self._blocked_until:
+                return 0.0
+            # Bez omezení rychlosti se čeká jen na konec pauzy po 429
+            with self._condition:
+                while (remaining := self._blocked_until - time.monotonic()) > 0:
+                    self._condition.wait(remaining)
+            return time.monotonic() - started
+        cost = min(cost, self.capacity)
+        with self._condition:
+            entry = (-priority, next(self._sequence))
+            heapq.heappush(self._waiters, entry)
+            QUEUE_DEPTH.set(len(self._waiters), queue=f"limiter_{self.name}")
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._waiters[0] == entry:
+                        if now >= self._blocked_until and self._tokens >= cost:
+                            self._tokens -= cost
+                            break
+                        timeout = max(self._blocked_until - now, (cost - self._tokens) / self.rate, 0.001)
+                    else:
+                        timeout = None
+                    self._condition.wait(timeout)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                QUEUE_DEPTH.set(len(self._waiters), queue=f"limiter_{self.name}")
+                self._condition.notify_all()
+        waited = time.monotonic() - started
+        if waited > 1:
+            logging.debug(f"Limiter {self.name}: čekání {waited:.1f} s (priorita {priority}).")
+        return waited
+
+    def consume(self, amount: float) -> None:
+        """Dodatečně odečte žetony (může vzniknout dluh, který zdrží další požadavky)."""
+        if self.base_rate <= 0:
+            return
+        with self._condition:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+
+    def penalize(self, retry_after: float | None = None) -> None:
+        """
+        Zpracuje odpověď 429: pozastaví službu a sníží rychlost na polovinu.
+
+        Bez omezení rychlosti se služba jen pozastaví, rychlost se nemění.
+
+        Args:
+            retry_after (float | None): Pauza v sekundách z Retry-After, jinak interval
+                jednoho žetonu (bez omezení rychlosti _DEFAULT_PAUSE).
+        """
+        with self._condition:
+            if self.base_rate > 0:
+                self.factor = max(self.min_factor, self.factor / 2)
+                pause = retry_after if retry_after is not None else 1 / self.rate
+                self._tokens = min(self._tokens, 0.0)
+            else:
+                pause = retry_after if retry_after is not None else _DEFAULT_PAUSE
+            self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+            self._condition.notify_all()
+        if self.base_rate > 0:
+            logging.warning(f"Limiter {self.name}: služba hlásí překročení limitu, pauza {pause:.1f} s, "
+                            f"rychlost snížena na {self.factor:.0%}.")
+        else:
+            logging.warning(f"Limiter {self.name}: služba hlásí překročení limitu, pauza {pause:.1f} s.")
+
+    def record_success(self) -> None:
+        """Po úspěšném požadavku postupně vrací rychlost snížená po 429."""
+        if self.factor < 1.0:
+            with self._condition:
+                self.factor = min(1.0, self.factor + 0.1)
+
+
+def parse_retry_after(value) -> float | None:
+    """
+    Přečte pauzu v sekundách z hlavičky Retry-After nebo z textu chyby ("retry in 13.5s").
+
+    Returns:
+        float | None: Pauza v sekundách, nebo None, pokud ji nelze zjistit.
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    try:
+        return max(0.0, float(text))
+    except ValueError:
+        pass
+    match = re.search(r'retry (?:in|after) (\d+(?:\.\d+)?)\s*s', text, re.IGNORECASE)
+    if match:
+        return float(match.group(1))
+    try:
+        return max(0.0, parsedate_to_datetime(text).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def get_limiter(name: str) -> RateLimiter:
+    """
+    Vrátí sdílený limiter služby: "gemini" (požadavky/min), "gemini_tokens"
+    (tokeny/min) nebo "web_api" (požadavky/min). Limit 0 znamená bez omezení.
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            rates = {"gemini": GEMINI_RPM, "gemini_tokens": GEMINI_TPM, "web_api": WEB_API_RPM}
+            # Tokenový limit čerpáme dodatečně, kapacita odpovídá minutové kvótě
+            burst = GEMINI_TPM if name == "gemini_tokens" else RATE_LIMIT_BURST
+            _limiters[name] = RateLimiter(name, rates[name], burst=burst)
+        return _limiters[name]
@@ -0,0 +1,115 @@
+import logging
+import signal
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Iterable
+
+from config import WATCH_MIN_INTERVAL, WATCH_MAX_INTERVAL, WATCH_BACKOFF, WATCH_ACTIVE_HOUR_SHARE
+
+# Nastaví se po přijetí SIGTERM/SIGINT; běžící hlášení se dokončí, nová se nezačínají
+_stop_requested = threading.Event()
+
+
+def stop_requested() -> bool:
+    """Vrátí True, pokud bylo požádáno o ukončení sledování."""
+    return _stop_requested.is_set()
+
+
+def request_stop() -> None:
+    """Požádá o ukončení: rozpracovaná hlášení se dokončí, další kolo se už nespustí."""
+    if not _stop_requested.is_set():
+        logging.info("Přijat požadavek na ukončení, dokončuji rozpracovaná hlášení.")
+    _stop_requested.set()
+
+
+def wait_for_stop(timeout: float) -> bool:
+    """
+    Počká `timeout` sekund, nebo méně, pokud mezitím přijde požadavek na ukončení.
+
+    Returns:
+        bool: True, pokud bylo požádáno o ukončení.
+    """
+    return _stop_requested.wait(timeout)
+
+
+def install_signal_handlers(extra: Callable[[], None] | None = None) -> None:
+    """
+    Nastaví SIGTERM a SIGINT tak, aby místo okamžitého ukončení zavolaly request_stop().
+
+    Args:
+        extra (Callable[[], None] | None): Volá se navíc po request_stop() (např. probuzení smyčky asyncio).
+    """
+    def handler(signum, frame):
+        request_stop()
+        if extra:
+            extra()
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, handler)
+
+
+class AdaptiveScheduler:
+    """
+    Určuje, za jak dlouho znovu zkontrolovat stránku s hlášeními.
+
+    Z historie časů zpracování se učí, ve kterých hodinách hlášení obvykle
+    vycházejí. V těchto "aktivních" hodinách se stránka kontroluje co
+    nejčastěji (min_interval). Mimo ně se interval po každé kontrole bez
+    nového hlášení násobí `backoff` až do max_interval, nikdy ale nepřeskočí
+    začátek další aktivní hodiny. Nalezení nového hlášení čekání vynuluje.
+    """
+
+    def __init__(self, min_interval: float = WATCH_MIN_INTERVAL, max_interval: float = WATCH_MAX_INTERVAL,
+                 backoff: float = WATCH_BACKOFF, active_share: float = WATCH_ACTIVE_HOUR_SHARE):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.backoff = max(1.0, backoff)
+        self.active_share = active_share
+        self.active_hours: set[int] = set()
+        self._idle_polls = 0
+
+    def learn(self, timestamps: Iterable[datetime]) -> None:
+        """
+        Přepočítá aktivní hodiny z časů zpracování hlášení.
+
+        Aktivní je hodina, na kterou připadá alespoň `active_share` všech hlášení.
+        """
+        counts = [0] * 24
+        for timestamp in timestamps:
+            counts[timestamp.hour] += 1
+        total = sum(counts)
+        self.active_hours = {hour for hour, count in enumerate(counts)
+                             if total and count / total >= self.active_share}
+        logging.debug(f"Aktivní hodiny pro kontrolu hlášení: {sorted(self.active_hours)}")
+
+    def _seconds_to_next_active_hour(self, now: datetime) -> float | None:
+        if not self.active_hours:
+            return None
+        start = now.replace(minute=0, second=0, microsecond=0)
+        for offset in range(1, 25):
+            candidate = start + timedelta(hours=offset)
+            if candidate.hour in self.active_hours:
+                return (candidate - now).total_seconds()
+        return None
+
+    def next_delay(self, found_new: bool, now: datetime | None = None) -> float:
+        """
+        Vrátí počet sekund do další kontroly.
+
+        Args:
+            found_new (bool): Zda poslední kontrola našla nová hlášení.
+            now (datetime | None): Aktuální čas (pro testy), jinak datetime.now().
+
+        Returns:
+            float: Čekání v sekundách.
+        """
+        now = now or datetime.now()
+        self._idle_polls = 0 if found_new else self._idle_polls + 1
+        if found_new or now.hour in self.active_hours:
+            return self.min_interval
+
+        delay = min(self.max_interval, self.min_interval * self.backoff ** self._idle_polls)
+        until_active = self._seconds_to_next_active_hour(now)
+        if until_active is not None:
+            delay = min(delay, until_active)
+        return max(self.min_interval, delay)
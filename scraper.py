@@ -1,40 +1,159 @@
 import requests
-from bs4 import BeautifulSoup
+import hashlib
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Mapping
 
-from config import BROADCAST_URL
+from config import (
+    SCRAPER_BACKEND,
+    SCRAPER_STOP_AFTER_KNOWN,
+    HTTP_CACHE_ENABLED,
+    HTTP_CACHE_FILE,
+    SOURCES_FETCH_CONCURRENCY,
+)
+from http_cache import ValidatorCache
+import http_client
+from link_extractor import decode_html, iter_announcement_links
+from metrics import track_stage
+from sources import Source, get_sources
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def fetch_announcements():
+_validator_cache: ValidatorCache | None = None
+
+def get_validator_cache() -> ValidatorCache | None:
+    """
+    Vrátí sdílenou cache HTTP validátorů, nebo None, pokud je vypnutá.
+    """
+    global _validator_cache
+    if not HTTP_CACHE_ENABLED:
+        return None
+    if _validator_cache is None:
+        _validator_cache = ValidatorCache(HTTP_CACHE_FILE)
+    return _validator_cache
+
+def confirm_page_processed(source: Source | None = None) -> None:
+    """
+    Potvrdí, že všechna hlášení z naposledy stažené verze stránky zdroje byla zpracována.
+
+    Další běhy pak na nezměněnou stránku dostanou 304 (nebo shodný hash)
+    a zpracování se přeskočí. Volá se jen po úspěšném zpracování, aby se
+    neúspěšná hlášení v dalším běhu zopakovala.
+
+    Args:
+        source (Source | None): Zdroj hlášení, výchozí je první zdroj v registru.
+    """
+    source = source or get_sources()[0]
+    cache = get_validator_cache()
+    if cache:
+        cache.commit(source.page_url)
+
+def fetch_all_announcements(is_known: Callable[[str], bool] | None = None) -> Dict[Source, List[str]]:
+    """
+    Stáhne stránky všech zdrojů z registru (souběžně, nejvýše SOURCES_FETCH_CONCURRENCY
+    najednou) a vrátí odkazy na hlášení jednotlivých zdrojů.
+
+    Args:
+        is_known (Callable[[str], bool] | None): Zjistí, zda bylo URL hlášení už zpracováno.
+
+    Returns:
+        Dict[Source, List[str]]: URL hlášení každého zdroje seřazená od nejstaršího.
+    """
+    sources = get_sources()
+    if len(sources) == 1:
+        return {sources[0]: fetch_announcements(is_known, sources[0])}
+    with ThreadPoolExecutor(max_workers=max(1, min(SOURCES_FETCH_CONCURRENCY, len(sources))),
+                            thread_name_prefix="fetch") as executor:
+        results = executor.map(lambda source: fetch_announcements(is_known, source), sources)
+        return dict(zip(sources, results))
+
+def fetch_announcements(is_known: Callable[[str], bool] | None = None, source: Source | None = None):
     """
     Stáhne a naparsuje stránku s hlášeními a extrahuje odkazy na audio soubory.
 
+    Odkazy se hledají streamovacím parserem (viz link_extractor). Pokud je
+    předán `is_known`, procházení stránky skončí po SCRAPER_STOP_AFTER_KNOWN
+    již zpracovaných odkazech po sobě.
+
+    Pokud je zapnutá HTTP cache, posílá podmíněný požadavek. Na odpověď
+    304 Not Modified nebo na obsah shodný s naposledy zpracovanou verzí
+    vrací prázdný seznam bez parsování stránky.
+
+    Args:
+        is_known (Callable[[str], bool] | None): Zjistí, zda bylo URL hlášení už zpracováno.
+        source (Source | None): Zdroj hlášení, výchozí je první zdroj v registru.
+
     Returns:
         list: Seznam URL adres k .ogg souborům hlášení.
-              Vrací prázdný seznam v případě chyby.
+              Vrací prázdný seznam v případě chyby nebo nezměněné stránky.
     """
-    logging.info(f"Stahuji hlášení z: {BROADCAST_URL}")
-    try:
-        response = requests.get(BROADCAST_URL, timeout=10)
-        response.raise_for_status()  # Vyvolá chybu pro status kódy 4xx/5xx
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Nepodařilo se stáhnout stránku: {e}")
-        return []
+    source = source or get_sources()[0]
+    logging.info(f"Stahuji hlášení z: {source.page_url}")
+    with track_stage("fetch") as observation:
+        try:
+            response = http_client.get(source.page_url, headers=page_request_headers(source), timeout=10)
+            response.raise_for_status()  # Vyvolá chybu pro status kódy 4xx/5xx
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Nepodařilo se stáhnout stránku {source.name}: {e}")
+            observation.ok = False
+            return []
+
+        observation.bytes = len(response.content)
+        return parse_announcements_page(response.status_code, response.content, response.headers, is_known,
+                                        source)
+
+def page_request_headers(source: Source | None = None) -> dict:
+    """
+    Vrátí hlavičky pro podmíněné stažení stránky s hlášeními (prázdné, je-li cache vypnutá).
+    """
+    source = source or get_sources()[0]
+    cache = get_validator_cache()
+    return cache.conditional_headers(source.page_url) if cache else {}
+
+def parse_announcements_page(status_code: int, content: bytes, headers: Mapping[str, str],
+                             is_known: Callable[[str], bool] | None = None,
+                             source: Source | None = None) -> list:
+    """
+    Zpracuje staženou odpověď stránky s hlášeními a vrátí odkazy na audio soubory.
+
+    Oddělené od stahování, aby stejnou logiku (cache validátorů, parsování)
+    mohl použít i asynchronní běh (async_runner).
+
+    Args:
+        status_code (int): Stavový kód odpovědi (200 nebo 304).
+        content (bytes): Tělo odpovědi.
+        headers (Mapping[str, str]): Hlavičky odpovědi.
+        is_known (Callable[[str], bool] | None): Zjistí, zda bylo URL hlášení už zpracováno.
+        source (Source | None): Zdroj hlášení, výchozí je první zdroj v registru.
+
+    Returns:
+        list: URL adresy .ogg souborů seřazené od nejstaršího, nebo prázdný seznam.
+    """
+    source = source or get_sources()[0]
+    cache = get_validator_cache()
+    if cache:
+        if status_code == 304:
+            cache.record_not_modified(source.page_url)
+            logging.info(f"Stránka se od posledního zpracování nezměnila (304). Statistiky cache: {cache.stats()}")
+            return []
+        content_hash = hashlib.sha256(content).hexdigest()
+        unchanged = cache.check_content(
+            source.page_url, content_hash, len(content),
+            etag=headers.get('ETag'),
+            last_modified=headers.get('Last-Modified'),
+        )
+        if unchanged:
+            logging.info(f"Obsah stránky se od posledního zpracování nezměnil. Statistiky cache: {cache.stats()}")
+            return []
+
+    html = decode_html(content, headers.get('Content-Type'))
+    known = (lambda href: is_known(f"{source.base_url}{href}")) if is_known else None
 
-    soup = BeautifulSoup(response.content, 'html.parser')
-    
     links = []
-    for link_tag in soup.find_all('a', href=True):
-        href = link_tag['href']
-        if not href.startswith('rozhlas/Hlášení'):
-            continue
-        if href.endswith('.xml'):
-            continue
-        print(f"DEBUG: href={href}")
-        full_url = f"https://rozhlas.milesovice.cz/{href}"
-        links.append(full_url)
+    for href in iter_announcement_links(html, source.link_prefix, backend=SCRAPER_BACKEND,
+                                        is_known=known, stop_after_known=SCRAPER_STOP_AFTER_KNOWN):
+        links.append(f"{source.base_url}{href}")
         logging.debug(f"Nalezen audio soubor: {href}")
 
     # Stránka řadí soubory od nejnovějšího, ale my je chceme zpracovávat od nejstaršího
@@ -42,9 +161,9 @@ def fetch_announcements():
     links.reverse()
     
     if not links:
-        logging.warning("Nebyly nalezeny žádné odkazy na .ogg soubory.")
+        logging.warning(f"Nebyly nalezeny žádné odkazy na .ogg soubory ({source.name}).")
     else:
-        logging.info(f"Nalezeno {len(links)} odkazů na hlášení.")
+        logging.info(f"Nalezeno {len(links)} odkazů na hlášení ({source.name}).")
         
     return links
 
@@ -0,0 +1,148 @@
+import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Mapping
+from urllib.parse import urljoin
+
+from config import (
+    BROADCAST_URL,
+    BROADCAST_BASE_URL,
+    ANNOUNCEMENT_LINK_PREFIX,
+    ANNOUNCEMENT_DATE_PATTERN,
+    SOURCES_FILE,
+)
+
+# Název zdroje se používá v názvech souborů a v logu
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+@dataclass(frozen=True)
+class Source:
+    """
+    Jedna obecní stránka s hlášeními.
+
+    Attributes:
+        name (str): Krátký jednoznačný název zdroje (písmena, číslice, '-' a '_').
+        page_url (str): Adresa stránky se seznamem hlášení.
+        base_url (str): Adresa, ke které se připojují relativní odkazy na hlášení.
+        link_prefix (str): Povinný začátek href odkazu na hlášení.
+        date_pattern (str): Regulární výraz pro datum vysílání v názvu souboru
+            se skupinami day, month a volitelně year.
+    """
+    name: str
+    page_url: str
+    base_url: str
+    link_prefix: str = ANNOUNCEMENT_LINK_PREFIX
+    date_pattern: str = ANNOUNCEMENT_DATE_PATTERN
+
+
+DEFAULT_SOURCE = Source("milesovice", BROADCAST_URL, BROADCAST_BASE_URL)
+
+_sources: List[Source] | None = None
+
+
+def load_sources(path: str) -> List[Source]:
+    """
+    Načte seznam zdrojů z JSON souboru.
+
+    Soubor obsahuje pole objektů s klíči name a page_url, volitelně base_url
+    (výchozí je adresář stránky), link_prefix a date_pattern.
+
+    Raises:
+        ValueError: Pokud soubor nemá očekávaný formát nebo se názvy zdrojů opakují.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"Soubor zdrojů {path} musí obsahovat neprázdné pole.")
+
+    sources = []
+    for entry in entries:
+        try:
+            source = Source(
+                name=entry["name"],
+                page_url=entry["page_url"],
+                base_url=entry.get("base_url") or urljoin(entry["page_url"], "."),
+                link_prefix=entry.get("link_prefix", ANNOUNCEMENT_LINK_PREFIX),
+                date_pattern=entry.get("date_pattern", ANNOUNCEMENT_DATE_PATTERN),
+            )
+            re.compile(source.date_pattern)
+        except (KeyError, TypeError, AttributeError, re.error) as e:
+            raise ValueError(f"Neplatný zdroj v {path}: {entry!r} ({e})") from e
+        if not _NAME_PATTERN.match(source.name):
+            raise ValueError(f"Neplatný název zdroje: {source.name!r}")
+        sources.append(source)
+
+    names = [source.name for source in sources]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Názvy zdrojů v {path} se opakují.")
+    return sources
+
+
+def register_sources(sources: Iterable[Source] | None) -> None:
+    """Nahradí registr zdrojů (None = znovu načíst podle SOURCES_FILE)."""
+    global _sources
+    _sources = list(sources) if sources is not None else None
+
+
+def get_sources() -> List[Source]:
+    """
+    Vrátí registr zdrojů: obsah SOURCES_FILE, nebo jediný zdroj podle BROADCAST_URL.
+    """
+    global _sources
+    if _sources is None:
+        _sources = load_sources(SOURCES_FILE) if SOURCES_FILE else [DEFAULT_SOURCE]
+        if SOURCES_FILE:
+            logging.info(f"Načteno {len(_sources)} zdrojů hlášení z {SOURCES_FILE}.")
+    return _sources
+
+
+def source_for_url(url: str) -> Source:
+    """
+    Najde zdroj, ke kterému URL hlášení patří (podle nejdelší shodné base_url).
+
+    URL, které nepatří žádnému zdroji (např. rozpracované hlášení odebrané
+    obce), se přiřadí prvnímu zdroji v registru.
+    """
+    sources = get_sources()
+    matching = [source for source in sources if url.startswith(source.base_url)]
+    return max(matching, key=lambda source: len(source.base_url)) if matching else sources[0]
+
+
+def local_filename(url: str) -> str:
+    """
+    Vrátí název lokálního souboru hlášení.
+
+    Obce často pojmenovávají soubory stejně ('Hlášení 1.2..ogg'), při více
+    zdrojích se proto před název přidá název zdroje. S jediným zdrojem zůstává
+    původní název, takže se navazuje na dříve stažené soubory.
+    """
+    basename = url.split('/')[-1]
+    if len(get_sources()) == 1:
+        return basename
+    return f"{source_for_url(url).name}-{basename}"
+
+
+def fair_order(urls_by_source: Mapping[Source, List[str]]) -> List[str]:
+    """
+    Spojí nová hlášení všech zdrojů do jednoho seznamu pro sdílené zpracování.
+
+    Zpracování začíná od konce seznamu (od nejnovějších hlášení), zdroje se
+    proto od konce střídají po jednom hlášení: obec s dlouhou frontou nezdrží
+    ostatní. Pořadí hlášení v rámci zdroje (od nejstaršího) zůstává zachováno.
+
+    Args:
+        urls_by_source (Mapping[Source, List[str]]): Nová URL zdrojů seřazená od nejstaršího.
+
+    Returns:
+        List[str]: Všechna URL v pořadí pro zpracování.
+    """
+    pending = [list(urls) for urls in urls_by_source.values() if urls]
+    merged = []
+    while pending:
+        for urls in pending:
+            merged.append(urls.pop())
+        pending = [urls for urls in pending if urls]
+    merged.reverse()
+    return merged
@@ -0,0 +1,424 @@
+import os
+import json
+import hashlib
+import logging
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, List, Set
+
+
+def normalize_timestamp(value) -> str | None:
+    """
+    Převede časové razítko na jednotný ISO formát, který lze porovnávat jako řetězec.
+
+    Args:
+        value: Časové razítko jako ISO řetězec nebo datetime.
+
+    Returns:
+        str | None: Normalizované razítko, nebo None, pokud ho nelze načíst.
+    """
+    try:
+        if not isinstance(value, datetime):
+            value = datetime.fromisoformat(value)
+        return value.isoformat(timespec='microseconds')
+    except (TypeError, ValueError):
+        return None
+
+
+def url_hash(url: str) -> int:
+    """
+    Vrátí 64bitový otisk URL pro archivní vrstvu historie.
+
+    Místo celé URL a metadat se archivuje jen 8 bajtů SHA-256 (znaménkové
+    celé číslo, aby se vešlo do INTEGER v SQLite). Pravděpodobnost kolize je
+    i pro miliony záznamů zanedbatelná; na rozdíl od Bloomova filtru nehrozí
+    falešně pozitivní shoda, kvůli které by se nové hlášení nikdy nezpracovalo.
+    """
+    return int.from_bytes(hashlib.sha256(url.encode('utf-8')).digest()[:8], 'big', signed=True)
+
+
+class StateBackend(ABC):
+    """
+    Společné rozhraní úložišť stavu zpracovaných URL.
+
+    Historie má dvě vrstvy: nedávno zpracovaná URL s časem zpracování
+    a archiv starších URL uložených jen jako otisk (url_hash).
+    """
+
+    @abstractmethod
+    def get_urls(self) -> Set[str]:
+        """Vrátí URL z nedávné historie (archiv obsahuje jen otisky)."""
+
+    @abstractmethod
+    def contains(self, url: str) -> bool:
+        """Zjistí, zda je URL v nedávné historii nebo v archivu."""
+
+    @abstractmethod
+    def get_timestamps(self) -> List[str]:
+        """Vrátí časy zpracování (ISO řetězce) všech záznamů, které je mají."""
+
+    @abstractmethod
+    def add_url(self, url: str, processed_at: datetime) -> bool:
+        """Uloží URL. Vrací False, pokud už v úložišti (včetně archivu) bylo."""
+
+    @abstractmethod
+    def archive_older_than(self, cutoff: datetime, limit: int | None = None) -> int:
+        """
+        Přesune nejvýše `limit` nejstarších záznamů zpracovaných před `cutoff`
+        do archivu otisků a vrátí jejich počet. Záznamy s nečitelným časem zůstávají.
+        """
+
+    @abstractmethod
+    def get_progress(self, url: str) -> dict | None:
+        """Vrátí rozpracovaný stav položky (fáze a podrobnosti), nebo None."""
+
+    @abstractmethod
+    def set_progress(self, url: str, stage: str, details: dict, updated_at: datetime) -> None:
+        """Uloží dokončenou fázi položky a sloučí její podrobnosti s dosavadními."""
+
+    @abstractmethod
+    def delete_progress(self, url: str) -> None:
+        """Odstraní rozpracovaný stav položky."""
+
+    @abstractmethod
+    def pop_progress_older_than(self, cutoff: datetime) -> List[dict]:
+        """Odstraní rozpracované položky neaktualizované od `cutoff` a vrátí je."""
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Seskupí více zápisů do jednoho uložení na disk."""
+        yield
+
+    def close(self) -> None:
+        pass
+
+
+class JsonStateBackend(StateBackend):
+    """
+    Původní úložiště v JSON souboru.
+
+    Soubor se při každé změně přepisuje celý, zápis je ale atomický
+    (nejprve do dočasného souboru, pak os.replace). Načtená data se drží
+    v paměti spolu s množinou URL a otisků archivu, takže dotazy na
+    jednotlivá URL soubor znovu nečtou; načte se znovu jen tehdy, když ho
+    mezitím změnil někdo jiný (jiný čas změny nebo velikost). Uvnitř
+    batch() se soubor zapíše jen jednou. Otisky archivu se v paměti drží
+    jako množina, v souboru jako seznam.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._data: dict | None = None
+        self._urls: Set[str] = set()
+        self._stamp = None
+        self._dirty = False
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> dict:
+        if self._data is not None and (self._batch_depth or self._file_stamp() == self._stamp):
+            return self._data
+        stamp = self._file_stamp()
+        data = {"processed_urls": []}
+        if stamp is not None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    loaded = json.load(f)
+                if isinstance(loaded, dict) and isinstance(loaded.get('processed_urls'), list):
+                    data = loaded
+            except (IOError, json.JSONDecodeError):
+                logging.warning("Nepodařilo se načíst existující data, vytvářím nová.")
+        data['archived_hashes'] = set(data.get('archived_hashes', ()))
+        self._remember(data, stamp)
+        return data
+
+    def _remember(self, data: dict, stamp) -> None:
+        self._data = data
+        self._stamp = stamp
+        self._urls = {item['url'] for item in data['processed_urls'] if isinstance(item, dict) and 'url' in item}
+
+    def _store(self, data: dict) -> None:
+        if self._batch_depth:
+            self._data = data
+            self._dirty = True
+            return
+        serialized = {**data, 'archived_hashes': sorted(data.get('archived_hashes', ()))}
+        if not serialized['archived_hashes']:
+            del serialized['archived_hashes']
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(serialized, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            # Data v paměti se s diskem rozešla, příště se načtou znovu
+            self._data = None
+            raise
+        self._remember(data, self._file_stamp())
+
+    def get_urls(self) -> Set[str]:
+        with self._lock:
+            self._load()
+            return set(self._urls)
+
+    def contains(self, url: str) -> bool:
+        with self._lock:
+            data = self._load()
+            return url in self._urls or url_hash(url) in data['archived_hashes']
+
+    def get_timestamps(self) -> List[str]:
+        with self._lock:
+            data = self._load()
+            return [item['processed_at'] for item in data['processed_urls']
+                    if isinstance(item, dict) and item.get('processed_at')]
+
+    def add_url(self, url: str, processed_at: datetime) -> bool:
+        with self._lock:
+            data = self._load()
+            if url in self._urls:
+                return False
+            if url_hash(url) in data['archived_hashes']:
+                return False
+            data['processed_urls'].append({"url": url, "processed_at": processed_at.isoformat()})
+            self._urls.add(url)
+            self._store(data)
+            return True
+
+    def archive_older_than(self, cutoff: datetime, limit: int | None = None) -> int:
+        # Záznamy se přidávají chronologicky, prošlé jsou proto na začátku seznamu
+        # a čas stačí načíst jen u nich (a u prvního neprošlého)
+        with self._lock:
+            data = self._load()
+            entries = data['processed_urls']
+            cutoff_key = normalize_timestamp(cutoff)
+            kept, archived = [], []
+            index = 0
+            while index < len(entries) and (limit is None or len(archived) < limit):
+                item = entries[index]
+                processed_at = normalize_timestamp(item.get('processed_at')) if isinstance(item, dict) else None
+                if processed_at is None or 'url' not in item:
+                    # Pokud se nepodaří parsovat datum, záznam zachováme
+                    kept.append(item)
+                elif processed_at <= cutoff_key:
+                    archived.append(url_hash(item['url']))
+                    self._urls.discard(item['url'])
+                else:
+                    break
+                index += 1
+            if archived:
+                data['processed_urls'] = kept + entries[index:]
+                data['archived_hashes'].update(archived)
+                self._store(data)
+            return len(archived)
+
+    def get_progress(self, url: str) -> dict | None:
+        with self._lock:
+            progress = self._load().get('item_progress', {}).get(url)
+            return dict(progress) if progress else None
+
+    def set_progress(self, url: str, stage: str, details: dict, updated_at: datetime) -> None:
+        with self._lock:
+            data = self._load()
+            data.setdefault('item_progress', {})[url] = {
+                **details, "url": url, "stage": stage, "updated_at": updated_at.isoformat()
+            }
+            self._store(data)
+
+    def delete_progress(self, url: str) -> None:
+        with self._lock:
+            data = self._load()
+            if data.get('item_progress', {}).pop(url, None) is not None:
+                self._store(data)
+
+    def pop_progress_older_than(self, cutoff: datetime) -> List[dict]:
+        with self._lock:
+            data = self._load()
+            progress = data.get('item_progress', {})
+            expired = [
+                entry for entry in progress.values()
+                if (normalize_timestamp(entry.get('updated_at')) or '') <= normalize_timestamp(cutoff)
+            ]
+            for entry in expired:
+                del progress[entry['url']]
+            if expired:
+                self._store(data)
+            return expired
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth and self._dirty:
+                    self._dirty = False
+                    self._store(self._data)
+
+
+class SqliteStateBackend(StateBackend):
+    """
+    Úložiště v SQLite databázi v režimu WAL.
+
+    URL jsou indexovaná primárním klíčem, takže vyhledání i uložení jednoho
+    záznamu nezávisí na velikosti historie. Každý zápis je samostatná
+    transakce; uvnitř batch() se všechny zápisy potvrdí jedním commitem.
+    Při prvním otevření se automaticky převezmou data z JSON souboru.
+    """
+
+    def __init__(self, path: str, json_path: str | None = None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS processed_urls (
+                url TEXT PRIMARY KEY,
+                processed_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_processed_urls_processed_at ON processed_urls(processed_at);
+            CREATE TABLE IF NOT EXISTS archived_urls (
+                url_hash INTEGER PRIMARY KEY
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS item_progress (
+                url TEXT PRIMARY KEY,
+                stage TEXT NOT NULL,
+                details TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+        """)
+        if json_path:
+            self._migrate_from_json(json_path)
+
+    def _migrate_from_json(self, json_path: str) -> None:
+        if self._get_meta("json_migrated") or not os.path.exists(json_path):
+            return
+        data = JsonStateBackend(json_path)._load()
+        rows = [
+            (item['url'], normalize_timestamp(item.get('processed_at')))
+            for item in data['processed_urls'] if isinstance(item, dict) and 'url' in item
+        ]
+        with self.batch():
+            self._conn.executemany("INSERT OR IGNORE INTO processed_urls (url, processed_at) VALUES (?, ?)", rows)
+            self._conn.executemany("INSERT OR IGNORE INTO archived_urls (url_hash) VALUES (?)",
+                                   [(h,) for h in data['archived_hashes']])
+            self._set_meta("json_migrated", datetime.now().isoformat())
+        logging.info(f"Migrováno {len(rows)} záznamů z {json_path} do SQLite databáze {self.path}.")
+
+    def _get_meta(self, key: str) -> str | None:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def get_urls(self) -> Set[str]:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT url FROM processed_urls")}
+
+    def contains(self, url: str) -> bool:
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM processed_urls WHERE url = ?", (url,)).fetchone():
+                return True
+            return self._conn.execute(
+                "SELECT 1 FROM archived_urls WHERE url_hash = ?", (url_hash(url),)).fetchone() is not None
+
+    def get_timestamps(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT processed_at FROM processed_urls WHERE processed_at IS NOT NULL")]
+
+    def add_url(self, url: str, processed_at: datetime) -> bool:
+        with self._lock, self.batch():
+            if self._conn.execute(
+                    "SELECT 1 FROM archived_urls WHERE url_hash = ?", (url_hash(url),)).fetchone():
+                return False
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO processed_urls (url, processed_at) VALUES (?, ?)",
+                (url, normalize_timestamp(processed_at)),
+            )
+            return cursor.rowcount > 0
+
+    def archive_older_than(self, cutoff: datetime, limit: int | None = None) -> int:
+        # Index na processed_at zajistí, že se čte jen prošlá část historie
+        with self._lock, self.batch():
+            rows = self._conn.execute(
+                "SELECT url FROM processed_urls WHERE processed_at <= ? ORDER BY processed_at LIMIT ?",
+                (normalize_timestamp(cutoff), -1 if limit is None else limit),
+            ).fetchall()
+            self._conn.executemany("INSERT OR IGNORE INTO archived_urls (url_hash) VALUES (?)",
+                                   [(url_hash(url),) for (url,) in rows])
+            self._conn.executemany("DELETE FROM processed_urls WHERE url = ?", rows)
+            return len(rows)
+
+    @staticmethod
+    def _progress_from_row(row) -> dict:
+        url, stage, details, updated_at = row
+        return {**json.loads(details), "url": url, "stage": stage, "updated_at": updated_at}
+
+    def get_progress(self, url: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, stage, details, updated_at FROM item_progress WHERE url = ?", (url,)
+            ).fetchone()
+            return self._progress_from_row(row) if row else None
+
+    def set_progress(self, url: str, stage: str, details: dict, updated_at: datetime) -> None:
+        with self._lock, self.batch():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO item_progress (url, stage, details, updated_at) VALUES (?, ?, ?, ?)",
+                (url, stage, json.dumps(details, ensure_ascii=False), normalize_timestamp(updated_at)),
+            )
+
+    def delete_progress(self, url: str) -> None:
+        with self._lock, self.batch():
+            self._conn.execute("DELETE FROM item_progress WHERE url = ?", (url,))
+
+    def pop_progress_older_than(self, cutoff: datetime) -> List[dict]:
+        with self._lock, self.batch():
+            rows = self._conn.execute(
+                "SELECT url, stage, details, updated_at FROM item_progress WHERE updated_at <= ?",
+                (normalize_timestamp(cutoff),),
+            ).fetchall()
+            self._conn.execute("DELETE FROM item_progress WHERE updated_at <= ?", (normalize_timestamp(cutoff),))
+            return [self._progress_from_row(row) for row in rows]
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        with self._lock:
+            if self._batch_depth == 0:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._batch_depth += 1
+            try:
+                yield
+            except BaseException:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._conn.execute("ROLLBACK")
+                raise
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._conn.execute("COMMIT")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
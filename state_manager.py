@@ -1,14 +1,23 @@
 import os
-import json
 import logging
+import sqlite3
 from datetime import datetime, timedelta
-from typing import Set, Optional
+from typing import List, Set, Optional
+
+from config import STATE_BACKEND, STATE_HOT_DAYS, STATE_ARCHIVE_BATCH
+from state_backends import StateBackend, JsonStateBackend, SqliteStateBackend
 
 # Původní soubor pro zpětnou kompatibilitu
 STATE_FILE = "last_processed.txt"
 # Nový soubor s rozšířenou funkcionalitou
 STATE_FILE_NEW = "processed_urls.json"
 
+# Fáze zpracování jednoho hlášení v pořadí, v jakém se dokončují
+ITEM_STAGES = ("downloaded", "converted", "transcribed", "posted")
+
+_backend: StateBackend | None = None
+_backend_key = None
+
 def get_last_processed_file():
     """
     Načte název posledního zpracovaného souboru ze stavového souboru (starý formát).
@@ -48,135 +57,232 @@ def save_last_processed_file(filename):
     except IOError as e:
         logging.error(f"Chyba při zápisu do stavového souboru: {e}")
 
+def _db_path() -> str:
+    """SQLite databáze leží vedle JSON souboru, ze kterého se při prvním otevření migruje."""
+    return os.path.splitext(STATE_FILE_NEW)[0] + ".db"
+
+def _get_backend() -> StateBackend:
+    """
+    Vrátí úložiště podle STATE_BACKEND. Instance se drží po celou dobu běhu,
+    při změně nastavení (např. cesty v testech) se otevře nová.
+    """
+    global _backend, _backend_key
+    key = (STATE_BACKEND, STATE_FILE_NEW)
+    if _backend is None or _backend_key != key:
+        close()
+        if STATE_BACKEND == "json":
+            _backend = JsonStateBackend(STATE_FILE_NEW)
+        else:
+            _backend = SqliteStateBackend(_db_path(), json_path=STATE_FILE_NEW)
+        _backend_key = key
+    return _backend
+
+def close() -> None:
+    """Zavře otevřené úložiště stavu (např. při ukončení démona nebo v testech)."""
+    global _backend, _backend_key
+    if _backend is not None:
+        _backend.close()
+    _backend = None
+    _backend_key = None
+
+def batch():
+    """
+    Seskupí více volání save_processed_url() do jednoho zápisu na disk.
+
+    Použití:
+        with state_manager.batch():
+            for url in urls:
+                save_processed_url(url)
+    """
+    return _get_backend().batch()
+
 def get_processed_urls() -> Set[str]:
     """
-    Načte sadu všech zpracovaných URL z nového stavového souboru.
+    Načte sadu nedávno zpracovaných URL z úložiště stavu.
     
-    Pokud nový soubor neexistuje, pokusí se migrovat ze starého formátu.
+    Starší URL jsou v archivu jen jako otisky, na ty se ptá is_processed().
+    Pokud je úložiště prázdné, pokusí se migrovat ze starého formátu.
 
     Returns:
-        Set[str]: Sada URL adres již zpracovaných hlášení.
+        Set[str]: Sada URL adres hlášení zpracovaných za posledních STATE_HOT_DAYS dní.
     """
-    # Zkus načíst nový formát
-    if os.path.exists(STATE_FILE_NEW):
-        try:
-            with open(STATE_FILE_NEW, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if 'processed_urls' in data:
-                    # Extrahujeme jen URL z objektů s timestamp
-                    urls = {item['url'] for item in data['processed_urls'] if isinstance(item, dict) and 'url' in item}
-                    logging.info(f"Načteno {len(urls)} zpracovaných URL z nového formátu.")
-                    return urls
-        except (IOError, json.JSONDecodeError) as e:
-            logging.error(f"Chyba při čtení nového stavového souboru: {e}")
+    try:
+        urls = _get_backend().get_urls()
+    except (IOError, sqlite3.Error) as e:
+        logging.error(f"Chyba při čtení stavového úložiště: {e}")
+        urls = set()
+    if urls:
+        logging.info(f"Načteno {len(urls)} zpracovaných URL.")
+        return urls
     
-    # Pokud nový soubor neexistuje nebo má chybu, pokus se migrovat ze starého
+    # Pokud je úložiště prázdné, pokus se migrovat ze starého formátu
     if os.path.exists(STATE_FILE):
         logging.info("Migruji ze starého formátu na nový...")
         migrated_urls = migrate_from_old_format(STATE_FILE)
         if migrated_urls:
             # Uložíme migrovaná data do nového formátu
-            for url in migrated_urls:
-                save_processed_url(url)
+            with batch():
+                for url in migrated_urls:
+                    save_processed_url(url)
             return migrated_urls
     
     logging.info("Žádný stavový soubor nenalezen, začínám s prázdným seznamem.")
     return set()
 
+def is_processed(url: str) -> bool:
+    """
+    Zjistí, zda bylo URL již zpracováno, bez načítání celé historie.
+
+    Args:
+        url (str): URL adresa hlášení.
+
+    Returns:
+        bool: True, pokud je URL v historii zpracovaných (včetně archivu).
+    """
+    return _get_backend().contains(url)
+
+def get_processed_timestamps() -> List[datetime]:
+    """
+    Vrátí časy zpracování hlášení v historii (např. pro odhad, kdy hlášení vycházejí).
+
+    Returns:
+        List[datetime]: Časy zpracování; záznamy s nečitelným časem se vynechají.
+    """
+    try:
+        values = _get_backend().get_timestamps()
+    except (IOError, sqlite3.Error) as e:
+        logging.error(f"Chyba při čtení stavového úložiště: {e}")
+        return []
+    timestamps = []
+    for value in values:
+        try:
+            timestamps.append(datetime.fromisoformat(value))
+        except (TypeError, ValueError):
+            continue
+    return timestamps
+
 def save_processed_url(url: str) -> None:
     """
-    Uloží nové zpracované URL do stavového souboru.
+    Uloží nové zpracované URL do úložiště stavu.
     
     Pokud URL již existuje, neudělá nic (eliminuje duplikáty).
 
     Args:
         url (str): URL adresa zpracovaného hlášení.
     """
-    # Načteme existující data nebo vytvoříme nová
-    data = {"processed_urls": []}
-    if os.path.exists(STATE_FILE_NEW):
-        try:
-            with open(STATE_FILE_NEW, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except (IOError, json.JSONDecodeError):
-            logging.warning("Nepodařilo se načíst existující data, vytvářím nová.")
-    
-    # Zkontrolujeme, jestli URL už neexistuje
-    if 'processed_urls' in data:
-        existing_urls = {item['url'] for item in data['processed_urls'] if isinstance(item, dict) and 'url' in item}
-        if url in existing_urls:
+    try:
+        backend = _get_backend()
+        with backend.batch():
+            added = backend.add_url(url, datetime.now())
+            # Dokončená položka už nepotřebuje rozpracovaný stav
+            backend.delete_progress(url)
+        if not added:
             logging.debug(f"URL {url} už je zpracované, přeskakuji.")
             return
-    
-    # Přidáme nové URL s časovým razítkem
-    new_entry = {
-        "url": url,
-        "processed_at": datetime.now().isoformat()
-    }
-    data["processed_urls"].append(new_entry)
-    
-    # Uložíme zpět
-    try:
-        with open(STATE_FILE_NEW, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
         logging.info(f"Uloženo nové zpracované URL: {url}")
-        
-        # Pro zpětnou kompatibilitu aktualizujeme i starý soubor
-        filename = url.split('/')[-1]  # Extrahujeme název souboru z URL
-        save_last_processed_file(filename)
-        
-    except IOError as e:
+
+        if STATE_BACKEND == "json":
+            # Pro zpětnou kompatibilitu aktualizujeme i starý soubor
+            filename = url.split('/')[-1]  # Extrahujeme název souboru z URL
+            save_last_processed_file(filename)
+
+    except (IOError, sqlite3.Error) as e:
         logging.error(f"Chyba při zápisu nového zpracovaného URL: {e}")
 
-def cleanup_old_urls(days: int = 30) -> None:
+def cleanup_old_urls(days: int | None = None, limit: int | None = None) -> None:
     """
-    Vymaže záznamy starší než zadaný počet dní pro úsporu místa.
+    Přesune záznamy starší než zadaný počet dní do archivu otisků.
+
+    Archivovaná URL se dál považují za zpracovaná (is_processed), jen se
+    k nim neukládá čas zpracování. Při jednom běhu se archivuje nejvýše
+    `limit` nejstarších záznamů, takže cena úklidu nezávisí na velikosti historie.
 
     Args:
-        days (int): Počet dní, starší záznamy budou smazány. Výchozí je 30 dní.
+        days (int | None): Stáří záznamů k archivaci. Výchozí je STATE_HOT_DAYS.
+        limit (int | None): Nejvyšší počet archivovaných záznamů. Výchozí je STATE_ARCHIVE_BATCH.
     """
-    if not os.path.exists(STATE_FILE_NEW):
+    if days is None:
+        days = STATE_HOT_DAYS
+    if limit is None:
+        limit = STATE_ARCHIVE_BATCH
+    if STATE_BACKEND == "json" and not os.path.exists(STATE_FILE_NEW):
         logging.info("Soubor pro úklid neexistuje.")
         return
     
     try:
-        with open(STATE_FILE_NEW, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        if 'processed_urls' not in data:
-            return
-        
         cutoff_date = datetime.now() - timedelta(days=days)
-        original_count = len(data['processed_urls'])
-        
-        # Filtrujeme pouze záznamy novější než cutoff_date
-        filtered_urls = []
-        for item in data['processed_urls']:
-            if isinstance(item, dict) and 'processed_at' in item:
-                try:
-                    processed_date = datetime.fromisoformat(item['processed_at'])
-                    if processed_date > cutoff_date:
-                        filtered_urls.append(item)
-                except ValueError:
-                    # Pokud se nepodaří parsovat datum, záznam zachováme
-                    filtered_urls.append(item)
-            else:
-                # Starý formát nebo neočekávaná struktura - zachováme
-                filtered_urls.append(item)
-        
-        data['processed_urls'] = filtered_urls
-        removed_count = original_count - len(filtered_urls)
+        archived_count = _get_backend().archive_older_than(cutoff_date, limit)
         
-        if removed_count > 0:
-            with open(STATE_FILE_NEW, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            logging.info(f"Vymazáno {removed_count} starých záznamů (starších než {days} dní).")
+        if archived_count > 0:
+            logging.info(f"Archivováno {archived_count} starých záznamů (starších než {days} dní).")
         else:
-            logging.info("Žádné staré záznamy k vymazání.")
+            logging.info("Žádné staré záznamy k archivaci.")
             
-    except (IOError, json.JSONDecodeError) as e:
+    except (IOError, sqlite3.Error) as e:
         logging.error(f"Chyba při úklidu starých záznamů: {e}")
 
+def get_item_progress(url: str) -> Optional[dict]:
+    """
+    Vrátí rozpracovaný stav hlášení, které ještě nebylo dokončeno.
+
+    Args:
+        url (str): URL adresa hlášení.
+
+    Returns:
+        Optional[dict]: Slovník s klíči "stage" (jedna z ITEM_STAGES), "updated_at"
+            a podrobnostmi uloženými v record_item_stage(), nebo None.
+    """
+    try:
+        return _get_backend().get_progress(url)
+    except (IOError, sqlite3.Error) as e:
+        logging.error(f"Chyba při čtení rozpracovaného stavu {url}: {e}")
+        return None
+
+def record_item_stage(url: str, stage: str, **details) -> None:
+    """
+    Zaznamená dokončení fáze zpracování hlášení.
+
+    Podrobnosti se slučují s dříve uloženými (např. cesta ke staženému souboru
+    zůstane zachována i po uložení přepisu). Volá se až po dokončení fáze,
+    takže po pádu procesu se opakuje nejvýše jedna rozpracovaná fáze.
+
+    Args:
+        url (str): URL adresa hlášení.
+        stage (str): Dokončená fáze, jedna z ITEM_STAGES.
+        **details: Podrobnosti fáze (cesty k souborům, hash, přepis...).
+    """
+    if stage not in ITEM_STAGES:
+        raise ValueError(f"Neznámá fáze zpracování: {stage}")
+    try:
+        backend = _get_backend()
+        with backend.batch():
+            previous = backend.get_progress(url) or {}
+            merged = {k: v for k, v in previous.items() if k not in ("url", "stage", "updated_at")}
+            merged.update(details)
+            backend.set_progress(url, stage, merged, datetime.now())
+        logging.debug(f"Hlášení {url} dokončilo fázi '{stage}'.")
+    except (IOError, sqlite3.Error) as e:
+        logging.error(f"Chyba při ukládání rozpracovaného stavu {url}: {e}")
+
+def cleanup_stale_progress(days: int = 7) -> List[dict]:
+    """
+    Zapomene rozpracovaná hlášení, která se nepodařilo dokončit ani za zadaný počet dní.
+
+    Args:
+        days (int): Stáří posledního pokroku, po kterém se položka zahodí.
+
+    Returns:
+        List[dict]: Odstraněné záznamy, aby volající mohl smazat jejich soubory.
+    """
+    try:
+        expired = _get_backend().pop_progress_older_than(datetime.now() - timedelta(days=days))
+    except (IOError, sqlite3.Error) as e:
+        logging.error(f"Chyba při úklidu rozpracovaných hlášení: {e}")
+        return []
+    if expired:
+        logging.info(f"Zahozeno {len(expired)} rozpracovaných hlášení starších než {days} dní.")
+    return expired
+
 def migrate_from_old_format(old_file_path: str) -> Set[str]:
     """
     Migruje data ze starého formátu (last_processed.txt) na nový.
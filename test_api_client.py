@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+import unittest
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Klíče vyžaduje config.validate_config(), pro testy stačí fiktivní hodnoty
+for _key in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT"):
+    os.environ.setdefault(_key, "test")
+
+import api_client
+import http_client
+from rate_limiter import RateLimiter
+
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    """
+    Stub webového API: /batch přijme pole a vrátí výsledky podle server.batch_status,
+    /single přijme jedno hlášení, hlášení s obsahem "špatné" odmítne.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self, status: int, body: bytes = b"{}") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        with self.server.lock:
+            self.server.requests.append((self.path, body))
+        if self.path == "/batch":
+            if self.server.batch_status != 200:
+                self._respond(self.server.batch_status)
+                return
+            results = [{"success": item["Content"] != "špatné"} for item in body]
+            self._respond(200, json.dumps(results).encode())
+        else:
+            self._respond(400 if body["Content"] == "špatné" else 200)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestAnnouncementBatching(unittest.TestCase):
+    """
+    Testy dávkového odesílání hlášení proti lokálnímu stub API.
+    """
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ApiHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.batch_status = 200
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+        self.original = (api_client.WEB_API_ENDPOINT, api_client.WEB_API_BATCH_ENDPOINT, api_client.get_limiter)
+        api_client.WEB_API_ENDPOINT = f"{base_url}/single"
+        api_client.WEB_API_BATCH_ENDPOINT = f"{base_url}/batch"
+        # Bez limitu požadavků, ať testy běží rychle
+        api_client.get_limiter = lambda name: RateLimiter(name, 0)
+        http_client.close_session()
+
+    def tearDown(self):
+        api_client.WEB_API_ENDPOINT, api_client.WEB_API_BATCH_ENDPOINT, api_client.get_limiter = self.original
+        http_client.close_session()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _submit_all(self, contents, max_size=10, max_delay=60):
+        with api_client.AnnouncementBatcher(max_size=max_size, max_delay=max_delay) as batcher:
+            futures = [batcher.submit(content, datetime(2025, 1, 1, 8, 0), f"https://x/{i}.ogg")
+                       for i, content in enumerate(contents)]
+        return [future.result() for future in futures]
+
+    def test_items_are_sent_in_one_request(self):
+        """Test, že položky se při uzavření odešlou jednou dávkou."""
+        self.assertEqual(self._submit_all(["a", "b", "c"]), [True, True, True])
+        self.assertEqual([path for path, _ in self.server.requests], ["/batch"])
+        self.assertEqual(len(self.server.requests[0][1]), 3)
+
+    def test_batch_is_split_by_max_size(self):
+        """Test, že dávka nepřekročí maximální velikost."""
+        self._submit_all(["a", "b", "c", "d", "e"], max_size=2)
+        self.assertEqual([len(body) for _, body in self.server.requests], [2, 2, 1])
+
+    def test_partial_rejection_is_per_item(self):
+        """Test, že odmítnutá položka neovlivní výsledek ostatních."""
+        self.assertEqual(self._submit_all(["a", "špatné", "c"]), [True, False, True])
+
+    def test_fallback_to_single_requests(self):
+        """Test, že při odmítnutí dávky se hlášení odešlou jednotlivě."""
+        self.server.batch_status = 404
+        self.assertEqual(self._submit_all(["a", "špatné"]), [True, False])
+        self.assertEqual([path for path, _ in self.server.requests], ["/batch", "/single", "/single"])
+
+
+if __name__ == '__main__':
+    unittest.main()
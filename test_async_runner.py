@@ -0,0 +1,149 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Klíče vyžaduje config.validate_config(), pro testy stačí fiktivní hodnoty
+for _key in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT"):
+    os.environ.setdefault(_key, "test")
+
+import async_runner
+import audio_processor
+import state_manager
+from audio_processor import AnnouncementItem
+from rate_limiter import RateLimiter
+
+AUDIO = bytes(range(256)) * 64
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """
+    Lokální stub server: /flaky/N vrátí N-krát 502, potom 200, /fail/STATUS vrací
+    vždy daný stavový kód, /api přijme hlášení a uloží jeho tělo. /short/N.ogg
+    pošle z ohlášené délky jen prvních N bajtů a spojení ukončí.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self, status: int, body: bytes = b"ok") -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self) -> None:
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        with server.lock:
+            count = server.hits.get(self.path, 0)
+            server.hits[self.path] = count + 1
+            if self.path == "/api":
+                server.posted.append(json.loads(body))
+
+        parts = self.path.strip("/").split("/")
+        if parts[0] == "short":
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(AUDIO)))
+            self.end_headers()
+            self.wfile.write(AUDIO[:int(parts[1].split(".")[0])])
+            self.close_connection = True
+        elif parts[0] == "flaky" and count < int(parts[1]):
+            self._respond(502, b"bad gateway")
+        elif parts[0] == "fail":
+            self._respond(int(parts[1]), b"error")
+        else:
+            self._respond(200)
+
+    do_GET = _handle
+    do_POST = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestAsyncRunner(unittest.TestCase):
+    """
+    Testy asynchronního běhu proti lokálnímu stub serveru.
+    """
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        self.server.lock = threading.Lock()
+        self.server.hits = {}
+        self.server.posted = []
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original_state_file = state_manager.STATE_FILE_NEW
+        state_manager.STATE_FILE_NEW = os.path.join(self.tmpdir.name, "processed_urls.json")
+        # Bez čekání mezi pokusy, ať testy běží rychle
+        self.original_backoff = (async_runner.HTTP_BACKOFF_FACTOR, async_runner.get_limiter,
+                                 audio_processor.HTTP_BACKOFF_FACTOR, audio_processor.OGG_DIR)
+        async_runner.HTTP_BACKOFF_FACTOR = 0
+        async_runner.get_limiter = lambda name: RateLimiter(name, 0)
+        audio_processor.HTTP_BACKOFF_FACTOR = 0
+        audio_processor.OGG_DIR = self.tmpdir.name
+
+    def tearDown(self):
+        (async_runner.HTTP_BACKOFF_FACTOR, async_runner.get_limiter,
+         audio_processor.HTTP_BACKOFF_FACTOR, audio_processor.OGG_DIR) = self.original_backoff
+        state_manager.close()
+        state_manager.STATE_FILE_NEW = self.original_state_file
+        self.tmpdir.cleanup()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _run(self, func):
+        async def run():
+            async with async_runner.AsyncRunner() as runner:
+                return await func(runner)
+        return asyncio.run(run())
+
+    def test_get_retries_transient_errors(self):
+        """Test, že GET po dvou odpovědích 502 uspěje."""
+        status, _, _ = self._run(lambda runner: runner._request("GET", f"{self.base_url}/flaky/2", timeout=5))
+        self.assertEqual(status, 200)
+        self.assertEqual(self.server.hits["/flaky/2"], 3)
+
+    def test_post_not_retried_on_server_error(self):
+        """Test, že POST se při 500 neopakuje."""
+        status, _, _ = self._run(lambda runner: runner._request("POST", f"{self.base_url}/fail/500", timeout=5))
+        self.assertEqual(status, 500)
+        self.assertEqual(self.server.hits["/fail/500"], 1)
+
+    def test_truncated_download_is_not_accepted(self):
+        """Test, že zkrácené stažení neskončí jako platný soubor a zůstane jen .part k navázání."""
+        item = AnnouncementItem(url=f"{self.base_url}/short/1000.ogg", filename="zkracene.ogg")
+
+        self.assertFalse(self._run(lambda runner: runner._download(item)))
+
+        ogg_path = os.path.join(self.tmpdir.name, "zkracene.ogg")
+        self.assertFalse(os.path.exists(ogg_path))
+        self.assertEqual(os.path.getsize(ogg_path + audio_processor.PARTIAL_SUFFIX), 1000)
+        self.assertIsNone(item.ogg_path)
+        self.assertIsNone(state_manager.get_item_progress(item.url))
+
+    def test_concurrent_sends_record_posted_stage(self):
+        """Test, že souběžně odeslaná hlášení dojdou všechna a mají zaznamenanou fázi."""
+        original_endpoint = async_runner.WEB_API_ENDPOINT
+        async_runner.WEB_API_ENDPOINT = f"{self.base_url}/api"
+        items = [AnnouncementItem(url=f"https://x/Hlášení {i}.1.2025.ogg", filename=f"Hlášení {i}.1.2025.ogg",
+                                  transcript=f"přepis {i}") for i in range(1, 6)]
+        try:
+            results = self._run(lambda runner: asyncio.gather(*(runner._send(item, None) for item in items)))
+        finally:
+            async_runner.WEB_API_ENDPOINT = original_endpoint
+
+        self.assertEqual(results, [True] * 5)
+        self.assertEqual(sorted(body["Content"] for body in self.server.posted),
+                         [f"přepis {i}" for i in range(1, 6)])
+        for item in items:
+            self.assertEqual(state_manager.get_item_progress(item.url)["stage"], "posted")
+
+
+if __name__ == '__main__':
+    unittest.main()
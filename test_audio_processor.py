@@ -0,0 +1,335 @@
+import base64
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Klíče vyžaduje config.validate_config(), pro testy stačí fiktivní hodnoty
+for _key in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT"):
+    os.environ.setdefault(_key, "test")
+
+import audio_processor
+import http_client
+import metrics
+
+
+class _AudioHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if not self.path.endswith(".ogg"):
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/ogg")
+        self.send_header("Content-Length", str(len(self.server.audio)))
+        self.end_headers()
+        self.wfile.write(self.server.audio)
+
+    def log_message(self, *args):
+        pass
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        # Server podporuje Range a prvních `server.failures` odpovědí utne po `server.cut` bajtech
+        data = self.server.audio
+        self.server.ranges.append(self.headers.get("Range"))
+        start = int(self.headers["Range"][6:-1]) if self.headers.get("Range") else 0
+        self.send_response(206 if start else 200)
+        self.send_header("Content-Type", "audio/ogg")
+        self.send_header("Content-Length", str(len(data) - start))
+        self.send_header("ETag", '"v1"')
+        self.send_header("Repr-Digest", f"sha-256=:{self.server.digest}:")
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        self.end_headers()
+        if self.server.failures > 0:
+            self.server.failures -= 1
+            self.wfile.write(data[start:start + self.server.cut])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(data[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+class TestResumableDownload(unittest.TestCase):
+    """
+    Testy navazovaného stahování OGG souborů na disk.
+    """
+
+    def setUp(self):
+        self.audio = os.urandom(300 * 1024)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+        self.server.audio = self.audio
+        self.server.digest = base64.b64encode(hashlib.sha256(self.audio).digest()).decode("ascii")
+        self.server.ranges = []
+        self.server.failures = 0
+        self.server.cut = 100 * 1024
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/rozhlas/hlaseni.ogg"
+        http_client.close_session()
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original = (audio_processor.OGG_DIR, audio_processor.HTTP_BACKOFF_FACTOR,
+                         audio_processor.DOWNLOAD_RESUME_ATTEMPTS)
+        audio_processor.OGG_DIR = self.tmpdir.name
+        audio_processor.HTTP_BACKOFF_FACTOR = 0
+        self.ogg_path = os.path.join(self.tmpdir.name, "hlaseni.ogg")
+        self.part_path = self.ogg_path + audio_processor.PARTIAL_SUFFIX
+
+    def tearDown(self):
+        (audio_processor.OGG_DIR, audio_processor.HTTP_BACKOFF_FACTOR,
+         audio_processor.DOWNLOAD_RESUME_ATTEMPTS) = self.original
+        http_client.close_session()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def test_interrupted_download_resumes(self):
+        """Test, že přerušené stahování naváže od stažené části a výsledek se ověří."""
+        self.server.failures = 2
+
+        result = audio_processor.download_file(self.url, "hlaseni.ogg")
+
+        self.assertEqual(result, (self.ogg_path, hashlib.sha256(self.audio).hexdigest()))
+        self.assertEqual(self.server.ranges, [None, "bytes=102400-", "bytes=204800-"])
+        with open(self.ogg_path, "rb") as f:
+            self.assertEqual(f.read(), self.audio)
+        self.assertEqual(os.listdir(self.tmpdir.name), ["hlaseni.ogg"])
+
+    def test_partial_download_survives_failed_run(self):
+        """Test, že neúspěšné stahování ponechá část na disku a další běh na ni naváže."""
+        audio_processor.DOWNLOAD_RESUME_ATTEMPTS = 0
+        self.server.failures = 1
+        self.assertIsNone(audio_processor.download_file(self.url, "hlaseni.ogg"))
+        self.assertEqual(os.path.getsize(self.part_path), self.server.cut)
+
+        self.assertIsNotNone(audio_processor.download_file(self.url, "hlaseni.ogg"))
+        self.assertEqual(self.server.ranges, [None, "bytes=102400-"])
+        self.assertFalse(os.path.exists(self.part_path))
+
+    def test_corrupted_download_is_discarded(self):
+        """Test, že soubor s hashem neodpovídajícím hlavičce Repr-Digest se zahodí."""
+        audio_processor.DOWNLOAD_RESUME_ATTEMPTS = 1
+        self.server.digest = base64.b64encode(hashlib.sha256(b"jiny obsah").digest()).decode("ascii")
+
+        self.assertIsNone(audio_processor.download_file(self.url, "hlaseni.ogg"))
+        self.assertEqual(self.server.ranges, [None, None])
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+
+
+@unittest.skipUnless(shutil.which(audio_processor.FFMPEG_BINARY), "FFmpeg není k dispozici")
+class TestDownloadToMemory(unittest.TestCase):
+    """
+    Testy stahování audia do paměti bez zápisu do audio_files/ (vyžaduje FFmpeg).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "audio.ogg")
+            subprocess.run([audio_processor.FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y",
+                            "-f", "lavfi", "-i", "sine=frequency=440:duration=2", "-c:a", "libopus", path],
+                           check=True)
+            with open(path, "rb") as f:
+                cls.audio = f.read()
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _AudioHandler)
+        self.server.audio = self.audio
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/rozhlas/Hlášení 1.2..ogg"
+        http_client.close_session()
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original = (audio_processor.OGG_DIR, audio_processor.MP3_DIR, audio_processor.TRANSCODE_MODE,
+                         audio_processor.AUDIO_SPOOL_MAX_MB, audio_processor.AUDIO_IN_MEMORY,
+                         audio_processor.get_transcript_cache)
+        audio_processor.OGG_DIR = audio_processor.MP3_DIR = self.tmpdir.name
+        audio_processor.get_transcript_cache = lambda: None
+
+    def tearDown(self):
+        (audio_processor.OGG_DIR, audio_processor.MP3_DIR, audio_processor.TRANSCODE_MODE,
+         audio_processor.AUDIO_SPOOL_MAX_MB, audio_processor.AUDIO_IN_MEMORY,
+         audio_processor.get_transcript_cache) = self.original
+        http_client.close_session()
+        self.server.shutdown()
+        self.tmpdir.cleanup()
+
+    def test_download_is_converted_in_memory(self):
+        """Test, že stažené audio se zkonvertuje na MP3 v paměti a hash odpovídá OGG."""
+        audio, audio_hash = audio_processor.download_to_memory(self.url, "test.ogg")
+
+        self.assertEqual(audio.mime_type, "audio/mpeg")
+        self.assertIsNone(audio.temp_path)
+        self.assertFalse(audio.source._rolled)
+        self.assertEqual(audio_hash, hashlib.sha256(self.audio).hexdigest())
+        self.assertGreater(len(audio.source.read()), 1000)
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+        audio.source.close()
+
+    def test_large_audio_spills_to_disk(self):
+        """Test, že audio nad AUDIO_SPOOL_MAX_MB se přelije do dočasného souboru."""
+        audio_processor.AUDIO_SPOOL_MAX_MB = 0.001
+        audio_processor.TRANSCODE_MODE = "direct"
+        audio, _ = audio_processor.download_to_memory(self.url, "test.ogg")
+
+        self.assertEqual(audio.mime_type, "audio/ogg")
+        self.assertTrue(audio.source._rolled)
+        self.assertEqual(audio.source.read(), self.audio)
+        audio.source.close()
+
+    def test_failed_download_returns_none(self):
+        """Test, že chyba stahování vrátí None."""
+        self.assertIsNone(audio_processor.download_to_memory(self.url + ".chybi", "test.ogg"))
+
+    def test_stage_download_skips_disk(self):
+        """Test, že fáze stažení v režimu AUDIO_IN_MEMORY připraví audio bez souborů a konverze."""
+        audio_processor.AUDIO_IN_MEMORY = True
+        item = audio_processor.AnnouncementItem(url=self.url, filename="Hlášení 1.2..ogg")
+
+        self.assertTrue(audio_processor.stage_download(item))
+        self.assertTrue(audio_processor.stage_convert(item))
+        self.assertIsNone(item.ogg_path)
+        self.assertEqual(item.audio.mime_type, "audio/mpeg")
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+        item.cleanup()
+        self.assertIsNone(item.audio)
+
+
+@unittest.skipUnless(shutil.which(audio_processor.FFMPEG_BINARY), "FFmpeg není k dispozici")
+class TestTranscodeModes(unittest.TestCase):
+    """
+    Testy přípravy audia v režimech TRANSCODE_MODE=mp3, direct a stream (vyžaduje FFmpeg).
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.mp3_dir = os.path.join(self.tmpdir.name, "mp3")
+        os.makedirs(self.mp3_dir)
+        self.original = (audio_processor.MP3_DIR, audio_processor.TRANSCODE_MODE, audio_processor.FFMPEG_BINARY)
+        audio_processor.MP3_DIR = self.mp3_dir
+        self.ogg_path = os.path.join(self.tmpdir.name, "hlaseni.ogg")
+        subprocess.run([audio_processor.FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y",
+                        "-f", "lavfi", "-i", "sine=frequency=440:duration=2", "-c:a", "libopus", self.ogg_path],
+                       check=True)
+
+    def tearDown(self):
+        audio_processor.MP3_DIR, audio_processor.TRANSCODE_MODE, audio_processor.FFMPEG_BINARY = self.original
+        self.tmpdir.cleanup()
+
+    def _prepare(self, mode: str):
+        audio_processor.TRANSCODE_MODE = mode
+        item = audio_processor.AnnouncementItem(url="https://x/hlaseni.ogg", filename="hlaseni.ogg",
+                                                ogg_path=self.ogg_path)
+        item.audio = audio_processor.prepare_audio(self.ogg_path)
+        return item
+
+    @staticmethod
+    def _is_mp3(data: bytes) -> bool:
+        return data.startswith(b"ID3") or (data[0] == 0xFF and data[1] & 0xE0 == 0xE0)
+
+    @unittest.skipUnless(shutil.which("ffprobe"), "pydub potřebuje ffprobe")
+    def test_mp3_mode_writes_temp_file_removed_by_cleanup(self):
+        """Test, že režim mp3 vytvoří MP3 soubor, který úklid položky smaže i s OGG."""
+        item = self._prepare("mp3")
+
+        self.assertEqual(item.audio.mime_type, "audio/mpeg")
+        self.assertEqual(item.audio.temp_path, item.audio.source)
+        self.assertEqual(os.path.dirname(item.audio.temp_path), self.mp3_dir)
+        with open(item.audio.source, "rb") as f:
+            self.assertTrue(self._is_mp3(f.read(4)))
+
+        item.cleanup()
+        self.assertEqual(os.listdir(self.mp3_dir), [])
+        self.assertFalse(os.path.exists(self.ogg_path))
+
+    def test_direct_mode_uploads_ogg_without_temp_files(self):
+        """Test, že režim direct použije stažené OGG beze změny a nic dalšího nevytvoří."""
+        item = self._prepare("direct")
+
+        self.assertEqual(item.audio.mime_type, "audio/ogg")
+        self.assertEqual(item.audio.source, self.ogg_path)
+        self.assertIsNone(item.audio.temp_path)
+        self.assertEqual(os.listdir(self.mp3_dir), [])
+
+        item.cleanup()
+        self.assertFalse(os.path.exists(self.ogg_path))
+
+    def test_stream_mode_converts_in_memory(self):
+        """Test, že režim stream vrátí MP3 v paměti bez mezisouboru a úklid buffer zavře."""
+        item = self._prepare("stream")
+        source = item.audio.source
+
+        self.assertEqual(item.audio.mime_type, "audio/mpeg")
+        self.assertIsNone(item.audio.temp_path)
+        self.assertTrue(self._is_mp3(source.getvalue()))
+        self.assertEqual(os.listdir(self.mp3_dir), [])
+
+        item.cleanup()
+        self.assertTrue(source.closed)
+        self.assertFalse(os.path.exists(self.ogg_path))
+
+    def test_ffmpeg_failure_returns_none(self):
+        """Test, že chyba FFmpeg (poškozené audio, chybějící program) vrátí None a nezanechá soubory."""
+        with open(self.ogg_path, "wb") as f:
+            f.write(b"OggS" + b"\x00" * 200)
+        for mode in ("stream", "mp3"):
+            with self.subTest(mode=mode):
+                failures = metrics.STAGE_RESULTS.value(stage="convert", result="failure")
+                self.assertIsNone(self._prepare(mode).audio)
+                self.assertEqual(metrics.STAGE_RESULTS.value(stage="convert", result="failure"), failures + 1)
+                self.assertEqual(os.listdir(self.mp3_dir), [])
+
+        audio_processor.FFMPEG_BINARY = os.path.join(self.tmpdir.name, "ffmpeg-chybi")
+        self.assertIsNone(audio_processor.transcode_stream(self.ogg_path))
+
+
+@unittest.skipUnless(shutil.which(audio_processor.FFMPEG_BINARY), "FFmpeg není k dispozici")
+class TestSpeechPreprocessing(unittest.TestCase):
+    """
+    Testy předzpracování audia pro přepis v režimu TRANSCODE_MODE=speech (vyžaduje FFmpeg).
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original = (audio_processor.MP3_DIR, audio_processor.TRANSCODE_MODE)
+        audio_processor.MP3_DIR = self.tmpdir.name
+        audio_processor.TRANSCODE_MODE = "speech"
+        # Stereo 48 kHz: 2 s ticho, 3 s tón, 4 s ticho, 3 s tón, 3 s ticho
+        tone = "if(between(t\\,2\\,5)+between(t\\,9\\,12)\\,0.5*sin(2*PI*440*t)\\,0)"
+        self.ogg_path = os.path.join(self.tmpdir.name, "hlaseni.ogg")
+        subprocess.run([audio_processor.FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y",
+                        "-f", "lavfi", "-i", f"aevalsrc={tone}|{tone}:d=15:s=48000",
+                        "-c:a", "libopus", self.ogg_path], check=True)
+
+    def tearDown(self):
+        audio_processor.MP3_DIR, audio_processor.TRANSCODE_MODE = self.original
+        self.tmpdir.cleanup()
+
+    def test_silence_is_trimmed_and_audio_downmixed(self):
+        """Test, že předzpracování zkrátí ticho, převede audio na mono a zmenší ho."""
+        observed = metrics.AUDIO_REDUCTION_RATIO.count(measure="seconds")
+        audio = audio_processor.prepare_audio(self.ogg_path)
+
+        self.assertEqual(audio.mime_type, "audio/ogg")
+        self.assertEqual(audio.temp_path, audio.source)
+        duration = audio_processor.ogg_duration(audio.source)
+        # Zůstanou 6 s tónu a zkrácené pauzy
+        self.assertGreater(duration, 6)
+        self.assertLess(duration, 9)
+        self.assertLess(os.path.getsize(audio.source), os.path.getsize(self.ogg_path) / 2)
+        with open(audio.source, "rb") as f:
+            head = f.read(4096)
+        self.assertEqual(head[head.find(b"OpusHead") + 9], 1)
+        self.assertEqual(metrics.AUDIO_REDUCTION_RATIO.count(measure="seconds"), observed + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import hashlib
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+# Klíče vyžaduje config.validate_config(), pro testy stačí fiktivní hodnoty
+for _key in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT"):
+    os.environ.setdefault(_key, "test")
+
+import chunking
+from transcript_cache import TranscriptCache
+
+
+class TestChunkPlanning(unittest.TestCase):
+    """
+    Unit testy pro rozdělení audia na úseky a spojení přepisů.
+    """
+
+    def test_cuts_in_last_silence(self):
+        """Test, že se řeže uprostřed posledního ticha v druhé polovině úseku."""
+        silences = [(10_000, 11_000), (70_000, 72_000), (100_000, 101_000)]
+        chunks = chunking.plan_chunks(250_000, silences, max_chunk_ms=120_000)
+        self.assertEqual(chunks[0], (0, 100_500))
+        self.assertEqual(chunks[-1][1], 250_000)
+        for (_, end), (start, _) in zip(chunks, chunks[1:]):
+            self.assertEqual(end, start)
+
+    def test_hard_cut_overlaps(self):
+        """Test, že bez ticha se řeže na max. délce a další úsek se překrývá."""
+        chunks = chunking.plan_chunks(250_000, [], max_chunk_ms=120_000, overlap_ms=2_000)
+        self.assertEqual(chunks, [(0, 120_000), (118_000, 238_000), (236_000, 250_000)])
+
+    def test_short_audio_is_one_chunk(self):
+        """Test, že krátké audio se nedělí."""
+        self.assertEqual(chunking.plan_chunks(60_000, [(1_000, 2_000)], max_chunk_ms=120_000), [(0, 60_000)])
+
+    def test_merge_removes_overlap(self):
+        """Test, že text zopakovaný v překryvu se ve výsledku objeví jen jednou."""
+        merged = chunking.merge_transcripts([
+            "Vážení občané, obecní úřad oznamuje, že zítra",
+            "že zítra bude přerušena dodávka vody.",
+            "Děkujeme za pochopení.",
+        ])
+        self.assertEqual(merged, "Vážení občané, obecní úřad oznamuje, že zítra\n"
+                                 "bude přerušena dodávka vody.\nDěkujeme za pochopení.")
+
+    def test_merge_keeps_single_word_match(self):
+        """Test, že shoda jediného slova se za překryv nepovažuje."""
+        self.assertEqual(chunking.merge_transcripts(["prodej masa a", "a zeleniny"]), "prodej masa a\na zeleniny")
+
+
+class TestChunkedTranscription(unittest.TestCase):
+    """
+    Testy přepisu po úsecích s podvrženým přepisem úseků.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = TranscriptCache(os.path.join(self.tmpdir.name, "cache.db"), max_bytes=10**6,
+                                     max_age_seconds=3600)
+        self.original = (chunking.transcribe_audio_with_model, chunking.get_transcript_cache, chunking.split_audio,
+                         chunking.transcription_model_ids)
+        chunking.get_transcript_cache = lambda: self.cache
+        chunking.transcription_model_ids = lambda: ["vzdálený", "lokální"]
+        self.calls = []
+
+    def tearDown(self):
+        (chunking.transcribe_audio_with_model, chunking.get_transcript_cache, chunking.split_audio,
+         chunking.transcription_model_ids) = self.original
+        self.cache.close()
+        self.tmpdir.cleanup()
+
+    def _fake_transcribe(self, failures: dict):
+        def transcribe(audio, mime_type=None, display_name=None, priority=0, audio_seconds=None):
+            index = audio.getvalue().decode()
+            self.calls.append((index, audio_seconds))
+            # Úseky do 20 s přepisuje "lokální" model, delší "vzdálený" (jako v režimu auto)
+            model_id = "lokální" if audio_seconds <= 20 else "vzdálený"
+            if failures.get(index, 0) > 0:
+                failures[index] -= 1
+                return None, model_id
+            return f"úsek {index}", model_id
+        return transcribe
+
+    def _use_chunks(self, count: int):
+        chunking.split_audio = lambda source, audio_seconds=None: [(io.BytesIO(str(i).encode()), 10.0 * (i + 1)) for i in range(count)]
+
+    def test_failed_chunk_is_retried_alone(self):
+        """Test, že se opakuje jen neúspěšný úsek a pořadí přepisů zůstane zachováno."""
+        self._use_chunks(3)
+        chunking.transcribe_audio_with_model = self._fake_transcribe({"1": 1})
+        transcript = chunking.transcribe_chunked("audio.mp3", display_name="test")
+
+        self.assertEqual(transcript, "úsek 0\núsek 1\núsek 2")
+        self.assertEqual(sorted(self.calls), [("0", 10.0), ("1", 20.0), ("1", 20.0), ("2", 30.0)])
+
+    def test_finished_chunks_are_cached(self):
+        """Test, že po selhání jednoho úseku se hotové úseky v dalším běhu nepřepisují."""
+        self._use_chunks(3)
+        chunking.transcribe_audio_with_model = self._fake_transcribe({"2": chunking.TRANSCRIBE_CHUNK_RETRIES + 1})
+        self.assertIsNone(chunking.transcribe_chunked("audio.mp3", display_name="test"))
+
+        self.calls.clear()
+        chunking.transcribe_audio_with_model = self._fake_transcribe({})
+        self.assertEqual(chunking.transcribe_chunked("audio.mp3", display_name="test"), "úsek 0\núsek 1\núsek 2")
+        self.assertEqual(self.calls, [("2", 30.0)])
+
+    def test_chunk_duration_selects_backend_and_cache_key(self):
+        """Test, že úsek se přepíše s vlastní délkou a v cache se uloží pod modelem, který ho přepsal."""
+        self._use_chunks(3)
+        chunking.transcribe_audio_with_model = self._fake_transcribe({})
+
+        transcript, model_id = chunking.transcribe_chunked_with_model("audio.mp3", display_name="test")
+
+        self.assertEqual(transcript, "úsek 0\núsek 1\núsek 2")
+        self.assertEqual(model_id, "lokální+vzdálený")
+        chunk_hash = hashlib.sha256(b"2").hexdigest()
+        self.assertEqual(self.cache.get(chunking.cache_key(chunk_hash, "vzdálený", chunking.TRANSCRIPTION_PROMPT)),
+                         "úsek 2")
+        self.assertIsNone(self.cache.get(chunking.cache_key(chunk_hash, "lokální", chunking.TRANSCRIPTION_PROMPT)))
+
+
+@unittest.skipUnless(shutil.which(chunking.FFMPEG_BINARY), "FFmpeg není k dispozici")
+class TestSplitAudio(unittest.TestCase):
+    """
+    Test rozdělení skutečného audia v místech ticha (vyžaduje FFmpeg).
+    """
+
+    def test_splits_at_silence(self):
+        """Test, že tón-ticho-tón se rozdělí na dva úseky."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "audio.ogg")
+            subprocess.run(
+                [chunking.FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y",
+                 "-f", "lavfi", "-i", "sine=frequency=440:duration=3",
+                 "-f", "lavfi", "-i", "anullsrc=r=16000:cl=mono:d=1",
+                 "-f", "lavfi", "-i", "sine=frequency=440:duration=3",
+                 "-filter_complex", "[0][1][2]concat=n=3:v=0:a=1", "-ac", "1", "-ar", "16000",
+                 "-c:a", "libopus", path],
+                check=True,
+            )
+            chunks = chunking.split_audio(path, max_chunk_ms=5_000)
+
+        self.assertEqual(len(chunks), 2)
+        self.assertTrue(all(chunk.getvalue() for chunk, _ in chunks))
+        self.assertAlmostEqual(sum(seconds for _, seconds in chunks), 7, delta=0.5)
+
+    def test_short_audio_is_not_decoded(self):
+        """Test, že audio známé délky do max. délky úseku se vrátí celé bez dekódování."""
+        original = chunking._decode_pcm
+
+        def decode(data):
+            raise AssertionError("krátké audio se nemá dekódovat")
+
+        chunking._decode_pcm = decode
+        try:
+            chunks = chunking.split_audio(io.BytesIO(b"audio"), max_chunk_ms=5_000, audio_seconds=4.0)
+        finally:
+            chunking._decode_pcm = original
+
+        self.assertEqual([(chunk.getvalue(), seconds) for chunk, seconds in chunks], [(b"audio", 4.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
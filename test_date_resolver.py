@@ -0,0 +1,81 @@
+import os
+import unittest
+from datetime import date, datetime
+
+# Klíče vyžaduje config.validate_config(), pro testy stačí fiktivní hodnoty
+for _key in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT"):
+    os.environ.setdefault(_key, "test")
+
+import date_resolver
+import sources
+from date_resolver import resolve_broadcast_dates
+from sources import Source
+
+
+class TestDateResolver(unittest.TestCase):
+    """
+    Unit testy pro určení data vysílání z názvů souborů celé stránky.
+    """
+
+    def tearDown(self):
+        date_resolver._resolved = {}
+        sources.register_sources(None)
+
+    def test_year_rolls_back_across_january(self):
+        """Test, že při zpětném zpracování přes Nový rok dostanou prosincová hlášení minulý rok."""
+        names = ["Hlášení 28.12..ogg", "Hlášení 30.12..ogg", "Hlášení 2.1..ogg", "Hlášení 9.1..ogg"]
+
+        dates = resolve_broadcast_dates(names, today=date(2025, 1, 10))
+
+        self.assertEqual([d.date() for d in dates],
+                         [date(2024, 12, 28), date(2024, 12, 30), date(2025, 1, 2), date(2025, 1, 9)])
+
+    def test_newest_announcement_is_not_in_future(self):
+        """Test, že hlášení s datem po dnešku patří do minulého roku, i přes více let zpět."""
+        names = ["Hlášení 29.2..ogg", "Hlášení 3.5..ogg", "Hlášení 1.3..ogg", "Hlášení 15.6..ogg"]
+
+        dates = resolve_broadcast_dates(names, today=date(2025, 3, 1))
+
+        # 15.6. by byl po dnešku, 3.5. je pozdější než následující 1.3., 29. 2. je až v roce 2020
+        self.assertEqual([d.date() for d in dates],
+                         [date(2020, 2, 29), date(2023, 5, 3), date(2024, 3, 1), date(2024, 6, 15)])
+
+    def test_same_day_announcements_get_distinct_times(self):
+        """Test, že více hlášení téhož dne dostane různé časy v pořadí na stránce."""
+        names = ["Hlášení 3.2..ogg", "Hlášení 3.2. odpoledne.ogg", "Hlášení 4.2..ogg", "Hlášení 3.2. večer.ogg"]
+
+        dates = resolve_broadcast_dates(names, today=date(2025, 2, 5))
+
+        self.assertEqual(dates[:2], [datetime(2025, 2, 3, 12, 0), datetime(2025, 2, 3, 12, 1)])
+        self.assertEqual(dates[2], datetime(2025, 2, 4, 12, 0))
+        self.assertEqual(dates[3], datetime(2025, 2, 3, 12, 2))
+
+    def test_invalid_names_and_explicit_year(self):
+        """Test, že název bez platného data vrátí None a rok v názvu má přednost."""
+        pattern = r"(?P<day>\d+)\.(?P<month>\d+)\.(?P<year>\d{4})?"
+        names = ["znelka.ogg", "Hlášení 1.12.2023.ogg", "Hlášení 31.2..ogg", "Hlášení 5.1..ogg"]
+
+        dates = resolve_broadcast_dates(names, pattern, today=date(2025, 1, 6))
+
+        self.assertIsNone(dates[0])
+        self.assertEqual(dates[1], datetime(2023, 12, 1, 12, 0))
+        self.assertIsNone(dates[2])
+        self.assertEqual(dates[3], datetime(2025, 1, 5, 12, 0))
+
+    def test_resolved_pages_are_used_for_sending(self):
+        """Test, že data z vyhodnocených stránek se použijí při odeslání hlášení."""
+        source = Source("a", "https://a.example/rozhlas.php", "https://a.example/")
+        sources.register_sources([source])
+        urls = ["https://a.example/Hl%C3%A1%C5%A1en%C3%AD%2030.12..ogg", "https://a.example/Hlášení 2.1..ogg"]
+
+        resolved = date_resolver.resolve_pages({source: urls}, today=date(2025, 1, 3))
+
+        self.assertEqual(resolved[urls[0]], datetime(2024, 12, 30, 12, 0))
+        self.assertEqual(date_resolver.broadcast_datetime(urls[0]), datetime(2024, 12, 30, 12, 0))
+        # URL mimo vyhodnocené stránky se vyhodnotí samostatně
+        self.assertEqual(date_resolver.broadcast_datetime("https://a.example/Hlášení 5.1..ogg"),
+                         resolve_broadcast_dates(["Hlášení 5.1..ogg"])[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import importlib.util
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+# Klíče vyžaduje config.validate_config(), pro testy stačí fiktivní hodnoty
+for _key in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT"):
+    os.environ.setdefault(_key, "test")
+
+import audio_processor
+import fingerprint
+from transcript_cache import TranscriptCache
+
+
+def _generate(path: str, source: str, *options: str) -> str:
+    subprocess.run([fingerprint.FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y",
+                    "-f", "lavfi", "-i", source, *options, path], check=True)
+    return path
+
+
+@unittest.skipUnless(shutil.which(fingerprint.FFMPEG_BINARY) and importlib.util.find_spec("numpy"),
+                     "FFmpeg nebo NumPy není k dispozici")
+class TestFingerprint(unittest.TestCase):
+    """
+    Testy akustických otisků a vyhledání podobných hlášení (vyžaduje FFmpeg a NumPy).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        directory = cls.tmpdir.name
+        cls.original = _generate(os.path.join(directory, "original.ogg"),
+                                 "anoisesrc=d=8:c=pink:seed=1", "-c:a", "libopus")
+        # Stejná nahrávka znovu nahraná jinak: ticho na začátku, poloviční hlasitost, MP3
+        cls.reupload = os.path.join(directory, "reupload.mp3")
+        subprocess.run([fingerprint.FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y",
+                        "-i", cls.original, "-af", "adelay=500,volume=0.5", "-b:a", "64k", cls.reupload],
+                       check=True)
+        cls.other = _generate(os.path.join(directory, "other.ogg"),
+                              "anoisesrc=d=8:c=pink:seed=2", "-c:a", "libopus")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def setUp(self):
+        self.index = fingerprint.FingerprintIndex(os.path.join(self.tmpdir.name, "fingerprints.db"))
+        self.cache = TranscriptCache(os.path.join(self.tmpdir.name, "transcripts.db"), 1024 * 1024, 3600)
+        self.original_hooks = (audio_processor.get_fingerprint_index, audio_processor.get_transcript_cache,
+                               audio_processor.FINGERPRINT_ACTION, audio_processor.record_item_stage)
+        audio_processor.get_fingerprint_index = lambda: self.index
+        audio_processor.get_transcript_cache = lambda: self.cache
+        # Rozpracovaný stav se v těchto testech neukládá
+        audio_processor.record_item_stage = lambda *args, **kwargs: None
+
+    def tearDown(self):
+        (audio_processor.get_fingerprint_index, audio_processor.get_transcript_cache,
+         audio_processor.FINGERPRINT_ACTION, audio_processor.record_item_stage) = self.original_hooks
+        self.index.close()
+        self.cache.close()
+        for name in ("fingerprints.db", "transcripts.db"):
+            for suffix in ("", "-wal", "-shm"):
+                path = os.path.join(self.tmpdir.name, name + suffix)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def test_reupload_is_similar(self):
+        """Test, že překódovaná a posunutá nahrávka je podobná, jiná nahrávka ne."""
+        original = fingerprint.compute_fingerprint(self.original)
+        with open(self.reupload, "rb") as f:
+            reupload = fingerprint.compute_fingerprint(f)
+            self.assertEqual(f.tell(), 0)
+        other = fingerprint.compute_fingerprint(self.other)
+
+        self.assertGreater(fingerprint.similarity(original, reupload, self.index.max_shift), 0.85)
+        self.assertLess(fingerprint.similarity(original, other, self.index.max_shift), 0.6)
+
+    def test_index_finds_best_match(self):
+        """Test vyhledání v indexu a filtru podle délky nahrávky."""
+        original = fingerprint.compute_fingerprint(self.original)
+        self.index.add("https://a/original.ogg", original, "klic")
+        self.index.add("https://a/other.ogg", fingerprint.compute_fingerprint(self.other), None)
+        self.index.add("https://a/kratke.ogg", original[:len(original) // 2], None)
+
+        match = self.index.find(fingerprint.compute_fingerprint(self.reupload))
+        self.assertEqual(match.url, "https://a/original.ogg")
+        self.assertEqual(match.transcript_key, "klic")
+
+    def test_similar_announcement_links_transcript(self):
+        """Test, že znovu nahrané hlášení převezme přepis z cache a nepřepisuje se."""
+        first = audio_processor.AnnouncementItem(url="https://a/original.ogg", filename="original.ogg",
+                                                 ogg_path=self.original, cache_key="klic-1")
+        audio_processor.lookup_similar_announcement(first)
+        self.assertIsNone(first.transcript)
+        first.transcript = "Přepis hlášení"
+        self.cache.put(first.cache_key, first.transcript)
+        audio_processor.remember_fingerprint(first)
+
+        second = audio_processor.AnnouncementItem(url="https://a/reupload.mp3", filename="reupload.mp3",
+                                                  ogg_path=self.reupload, cache_key="klic-2")
+        audio_processor.lookup_similar_announcement(second)
+        self.assertEqual(second.transcript, "Přepis hlášení")
+        self.assertEqual(self.cache.get("klic-2"), "Přepis hlášení")
+
+        audio_processor.FINGERPRINT_ACTION = "skip"
+        third = audio_processor.AnnouncementItem(url="https://a/znovu.mp3", filename="znovu.mp3",
+                                                 ogg_path=self.reupload)
+        audio_processor.lookup_similar_announcement(third)
+        self.assertTrue(third.posted)
+        self.assertIsNone(third.transcript)
+
+
+if __name__ == '__main__':
+    unittest.main()
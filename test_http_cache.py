@@ -0,0 +1,164 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+# Klíče vyžaduje config.validate_config(), pro testy stačí fiktivní hodnoty
+for _key in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT"):
+    os.environ.setdefault(_key, "test")
+
+import main
+import scraper
+from http_cache import ValidatorCache
+from sources import get_sources
+
+PAGE_URL = "https://obec.example/rozhlas.php"
+PAGE = '<html><body><a href="rozhlas/Hlášení 1.1..ogg">1.1.</a></body></html>'.encode("utf-8")
+
+
+class TestValidatorCache(unittest.TestCase):
+    """
+    Unit testy cache HTTP validátorů stránky s hlášeními.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "http_cache.json")
+        self.cache = ValidatorCache(self.path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _check(self, cache, content=PAGE, etag='"v1"'):
+        return cache.check_content(PAGE_URL, hashlib.sha256(content).hexdigest(), len(content),
+                                   etag=etag, last_modified="Wed, 01 Jan 2025 08:00:00 GMT")
+
+    def test_validators_are_committed_only_after_success(self):
+        """Test, že validátory nové verze se použijí až po commit(), i v dalším běhu."""
+        self.assertFalse(self._check(self.cache))
+        self.assertEqual(self.cache.conditional_headers(PAGE_URL), {})
+        # Běh, ve kterém zpracování selhalo, nic nepotvrdil - další běh stáhne stránku celou
+        self.assertEqual(ValidatorCache(self.path).conditional_headers(PAGE_URL), {})
+
+        self.cache.commit(PAGE_URL)
+
+        expected = {"If-None-Match": '"v1"', "If-Modified-Since": "Wed, 01 Jan 2025 08:00:00 GMT"}
+        self.assertEqual(self.cache.conditional_headers(PAGE_URL), expected)
+        self.assertEqual(ValidatorCache(self.path).conditional_headers(PAGE_URL), expected)
+
+    def test_unchanged_content_hash_is_a_hit(self):
+        """Test, že stejný obsah bez 304 (např. jiný ETag) se pozná podle hashe."""
+        self._check(self.cache)
+        self.cache.commit(PAGE_URL)
+
+        self.assertTrue(self._check(self.cache, etag='"v2"'))
+        self.assertFalse(self._check(self.cache, content=PAGE + b"<!-- zmena -->"))
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 2, "bytes_saved": 0})
+
+    def test_not_modified_counts_saved_bytes(self):
+        """Test, že odpověď 304 se počítá jako zásah i s ušetřenými bajty potvrzené verze."""
+        self._check(self.cache)
+        self.cache.commit(PAGE_URL)
+
+        self.cache.record_not_modified(PAGE_URL)
+        self.cache.record_not_modified(PAGE_URL)
+
+        self.assertEqual(self.cache.stats(), {"hits": 2, "misses": 1, "bytes_saved": 2 * len(PAGE)})
+
+    def test_saves_only_on_commit_with_changes(self):
+        """Test, že vyhledání do souboru nezapisují a commit zapíše jen změněnou cache."""
+        saves = []
+        original_save = self.cache._save
+        self.cache._save = lambda: (saves.append(1), original_save())
+
+        self._check(self.cache)
+        self.cache.record_not_modified(PAGE_URL)
+        self.assertEqual(saves, [])
+        self.assertFalse(os.path.exists(self.path))
+
+        self.cache.commit(PAGE_URL)
+        self.cache.commit(PAGE_URL)
+        self.assertEqual(len(saves), 1)
+
+        # Nezměněná stránka: počítadla z běhu se uloží při commit(), jinak se nic nezapisuje
+        self._check(self.cache)
+        self.cache.commit(PAGE_URL)
+        self.cache.commit(PAGE_URL)
+        self.assertEqual(len(saves), 2)
+        self.assertEqual(ValidatorCache(self.path).stats(), self.cache.stats())
+
+
+class TestScraperConditionalFetch(unittest.TestCase):
+    """
+    Testy zkrácení zpracování stránky v scraper.parse_announcements_page().
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original = (scraper._validator_cache, scraper.HTTP_CACHE_ENABLED)
+        scraper.HTTP_CACHE_ENABLED = True
+        scraper._validator_cache = ValidatorCache(os.path.join(self.tmpdir.name, "http_cache.json"))
+        self.source = get_sources()[0]
+
+    def tearDown(self):
+        scraper._validator_cache, scraper.HTTP_CACHE_ENABLED = self.original
+        self.tmpdir.cleanup()
+
+    def test_not_modified_and_unchanged_page_skip_parsing(self):
+        """Test, že 304 i nezměněný obsah vrátí prázdný seznam, dokud se stránka nepotvrdí jinak."""
+        headers = {"ETag": '"v1"', "Content-Type": "text/html; charset=utf-8"}
+
+        self.assertEqual(len(scraper.parse_announcements_page(200, PAGE, headers, source=self.source)), 1)
+        # Nepotvrzená verze se při dalším stažení zpracuje znovu
+        self.assertEqual(len(scraper.parse_announcements_page(200, PAGE, headers, source=self.source)), 1)
+
+        scraper.confirm_page_processed(self.source)
+
+        self.assertEqual(scraper.page_request_headers(self.source), {"If-None-Match": '"v1"'})
+        self.assertEqual(scraper.parse_announcements_page(304, b"", {}, source=self.source), [])
+        self.assertEqual(scraper.parse_announcements_page(200, PAGE, headers, source=self.source), [])
+        self.assertEqual(scraper._validator_cache.stats()["hits"], 2)
+
+
+class _NotModifiedResponse:
+    status_code = 304
+    content = b""
+    headers = {}
+
+    def raise_for_status(self):
+        pass
+
+
+class TestIdleRunSavesCounters(unittest.TestCase):
+    """
+    Test, že běh bez změny stránky uloží počítadla cache validátorů na disk.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmpdir.name)
+        self.path = os.path.join(self.tmpdir.name, "http_cache.json")
+        self.original = (scraper._validator_cache, scraper.HTTP_CACHE_ENABLED, scraper.http_client.get)
+        scraper.HTTP_CACHE_ENABLED = True
+        self.source = get_sources()[0]
+        cache = ValidatorCache(self.path)
+        cache.check_content(self.source.page_url, hashlib.sha256(PAGE).hexdigest(), len(PAGE), etag='"v1"')
+        cache.commit(self.source.page_url)
+        scraper._validator_cache = ValidatorCache(self.path)
+        scraper.http_client.get = lambda url, headers=None, timeout=None: _NotModifiedResponse()
+
+    def tearDown(self):
+        scraper._validator_cache, scraper.HTTP_CACHE_ENABLED, scraper.http_client.get = self.original
+        os.chdir(self.cwd)
+        self.tmpdir.cleanup()
+
+    def test_not_modified_run_writes_counters(self):
+        """Test, že main() po odpovědi 304 zapíše zásah a ušetřené bajty do souboru cache."""
+        self.assertEqual(main.main(), 0)
+
+        self.assertEqual(ValidatorCache(self.path).stats(), {"hits": 1, "misses": 1, "bytes_saved": len(PAGE)})
+
+
+if __name__ == '__main__':
+    unittest.main()
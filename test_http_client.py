@@ -0,0 +1,118 @@
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Klíče vyžaduje config.validate_config(), pro testy stačí fiktivní hodnoty
+for _key in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT"):
+    os.environ.setdefault(_key, "test")
+
+import http_client
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """
+    Lokální stub server: na cestě /flaky/N vrátí N-krát 502, potom 200.
+    Na /fail/STATUS vrací vždy daný stavový kód.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self, status: int, body: bytes = b"ok") -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self) -> None:
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        if length:
+            self.rfile.read(length)
+        with server.lock:
+            server.requests.append((self.command, self.path))
+            server.client_ports.add(self.client_address[1])
+            count = server.hits.get(self.path, 0)
+            server.hits[self.path] = count + 1
+
+        parts = self.path.strip("/").split("/")
+        if parts[0] == "flaky" and count < int(parts[1]):
+            self._respond(502, b"bad gateway")
+        elif parts[0] == "fail":
+            self._respond(int(parts[1]), b"error")
+        else:
+            self._respond(200)
+
+    do_GET = _handle
+    do_POST = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHttpClient(unittest.TestCase):
+    """
+    Testy sdílené HTTP vrstvy proti lokálnímu stub serveru.
+    """
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.client_ports = set()
+        self.server.hits = {}
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+        # Bez čekání mezi pokusy, ať testy běží rychle
+        self.original_backoff = http_client.HTTP_BACKOFF_FACTOR
+        http_client.HTTP_BACKOFF_FACTOR = 0
+        http_client.close_session()
+
+    def tearDown(self):
+        http_client.close_session()
+        http_client.HTTP_BACKOFF_FACTOR = self.original_backoff
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_get_retries_transient_errors(self):
+        """Test, že GET po dvou odpovědích 502 uspěje."""
+        response = http_client.get(f"{self.base_url}/flaky/2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.hits["/flaky/2"], 3)
+
+    def test_get_gives_up_after_retries(self):
+        """Test, že po vyčerpání pokusů se vrátí poslední chybová odpověď."""
+        response = http_client.get(f"{self.base_url}/fail/500")
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(self.server.hits["/fail/500"], http_client.HTTP_RETRIES + 1)
+
+    def test_post_retried_only_on_gateway_errors(self):
+        """Test, že POST se opakuje při 502, ale ne při 500."""
+        response = http_client.post(f"{self.base_url}/flaky/1", json={"a": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.hits["/flaky/1"], 2)
+
+        response = http_client.post(f"{self.base_url}/fail/500", json={"a": 1})
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(self.server.hits["/fail/500"], 1)
+
+    def test_connection_is_reused(self):
+        """Test, že opakované požadavky na stejný server využijí jedno spojení (keep-alive)."""
+        for _ in range(5):
+            http_client.get(f"{self.base_url}/ok").raise_for_status()
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_host_timeout_override(self):
+        """Test, že timeout z HTTP_HOST_TIMEOUTS má přednost před výchozím."""
+        original = dict(http_client.HTTP_HOST_TIMEOUTS)
+        http_client.HTTP_HOST_TIMEOUTS["example.com"] = 3.5
+        try:
+            self.assertEqual(http_client.timeout_for("https://example.com/x", 30), 3.5)
+            self.assertEqual(http_client.timeout_for("https://example.org/x", 30), 30)
+        finally:
+            http_client.HTTP_HOST_TIMEOUTS.clear()
+            http_client.HTTP_HOST_TIMEOUTS.update(original)
+
+
+if __name__ == '__main__':
+    unittest.main()
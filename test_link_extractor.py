@@ -0,0 +1,91 @@
+import os
+import unittest
+
+# Klíče vyžaduje config.validate_config(), pro testy stačí fiktivní hodnoty
+for _key in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT"):
+    os.environ.setdefault(_key, "test")
+
+import config
+from link_extractor import decode_html, iter_announcement_links, resolve_backend
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_fixtures", "rozhlas.html")
+PREFIX = "rozhlas/Hlášení"
+EXPECTED = [
+    "rozhlas/Hlášení 6.1..ogg",
+    "rozhlas/Hlášení 5.1..ogg",
+    "rozhlas/Hlášení 4.1. odpoledne.ogg",
+    "rozhlas/Hlášení 4.1..ogg",
+    "rozhlas/Hlášení 3.1..ogg",
+    "rozhlas/Hlášení 2.1..ogg",
+    "rozhlas/Hlášení 1.1..ogg",
+]
+
+
+def _load_fixture() -> str:
+    with open(FIXTURE, "rb") as f:
+        return decode_html(f.read())
+
+
+class TestLinkExtractor(unittest.TestCase):
+    """
+    Unit testy streamovacího vyhledání odkazů na uložené stránce rozhlas.php.
+    """
+
+    def setUp(self):
+        self.html = _load_fixture()
+
+    def test_htmlparser_finds_announcements_in_page_order(self):
+        """Test, že html.parser najde jen odkazy na hlášení (bez .xml, komentářů a skriptů)."""
+        self.assertEqual(list(iter_announcement_links(self.html, PREFIX, backend="htmlparser")), EXPECTED)
+
+    @unittest.skipUnless(resolve_backend("lxml") == "lxml", "lxml není nainstalované")
+    def test_lxml_matches_htmlparser(self):
+        """Test, že lxml vrátí stejné odkazy jako html.parser, i po malých částech stránky."""
+        chunks = [self.html[i:i + 7] for i in range(0, len(self.html), 7)]
+
+        self.assertEqual(list(iter_announcement_links(self.html, PREFIX, backend="lxml")), EXPECTED)
+        self.assertEqual(list(iter_announcement_links(iter(chunks), PREFIX, backend="lxml")), EXPECTED)
+        self.assertEqual(list(iter_announcement_links(iter(chunks), PREFIX, backend="htmlparser")), EXPECTED)
+
+    def test_stops_after_run_of_known_links(self):
+        """Test, že procházení skončí po zadaném počtu již zpracovaných odkazů po sobě."""
+        known = set(EXPECTED[2:])
+        seen = []
+
+        def is_known(href):
+            seen.append(href)
+            return href in known
+
+        links = list(iter_announcement_links(self.html, PREFIX, backend="htmlparser",
+                                             is_known=is_known, stop_after_known=3))
+
+        self.assertEqual(links, EXPECTED[:5])
+        self.assertEqual(seen, EXPECTED[:5])
+
+    def test_new_link_resets_known_run(self):
+        """Test, že nový odkaz mezi zpracovanými přeruší počítání řady známých odkazů."""
+        known = set(EXPECTED) - {EXPECTED[2]}
+
+        links = list(iter_announcement_links(self.html, PREFIX, backend="htmlparser",
+                                             is_known=lambda href: href in known, stop_after_known=3))
+
+        self.assertEqual(links, EXPECTED[:6])
+
+    @unittest.skipIf("SCRAPER_STOP_AFTER_KNOWN" in os.environ, "nastavení je přepsané v prostředí")
+    def test_default_setting_retries_older_failed_announcement(self):
+        """Test, že ve výchozím nastavení se starší neúspěšné hlášení za řadou zpracovaných znovu najde."""
+        # 1.1. selhalo, všech pět novějších hlášení už je zpracováno
+        failed = EXPECTED[-1]
+        known = set(EXPECTED) - {failed}
+
+        links = list(iter_announcement_links(self.html, PREFIX, backend="htmlparser",
+                                             is_known=lambda href: href in known,
+                                             stop_after_known=config.SCRAPER_STOP_AFTER_KNOWN))
+
+        self.assertEqual(config.SCRAPER_STOP_AFTER_KNOWN, 0)
+        self.assertIn(failed, links)
+        self.assertEqual([href for href in links if href not in known], [failed])
+
+
+if __name__ == '__main__':
+    unittest.main()
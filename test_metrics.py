@@ -0,0 +1,116 @@
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+# Klíče vyžaduje config.validate_config(), pro testy stačí fiktivní hodnoty
+for _key in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT"):
+    os.environ.setdefault(_key, "test")
+
+import metrics
+from audio_processor import ogg_duration
+from config import FFMPEG_BINARY
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Unit testy pro metriky fází a jejich export.
+    """
+
+    def test_histogram_renders_cumulative_buckets(self):
+        """Test, že histogram se vykreslí s kumulativními intervaly, součtem a počtem."""
+        histogram = metrics.Histogram("test_seconds", "Testovací histogram.", ("stage",), buckets=(1, 5))
+        for value in (0.5, 2, 10):
+            histogram.observe(value, stage="a")
+
+        lines = histogram.render()
+        self.assertEqual(lines[:2], ["# HELP test_seconds Testovací histogram.", "# TYPE test_seconds histogram"])
+        self.assertEqual(lines[2:], [
+            'test_seconds_bucket{stage="a",le="1"} 1',
+            'test_seconds_bucket{stage="a",le="5"} 2',
+            'test_seconds_bucket{stage="a",le="+Inf"} 3',
+            'test_seconds_sum{stage="a"} 12.5',
+            'test_seconds_count{stage="a"} 3',
+        ])
+
+    def test_labels_are_escaped_and_checked(self):
+        """Test escapování hodnot štítků a kontroly jejich názvů."""
+        counter = metrics.Counter("test_total", "Testovací čítač.", ("queue",))
+        counter.inc(queue='a"b')
+        self.assertEqual(counter.render()[-1], 'test_total{queue="a\\"b"} 1')
+        with self.assertRaises(ValueError):
+            counter.inc(stage="x")
+
+    def test_track_stage_records_result_and_realtime_factor(self):
+        """Test, že měřená fáze zaznamená výsledek, objem dat i real-time factor."""
+        stage = "test_track"
+        with metrics.track_stage(stage) as observation:
+            observation.bytes = 1000
+            observation.audio_seconds = 10
+            time.sleep(0.01)
+        with self.assertRaises(RuntimeError):
+            with metrics.track_stage(stage):
+                raise RuntimeError("selhání")
+
+        self.assertEqual(metrics.STAGE_RESULTS.value(stage=stage, result="success"), 1)
+        self.assertEqual(metrics.STAGE_RESULTS.value(stage=stage, result="failure"), 1)
+        self.assertEqual(metrics.STAGE_DURATION.count(stage=stage), 2)
+        self.assertEqual(metrics.STAGE_BYTES.count(stage=stage), 1)
+        self.assertEqual(metrics.STAGE_REALTIME_FACTOR.count(stage=stage), 1)
+        self.assertEqual(metrics.STAGE_IN_PROGRESS.value(stage=stage), 0)
+
+    def test_textfile_is_written(self):
+        """Test zápisu metrik do souboru pro node_exporter (bez dočasných souborů)."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "announcer.prom")
+            metrics.write_textfile(path)
+            with open(path, encoding="utf-8") as f:
+                content = f.read()
+            self.assertEqual(os.listdir(tmpdir), ["announcer.prom"])
+        self.assertIn("# TYPE announcer_stage_duration_seconds histogram", content)
+
+    def test_http_endpoint(self):
+        """Test, že HTTP server vrací metriky na /metrics a 404 jinde."""
+        self.assertIsNone(metrics.start_http_server(port=0))
+
+        # Port 0 znamená vypnutý server, volný port si proto zjistíme předem
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        server = metrics.start_http_server(port=port)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            with urllib.request.urlopen(f"{base_url}/metrics", timeout=5) as response:
+                self.assertTrue(response.headers["Content-Type"].startswith("text/plain"))
+                self.assertIn(b"announcer_queue_depth", response.read())
+            with self.assertRaises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(f"{base_url}/jinde", timeout=5)
+            self.assertEqual(error.exception.code, 404)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+@unittest.skipUnless(shutil.which(FFMPEG_BINARY), "FFmpeg není k dispozici")
+class TestOggDuration(unittest.TestCase):
+    """
+    Test zjištění délky OGG audia bez dekódování (vyžaduje FFmpeg).
+    """
+
+    def test_opus_duration(self):
+        """Test, že délka Opus audia odpovídá skutečné délce."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "audio.ogg")
+            subprocess.run([FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y", "-f", "lavfi",
+                            "-i", "sine=frequency=440:duration=3", "-c:a", "libopus", path], check=True)
+            self.assertAlmostEqual(ogg_duration(path), 3.0, delta=0.05)
+            self.assertIsNone(ogg_duration(os.path.join(tmpdir, "neexistuje.ogg")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import threading
+import unittest
+
+# Klíče vyžaduje config.validate_config(), pro testy stačí fiktivní hodnoty
+for _key in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT"):
+    os.environ.setdefault(_key, "test")
+
+import pipeline
+import state_manager
+
+STAGE_NAMES = ("stage_download", "stage_convert", "stage_transcribe", "stage_send")
+SETTINGS = ("WEB_API_BATCH_ENABLED", "PIPELINE_DOWNLOAD_WORKERS", "PIPELINE_TRANSCRIBE_WORKERS", "PIPELINE_SEND_WORKERS")
+
+
+class TestPipeline(unittest.TestCase):
+    """
+    Testy zpracování ve fázích s nahrazenými funkcemi jednotlivých fází.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original_state_file = state_manager.STATE_FILE_NEW
+        state_manager.STATE_FILE_NEW = os.path.join(self.tmpdir.name, "processed_urls.json")
+        self.original = {name: getattr(pipeline, name) for name in STAGE_NAMES + SETTINGS}
+        pipeline.WEB_API_BATCH_ENABLED = False
+        self.calls = {name: [] for name in STAGE_NAMES}
+        self.lock = threading.Lock()
+        for name in STAGE_NAMES:
+            self._set_stage(name)
+        self.urls = [f"https://x.example/rozhlas/Hlášení {day}.1.2025.ogg" for day in range(1, 7)]
+
+    def tearDown(self):
+        for name, value in self.original.items():
+            setattr(pipeline, name, value)
+        state_manager.close()
+        state_manager.STATE_FILE_NEW = self.original_state_file
+        self.tmpdir.cleanup()
+
+    def _set_stage(self, name, behaviour=None):
+        """Nahradí fázi funkcí, která zaznamená volání a vrátí výsledek `behaviour(item)` (výchozí True)."""
+        def stage(item, **kwargs):
+            with self.lock:
+                self.calls[name].append(item.url)
+            return True if behaviour is None else behaviour(item)
+        setattr(pipeline, name, stage)
+
+    def test_results_committed_in_order_as_they_finish(self):
+        """Test, že hlášení se potvrzují v pořadí vysílání a průběžně, ne až na konci běhu."""
+        pipeline.PIPELINE_DOWNLOAD_WORKERS = 1
+        pipeline.PIPELINE_TRANSCRIBE_WORKERS = pipeline.PIPELINE_SEND_WORKERS = 2
+        committed = []
+        newer_sent = threading.Event()
+        first_committed = threading.Event()
+
+        def on_success(url):
+            committed.append(url)
+            first_committed.set()
+
+        def download(item):
+            if item.url == self.urls[-1]:
+                # Nejnovější hlášení se stáhne až po potvrzení nejstaršího
+                return first_committed.wait(5)
+            return True
+
+        def transcribe(item):
+            if item.url == self.urls[0]:
+                # Nejstarší hlášení doběhne až po novějším, pořadí potvrzení se tím nesmí změnit
+                return newer_sent.wait(5)
+            return True
+
+        def send(item):
+            if item.url == self.urls[1]:
+                newer_sent.set()
+            return True
+
+        self._set_stage("stage_download", download)
+        self._set_stage("stage_transcribe", transcribe)
+        self._set_stage("stage_send", send)
+
+        results = pipeline.run_pipeline(self.urls, on_success=on_success)
+
+        self.assertEqual(committed, self.urls)
+        self.assertEqual([item.url for item in results], self.urls)
+        self.assertTrue(all(item.success for item in results))
+
+    def test_failed_item_skips_later_stages_and_is_not_committed(self):
+        """Test, že hlášení, které selže ve fázi, dál nepokračuje a neuloží se, ostatní ano."""
+        failing = self.urls[2]
+        self._set_stage("stage_convert", lambda item: item.url != failing)
+        committed = []
+
+        results = pipeline.run_pipeline(self.urls, on_success=committed.append)
+
+        self.assertEqual(committed, [url for url in self.urls if url != failing])
+        self.assertEqual(results[2].failed_stage, "konverze")
+        self.assertNotIn(failing, self.calls["stage_transcribe"])
+        self.assertNotIn(failing, self.calls["stage_send"])
+        self.assertEqual(sorted(self.calls["stage_download"]), sorted(self.urls))
+
+    def test_stage_exception_fails_item_and_shuts_down_workers(self):
+        """Test, že výjimka ve fázi označí jen dané hlášení a pracovní vlákna po běhu skončí."""
+        def transcribe(item):
+            if item.url == self.urls[0]:
+                raise RuntimeError("chyba přepisu")
+            return True
+
+        self._set_stage("stage_transcribe", transcribe)
+        committed = []
+
+        results = pipeline.run_pipeline(self.urls, on_success=committed.append)
+
+        self.assertEqual(results[0].failed_stage, "přepis")
+        self.assertEqual(committed, self.urls[1:])
+        stage_threads = [thread for thread in threading.enumerate()
+                         if thread.name.split("-")[0] in ("stahování", "konverze", "přepis", "odeslání")]
+        for thread in stage_threads:
+            thread.join(5)
+            self.assertFalse(thread.is_alive(), thread.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
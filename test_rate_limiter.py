@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+import unittest
+from email.utils import formatdate
+
+# Klíče vyžaduje config.validate_config(), pro testy stačí fiktivní hodnoty
+for _key in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT"):
+    os.environ.setdefault(_key, "test")
+
+from rate_limiter import RateLimiter, parse_retry_after
+
+
+class TestRateLimiter(unittest.TestCase):
+    """
+    Unit testy pro limiter požadavků na externí služby.
+    """
+
+    def test_requests_are_spaced_by_rate(self):
+        """Test, že po vyčerpání kapacity se požadavky rozloží podle rychlosti."""
+        limiter = RateLimiter("test", rate_per_minute=600, burst=1)  # 10 za sekundu
+        start = time.monotonic()
+        for _ in range(4):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.28)
+
+    def test_zero_rate_is_unlimited(self):
+        """Test, že limit 0 požadavky nezdržuje."""
+        limiter = RateLimiter("test", rate_per_minute=0)
+        start = time.monotonic()
+        for _ in range(100):
+            limiter.acquire()
+        self.assertLess(time.monotonic() - start, 0.1)
+
+    def test_zero_rate_still_honors_retry_after(self):
+        """Test, že i bez omezení rychlosti se po 429 dodrží pauza, rychlost se ale nemění."""
+        limiter = RateLimiter("test", rate_per_minute=0)
+        limiter.penalize(0.2)
+        self.assertGreaterEqual(limiter.acquire(), 0.15)
+        self.assertEqual(limiter.factor, 1.0)
+        self.assertLess(limiter.acquire(), 0.05)
+
+    def test_higher_priority_is_served_first(self):
+        """Test, že čekající požadavky se obslouží podle priority, ne podle příchodu."""
+        limiter = RateLimiter("test", rate_per_minute=1200, burst=1)  # 20 za sekundu
+        limiter.acquire()
+        order = []
+
+        def request(priority):
+            limiter.acquire(priority=priority)
+            order.append(priority)
+
+        threads = [threading.Thread(target=request, args=(priority,)) for priority in (1, 2, 3)]
+        # Pauza zajistí, že se všechny požadavky seřadí ve frontě dřív, než se uvolní žeton
+        limiter.penalize(0.2)
+        for thread in threads:
+            thread.start()
+            time.sleep(0.02)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, [3, 2, 1])
+
+    def test_penalize_pauses_and_recovers(self):
+        """Test, že 429 službu pozastaví, sníží rychlost a úspěchy ji postupně vrátí."""
+        limiter = RateLimiter("test", rate_per_minute=6000, burst=5, min_factor=0.25)
+        limiter.penalize(0.2)
+        self.assertEqual(limiter.factor, 0.5)
+        self.assertGreaterEqual(limiter.acquire(), 0.15)
+
+        limiter.penalize(0)
+        limiter.penalize(0)
+        self.assertEqual(limiter.factor, 0.25)
+        for _ in range(10):
+            limiter.record_success()
+        self.assertEqual(limiter.factor, 1.0)
+
+    def test_consume_creates_debt(self):
+        """Test, že dodatečně započtená spotřeba zdrží další požadavek."""
+        limiter = RateLimiter("test", rate_per_minute=6000, burst=100)  # 100 za sekundu
+        limiter.consume(120)
+        self.assertGreaterEqual(limiter.acquire(cost=0), 0.15)
+
+    def test_parse_retry_after(self):
+        """Test čtení pauzy z hlavičky Retry-After a z textu chyby Gemini."""
+        self.assertEqual(parse_retry_after("7"), 7.0)
+        self.assertEqual(parse_retry_after("429 Quota exceeded. Please retry in 13.5s."), 13.5)
+        self.assertAlmostEqual(parse_retry_after(formatdate(time.time() + 30, usegmt=True)), 30, delta=2)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("nesmysl"))
+
+
+if __name__ == '__main__':
+    unittest.main()
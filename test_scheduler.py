@@ -0,0 +1,65 @@
+import os
+import unittest
+from datetime import datetime
+
+# Klíče vyžaduje config.validate_config(), pro testy stačí fiktivní hodnoty
+for _key in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT"):
+    os.environ.setdefault(_key, "test")
+
+from scheduler import AdaptiveScheduler
+
+
+class TestAdaptiveScheduler(unittest.TestCase):
+    """
+    Unit testy pro adaptivní interval kontrol stránky.
+    """
+
+    def setUp(self):
+        self.scheduler = AdaptiveScheduler(min_interval=60, max_interval=1800, backoff=2, active_share=0.2)
+        # Hlášení v historii vycházela hlavně v 8 a 17 hodin
+        history = [datetime(2025, 1, day, hour, 15) for day in range(1, 11) for hour in (8, 17)]
+        history.append(datetime(2025, 1, 3, 22, 0))
+        self.scheduler.learn(history)
+
+    def test_learns_active_hours(self):
+        """Test, že ojedinělé hlášení z jiné hodiny aktivní hodinu nevytvoří."""
+        self.assertEqual(self.scheduler.active_hours, {8, 17})
+
+    def test_active_hour_uses_min_interval(self):
+        """Test, že v aktivní hodině se kontroluje nejčastěji i bez nových hlášení."""
+        now = datetime(2025, 2, 1, 8, 30)
+        for _ in range(5):
+            self.assertEqual(self.scheduler.next_delay(found_new=False, now=now), 60)
+
+    def test_idle_backoff_is_capped(self):
+        """Test, že mimo aktivní hodiny interval roste až do maxima."""
+        now = datetime(2025, 2, 1, 1, 0)
+        delays = [self.scheduler.next_delay(found_new=False, now=now) for _ in range(8)]
+        self.assertEqual(delays[:4], [120, 240, 480, 960])
+        self.assertEqual(delays[-1], 1800)
+
+    def test_backoff_does_not_skip_active_hour(self):
+        """Test, že čekání skončí nejpozději na začátku další aktivní hodiny."""
+        now = datetime(2025, 2, 1, 7, 50)
+        for _ in range(6):
+            delay = self.scheduler.next_delay(found_new=False, now=now)
+        self.assertEqual(delay, 600)
+
+    def test_new_announcement_resets_backoff(self):
+        """Test, že nové hlášení vynuluje prodlužování intervalu."""
+        now = datetime(2025, 2, 1, 1, 0)
+        for _ in range(5):
+            self.scheduler.next_delay(found_new=False, now=now)
+        self.assertEqual(self.scheduler.next_delay(found_new=True, now=now), 60)
+        self.assertEqual(self.scheduler.next_delay(found_new=False, now=now), 120)
+
+    def test_empty_history_only_backs_off(self):
+        """Test, že bez historie se interval jen prodlužuje."""
+        scheduler = AdaptiveScheduler(min_interval=60, max_interval=300, backoff=2)
+        scheduler.learn([])
+        delays = [scheduler.next_delay(found_new=False, now=datetime(2025, 2, 1, 8, 0)) for _ in range(4)]
+        self.assertEqual(delays, [120, 240, 300, 300])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Klíče vyžaduje config.validate_config(), pro testy stačí fiktivní hodnoty
+for _key in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT"):
+    os.environ.setdefault(_key, "test")
+
+import http_client
+import scraper
+import sources
+from sources import Source
+from transcriber import get_broadcast_datetime
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        # /<obec>/rozhlas.php vrátí dvě hlášení dané obce (od nejnovějšího)
+        village = self.path.split("/")[1]
+        body = (f"<a href='audio/{village} 2.3.2024.ogg'>2</a>"
+                f"<a href='audio/{village} 1.3.2024.ogg'>1</a>").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSources(unittest.TestCase):
+    """
+    Unit testy pro registr zdrojů hlášení (více obcí v jednom procesu).
+    """
+
+    def setUp(self):
+        self.a = Source("a", "https://a.example/rozhlas.php", "https://a.example/")
+        self.b = Source("b", "https://b.example/hlaseni/", "https://b.example/hlaseni/",
+                        link_prefix="audio/", date_pattern=r"(?P<day>\d+)\.(?P<month>\d+)\.(?P<year>\d{4})")
+        sources.register_sources([self.a, self.b])
+
+    def tearDown(self):
+        sources.register_sources(None)
+
+    def test_load_sources(self):
+        """Test načtení zdrojů z JSON souboru včetně výchozích hodnot."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "sources.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump([{"name": "obec", "page_url": "https://obec.example/rozhlas/seznam.php"}], f)
+            loaded = sources.load_sources(path)
+
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump([{"name": "obec", "page_url": "x"}, {"name": "obec", "page_url": "y"}], f)
+            with self.assertRaises(ValueError):
+                sources.load_sources(path)
+
+        self.assertEqual(loaded[0].base_url, "https://obec.example/rozhlas/")
+        self.assertEqual(loaded[0].link_prefix, sources.ANNOUNCEMENT_LINK_PREFIX)
+
+    def test_source_for_url_and_filename(self):
+        """Test přiřazení URL ke zdroji a jmenného prostoru lokálních souborů."""
+        url = "https://b.example/hlaseni/audio/b 1.3.2024.ogg"
+        self.assertIs(sources.source_for_url(url), self.b)
+        self.assertEqual(sources.local_filename(url), "b-b 1.3.2024.ogg")
+        self.assertEqual(get_broadcast_datetime(sources.local_filename(url), self.b.date_pattern).year, 2024)
+
+        sources.register_sources([self.a])
+        self.assertEqual(sources.local_filename("https://a.example/rozhlas/Hlášení 1.3..ogg"), "Hlášení 1.3..ogg")
+
+    def test_fair_order(self):
+        """Test, že se zdroje při zpracování střídají a pořadí v rámci zdroje zůstane."""
+        merged = sources.fair_order({self.a: ["a1", "a2", "a3", "a4"], self.b: ["b1"], Source("c", "", ""): []})
+
+        # Zpracování jde od konce: nejnovější hlášení obou zdrojů dostanou přednost
+        self.assertEqual(merged, ["a1", "a2", "a3", "b1", "a4"])
+
+    def test_fetch_all_announcements(self):
+        """Test souběžného stažení stránek více zdrojů z lokálního serveru."""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _PageHandler)
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        registered = [Source(name, f"{base}/{name}/rozhlas.php", f"{base}/{name}/", link_prefix="audio/")
+                      for name in ("x", "y", "z")]
+        sources.register_sources(registered)
+        original_cache = scraper.HTTP_CACHE_ENABLED
+        scraper.HTTP_CACHE_ENABLED = False
+        try:
+            pages = scraper.fetch_all_announcements()
+        finally:
+            scraper.HTTP_CACHE_ENABLED = original_cache
+            http_client.close_session()
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(list(pages), registered)
+        self.assertEqual(pages[registered[1]], [f"{base}/y/audio/y 1.3.2024.ogg", f"{base}/y/audio/y 2.3.2024.ogg"])
+
+
+if __name__ == '__main__':
+    unittest.main()
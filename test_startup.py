@@ -0,0 +1,104 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Rozpočet pro import main.py (kumulativní čas z `python -X importtime`) a pro celý
+# běh bez nových hlášení. S rezervou pro pomalejší stroje (Raspberry Pi, CI).
+IMPORT_BUDGET_MS = 400
+NOOP_RUN_BUDGET_MS = 1500
+# Moduly, které se smí načíst až při zpracování nového hlášení
+HEAVY_MODULES = ("google.generativeai", "pydub", "aiohttp", "numpy")
+
+# Běh main() proti lokální stránce bez odkazů na hlášení
+_NOOP_RUN = """
+import sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b"<html><body><a href='rozhlas/jine.html'>nic</a></body></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    def log_message(self, *args):
+        pass
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+start = time.perf_counter()
+import main, sources
+base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+sources.register_sources([sources.Source("test", base_url + "rozhlas.php", base_url)])
+main.main()
+print(f"elapsed_ms={(time.perf_counter() - start) * 1000:.0f}")
+print("loaded=" + ",".join(name for name in %r if name in sys.modules))
+"""
+
+
+def _env_without_keys() -> dict:
+    env = {key: value for key, value in os.environ.items()
+           if key not in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT")}
+    env["PYTHONPATH"] = REPO_DIR
+    return env
+
+
+def _parse_importtime(stderr: str) -> dict:
+    """Převede výstup `python -X importtime` na {modul: (vlastní µs, kumulativní µs)}."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+class TestStartup(unittest.TestCase):
+    """
+    Hlídá rychlý start: běh bez nových hlášení nesmí načítat těžká SDK
+    ani vyžadovat klíče v konfiguraci.
+    """
+
+    def setUp(self):
+        # Stavové soubory běhu (processed_urls.db, http_cache.json, ...) vzniknou v dočasném adresáři
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _run_python(self, *args: str) -> subprocess.CompletedProcess:
+        return subprocess.run([sys.executable, *args], cwd=self.tmpdir.name, env=_env_without_keys(),
+                              capture_output=True, text=True, timeout=60)
+
+    def test_import_time_budget(self):
+        """Test, že import main.py bez klíčů projde v rozpočtu a bez těžkých modulů."""
+        result = self._run_python("-X", "importtime", "-c", "import main")
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        modules = _parse_importtime(result.stderr)
+
+        slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:10]
+        report = "\n".join(f"{self_us / 1000:8.1f} ms  {name}" for name, (self_us, _) in slowest)
+        for name in HEAVY_MODULES:
+            self.assertNotIn(name, modules, f"{name} se načítá už při startu")
+        self.assertLess(modules["main"][1] / 1000, IMPORT_BUDGET_MS,
+                        f"Import main.py překročil rozpočet. Nejpomalejší moduly:\n{report}")
+
+    def test_noop_run_budget(self):
+        """Test, že běh bez nových hlášení nenačte Gemini SDK ani pydub a vejde se do rozpočtu."""
+        result = self._run_python("-c", _NOOP_RUN % (HEAVY_MODULES,))
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        values = dict(line.split("=", 1) for line in result.stdout.splitlines() if "=" in line)
+
+        self.assertEqual(values["loaded"], "")
+        self.assertLess(int(values["elapsed_ms"]), NOOP_RUN_BUDGET_MS)
+
+
+if __name__ == '__main__':
+    unittest.main()
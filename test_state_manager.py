@@ -3,14 +3,19 @@ import os
 import tempfile
 import json
 from datetime import datetime, timedelta
+import state_backends
 import state_manager
 
 
-class TestStateManager(unittest.TestCase):
+class StateManagerCases:
     """
     Unit testy pro state_manager.py s podporou více hlášení za den.
     Testuje novou logiku ukládání sady zpracovaných URL místo posledního souboru.
+
+    Testy se spouští nad každým úložištěm jednou, viz třídy Test* níže.
     """
+    # Úložiště stavu, nad kterým testy běží (STATE_BACKEND)
+    backend = None
     
     def setUp(self):
         """Nastavení testovacího prostředí před každým testem."""
@@ -25,19 +30,24 @@ class TestStateManager(unittest.TestCase):
         # Změníme cesty k souboru pro testy
         self.original_state_file = state_manager.STATE_FILE_NEW
         self.original_state_file_old = state_manager.STATE_FILE
+        self.original_backend = state_manager.STATE_BACKEND
         state_manager.STATE_FILE_NEW = self.test_file.name
         state_manager.STATE_FILE = self.test_file_old.name
+        state_manager.STATE_BACKEND = self.backend
     
     def tearDown(self):
         """Úklid po každém testu."""
+        state_manager.close()
         state_manager.STATE_FILE_NEW = self.original_state_file
         state_manager.STATE_FILE = self.original_state_file_old
+        state_manager.STATE_BACKEND = self.original_backend
         
-        # Smažeme testovací soubory
-        if os.path.exists(self.test_file.name):
-            os.unlink(self.test_file.name)
-        if os.path.exists(self.test_file_old.name):
-            os.unlink(self.test_file_old.name)
+        # Smažeme testovací soubory (včetně SQLite databáze vedle JSON souboru)
+        db_file = os.path.splitext(self.test_file.name)[0] + ".db"
+        for path in (self.test_file.name, self.test_file_old.name,
+                     db_file, db_file + "-wal", db_file + "-shm"):
+            if os.path.exists(path):
+                os.unlink(path)
     
     def test_get_processed_urls_empty_file(self):
         """Test čtení prázdného/neexistujícího souboru."""
@@ -115,6 +125,91 @@ class TestStateManager(unittest.TestCase):
         self.assertIn("https://rozhlas.milesovice.cz/rozhlas/Hlášení 25.6.1.ogg", urls)
         self.assertNotIn("https://rozhlas.milesovice.cz/rozhlas/Hlášení 1.1.1.ogg", urls)
     
+    def test_archived_urls_stay_processed(self):
+        """Test, že archivovaná URL zůstávají zpracovaná, i když zmizí z nedávné historie."""
+        old_url = "https://rozhlas.milesovice.cz/rozhlas/Hlášení 1.1..ogg"
+        data = {"processed_urls": [
+            {"url": old_url, "processed_at": (datetime.now() - timedelta(days=40)).isoformat()},
+            {"url": "https://rozhlas.milesovice.cz/rozhlas/Hlášení 25.6.1.ogg",
+             "processed_at": datetime.now().isoformat()},
+        ]}
+        with open(self.test_file.name, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+        state_manager.cleanup_old_urls(days=30)
+
+        self.assertNotIn(old_url, state_manager.get_processed_urls())
+        self.assertTrue(state_manager.is_processed(old_url))
+        # Opětovné uložení archivované URL ji do nedávné historie nevrátí
+        state_manager.save_processed_url(old_url)
+        self.assertNotIn(old_url, state_manager.get_processed_urls())
+
+    def test_archiving_is_incremental(self):
+        """Test, že jeden úklid archivuje nejvýše zadaný počet nejstarších záznamů."""
+        data = {"processed_urls": [
+            {"url": f"https://rozhlas.milesovice.cz/rozhlas/Hlášení {day}.1..ogg",
+             "processed_at": (datetime.now() - timedelta(days=60 - day)).isoformat()}
+            for day in range(1, 6)
+        ]}
+        with open(self.test_file.name, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+        state_manager.cleanup_old_urls(days=30, limit=2)
+        urls = state_manager.get_processed_urls()
+        self.assertEqual(len(urls), 3)
+        self.assertNotIn("https://rozhlas.milesovice.cz/rozhlas/Hlášení 1.1..ogg", urls)
+        self.assertIn("https://rozhlas.milesovice.cz/rozhlas/Hlášení 3.1..ogg", urls)
+
+        state_manager.cleanup_old_urls(days=30, limit=2)
+        state_manager.cleanup_old_urls(days=30, limit=2)
+        self.assertEqual(state_manager.get_processed_urls(), set())
+        self.assertTrue(all(state_manager.is_processed(item["url"]) for item in data["processed_urls"]))
+
+    def test_item_progress_merges_stages(self):
+        """Test, že zaznamenané fáze hlášení se postupně slučují."""
+        test_url = "https://rozhlas.milesovice.cz/rozhlas/Hlášení 25.6.2.ogg"
+        self.assertIsNone(state_manager.get_item_progress(test_url))
+
+        state_manager.record_item_stage(test_url, "downloaded", ogg_path="a.ogg", audio_hash="abc")
+        state_manager.record_item_stage(test_url, "transcribed", transcript="Přepis")
+
+        progress = state_manager.get_item_progress(test_url)
+        self.assertEqual(progress["stage"], "transcribed")
+        self.assertEqual(progress["ogg_path"], "a.ogg")
+        self.assertEqual(progress["audio_hash"], "abc")
+        self.assertEqual(progress["transcript"], "Přepis")
+
+        with self.assertRaises(ValueError):
+            state_manager.record_item_stage(test_url, "neznámá")
+
+    def test_save_processed_url_clears_progress(self):
+        """Test, že dokončené hlášení už nemá rozpracovaný stav."""
+        test_url = "https://rozhlas.milesovice.cz/rozhlas/Hlášení 25.6.2.ogg"
+        state_manager.record_item_stage(test_url, "posted")
+        state_manager.save_processed_url(test_url)
+
+        self.assertIsNone(state_manager.get_item_progress(test_url))
+        self.assertIn(test_url, state_manager.get_processed_urls())
+
+    def test_get_processed_timestamps(self):
+        """Test, že časy zpracování jsou k dispozici pro plánovač kontrol."""
+        before = datetime.now()
+        state_manager.save_processed_url("https://rozhlas.milesovice.cz/rozhlas/Hlášení 25.6..ogg")
+        timestamps = state_manager.get_processed_timestamps()
+
+        self.assertEqual(len(timestamps), 1)
+        self.assertGreaterEqual(timestamps[0], before)
+
+    def test_cleanup_stale_progress(self):
+        """Test, že úklid vrátí a zapomene jen dlouho nedokončená hlášení."""
+        test_url = "https://rozhlas.milesovice.cz/rozhlas/Hlášení 25.6.2.ogg"
+        state_manager.record_item_stage(test_url, "downloaded", ogg_path="a.ogg")
+
+        self.assertEqual(state_manager.cleanup_stale_progress(days=7), [])
+        expired = state_manager.cleanup_stale_progress(days=-1)
+        self.assertEqual([entry["ogg_path"] for entry in expired], ["a.ogg"])
+        self.assertIsNone(state_manager.get_item_progress(test_url))
+
     def test_migrate_from_old_format(self):
         """Test migrace ze starého formátu (last_processed.txt) na nový."""
         # Vytvoříme starý soubor s ASCII textem
@@ -136,6 +231,103 @@ class TestStateManager(unittest.TestCase):
         finally:
             os.unlink(old_file.name)
 
+    def test_is_processed(self):
+        """Test indexovaného dotazu na jedno URL."""
+        test_url = "https://rozhlas.milesovice.cz/rozhlas/Hlášení 25.6.2.ogg"
+        self.assertFalse(state_manager.is_processed(test_url))
+        state_manager.save_processed_url(test_url)
+        self.assertTrue(state_manager.is_processed(test_url))
+
+
+class TestStateManager(StateManagerCases, unittest.TestCase):
+    """
+    Testy nad výchozím SQLite úložištěm (STATE_BACKEND = "sqlite").
+    """
+    backend = "sqlite"
+
+    def test_migrates_existing_json_once(self):
+        """Test, že se data z JSON souboru převezmou jen při prvním otevření databáze."""
+        data = {
+            "processed_urls": [
+                {"url": "https://rozhlas.milesovice.cz/rozhlas/Hlášení 11.6..ogg",
+                 "processed_at": datetime.now().isoformat()},
+                {"url": "https://rozhlas.milesovice.cz/rozhlas/Hlášení 13.6..ogg",
+                 "processed_at": "neplatné datum"}
+            ]
+        }
+        with open(self.test_file.name, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+        urls = state_manager.get_processed_urls()
+        self.assertEqual(urls, {item['url'] for item in data['processed_urls']})
+
+        # Další změny v JSON souboru už se do databáze nepromítnou
+        state_manager.close()
+        with open(self.test_file.name, 'w', encoding='utf-8') as f:
+            json.dump({"processed_urls": []}, f)
+        self.assertEqual(len(state_manager.get_processed_urls()), 2)
+
+        # Záznam s neplatným datem se při úklidu zachová
+        state_manager.cleanup_old_urls(days=0)
+        self.assertEqual(state_manager.get_processed_urls(),
+                         {"https://rozhlas.milesovice.cz/rozhlas/Hlášení 13.6..ogg"})
+
+    def test_batch_rolls_back_on_error(self):
+        """Test, že chyba uvnitř batch() neuloží žádný z rozpracovaných záznamů."""
+        with self.assertRaises(RuntimeError):
+            with state_manager.batch():
+                state_manager.save_processed_url("https://rozhlas.milesovice.cz/rozhlas/Hlášení 1.7..ogg")
+                raise RuntimeError("simulované selhání")
+
+        self.assertFalse(state_manager.is_processed("https://rozhlas.milesovice.cz/rozhlas/Hlášení 1.7..ogg"))
+
+
+class TestStateManagerJsonBackend(StateManagerCases, unittest.TestCase):
+    """
+    Stejné testy nad původním JSON úložištěm (STATE_BACKEND = "json").
+    """
+    backend = "json"
+
+    def test_batch_writes_file_once(self):
+        """Test, že uvnitř batch() se JSON soubor zapíše až na konci."""
+        test_urls = [f"https://rozhlas.milesovice.cz/rozhlas/Hlášení {i}.6..ogg" for i in range(1, 4)]
+
+        with state_manager.batch():
+            for url in test_urls:
+                state_manager.save_processed_url(url)
+            self.assertEqual(os.path.getsize(self.test_file.name), 0)
+
+        with open(self.test_file.name, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual([item['url'] for item in data['processed_urls']], test_urls)
+
+    def test_lookups_reuse_parsed_file(self):
+        """Test, že dotazy na jednotlivá URL soubor znovu nečtou, dokud ho nezmění někdo jiný."""
+        test_url = "https://rozhlas.milesovice.cz/rozhlas/Hlášení 2.6..ogg"
+        state_manager.save_processed_url(test_url)
+        original_open = open
+        reads = []
+
+        def counting_open(path, *args, **kwargs):
+            if path == self.test_file.name and (not args or 'r' in args[0]):
+                reads.append(path)
+            return original_open(path, *args, **kwargs)
+
+        state_backends.open = counting_open
+        try:
+            for _ in range(10):
+                self.assertTrue(state_manager.is_processed(test_url))
+                self.assertFalse(state_manager.is_processed(test_url + ".jiné"))
+            self.assertEqual(reads, [])
+
+            # Změnu souboru jiným procesem poznáme podle času změny a velikosti
+            with original_open(self.test_file.name, 'w', encoding='utf-8') as f:
+                json.dump({"processed_urls": []}, f)
+            self.assertFalse(state_manager.is_processed(test_url))
+            self.assertEqual(len(reads), 1)
+        finally:
+            del state_backends.open
+
 
 if __name__ == '__main__':
-    unittest.main() 
\ No newline at end of file
+    unittest.main()
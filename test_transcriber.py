@@ -0,0 +1,138 @@
+import io
+import os
+import threading
+import time
+import unittest
+
+# Klíče vyžaduje config.validate_config(), pro testy stačí fiktivní hodnoty
+for _key in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT"):
+    os.environ.setdefault(_key, "test")
+
+import rate_limiter
+import transcriber
+from rate_limiter import RateLimiter
+
+
+class _FakeFile:
+    def __init__(self, name):
+        self.name = name
+        self.uri = f"https://files/{name}"
+        self.display_name = name
+
+
+class _QuotaExceeded(Exception):
+    """Odmítnutí kvůli kvótě jako v Gemini SDK (HTTP 429)."""
+    code = 429
+
+
+class _FakeGenai:
+    """
+    Náhrada Gemini SDK: zaznamenává volání a vrací přepis podle obsahu požadavku.
+    """
+
+    def __init__(self, fail_generate=False):
+        self.fail_generate = fail_generate
+        # Kolik prvních požadavků se odmítne s 429
+        self.rate_limited = 0
+        self.models_created = 0
+        self.uploaded = []
+        self.deleted = []
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def GenerativeModel(self, name):
+        self.models_created += 1
+        fake = self
+
+        class Model:
+            def generate_content(self, parts):
+                fake.requests.append(parts[1])
+                if fake.rate_limited:
+                    fake.rate_limited -= 1
+                    raise _QuotaExceeded("429 Quota exceeded. Please retry in 0.3s.")
+                if fake.fail_generate:
+                    raise RuntimeError("generate selhal")
+
+                class Response:
+                    text = " přepis "
+                return Response()
+        return Model()
+
+    def upload_file(self, path, mime_type=None, display_name=None):
+        with self.lock:
+            self.uploaded.append(display_name)
+            return _FakeFile(f"files/{len(self.uploaded)}")
+
+    def delete_file(self, name):
+        with self.lock:
+            self.deleted.append(name)
+
+
+class TestTranscriptionClient(unittest.TestCase):
+    """
+    Testy klienta pro přepis s podvrženým Gemini SDK.
+    """
+
+    def setUp(self):
+        self.original = (transcriber._genai, transcriber.get_limiter)
+        self.fake = _FakeGenai()
+        transcriber._genai = self.fake
+        # Bez limitu požadavků, ať testy běží rychle
+        transcriber.get_limiter = lambda name: RateLimiter(name, 0)
+        self.client = transcriber.TranscriptionClient(inline_max_bytes=100)
+
+    def tearDown(self):
+        self.client.close()
+        transcriber._genai, transcriber.get_limiter = self.original
+
+    def test_small_audio_is_sent_inline(self):
+        """Test, že malé audio se pošle přímo v požadavku bez nahrání souboru."""
+        text = self.client.transcribe(io.BytesIO(b"x" * 50), mime_type="audio/mpeg", display_name="malé")
+
+        self.assertEqual(text, "přepis")
+        self.assertEqual(self.fake.uploaded, [])
+        self.assertEqual(self.fake.requests, [{"mime_type": "audio/mpeg", "data": b"x" * 50}])
+
+    def test_large_audio_is_uploaded_and_deleted(self):
+        """Test, že velké audio se nahraje a po přepisu smaže na pozadí."""
+        for name in ("a", "b"):
+            self.assertEqual(self.client.transcribe(io.BytesIO(b"x" * 500), mime_type="audio/mpeg",
+                                                    display_name=name), "přepis")
+        self.client.flush()
+
+        self.assertEqual(self.fake.uploaded, ["a", "b"])
+        self.assertEqual(sorted(self.fake.deleted), ["files/1", "files/2"])
+        self.assertEqual(self.fake.models_created, 1)
+        stats = self.client.latency_stats()
+        self.assertEqual({phase: values["count"] for phase, values in stats.items()},
+                         {"upload": 2, "generate": 2, "delete": 2})
+
+    def test_uploaded_file_is_deleted_on_error(self):
+        """Test, že nahraný soubor se smaže, i když přepis selže."""
+        self.fake.fail_generate = True
+        self.assertIsNone(self.client.transcribe(io.BytesIO(b"x" * 500), mime_type="audio/mpeg",
+                                                 display_name="chyba"))
+        self.client.flush()
+        self.assertEqual(self.fake.deleted, ["files/1"])
+
+    @unittest.skipIf(os.getenv("GEMINI_RPM"), "GEMINI_RPM je nastavené v prostředí")
+    def test_rate_limit_waits_for_retry_after_with_default_config(self):
+        """Test, že po 429 se přepis zopakuje až po pauze z chyby, i bez limitu požadavků."""
+        original_limiters = rate_limiter._limiters
+        rate_limiter._limiters = {}
+        transcriber.get_limiter = rate_limiter.get_limiter
+        self.fake.rate_limited = 1
+        try:
+            start = time.monotonic()
+            text = self.client.transcribe(io.BytesIO(b"x" * 50), mime_type="audio/mpeg", display_name="429")
+            elapsed = time.monotonic() - start
+        finally:
+            rate_limiter._limiters = original_limiters
+
+        self.assertEqual(text, "přepis")
+        self.assertEqual(len(self.fake.requests), 2)
+        self.assertGreaterEqual(elapsed, 0.25)
+
+
+if __name__ == '__main__':
+    unittest.main()
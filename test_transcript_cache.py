@@ -0,0 +1,98 @@
+import os
+import tempfile
+import time
+import unittest
+
+# Klíče vyžaduje config.validate_config(), pro testy stačí fiktivní hodnoty
+for _key in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT"):
+    os.environ.setdefault(_key, "test")
+
+from transcript_cache import TranscriptCache, cache_key, file_sha256
+
+
+class TestTranscriptCache(unittest.TestCase):
+    """
+    Unit testy pro cache přepisů adresovanou obsahem audia.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = TranscriptCache(os.path.join(self.tmpdir.name, "cache.db"),
+                                     max_bytes=1024, max_age_seconds=3600)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmpdir.cleanup()
+
+    def test_same_content_same_key(self):
+        """Test, že stejné audio pod jiným názvem dává stejný klíč."""
+        paths = []
+        for name in ("Hlášení 1.2..ogg", "Hlášení 1.2.1.ogg"):
+            path = os.path.join(self.tmpdir.name, name)
+            with open(path, 'wb') as f:
+                f.write(b"OggS" + b"\x00" * 100)
+            paths.append(path)
+        self.assertEqual(file_sha256(paths[0]), file_sha256(paths[1]))
+
+        key = cache_key(file_sha256(paths[0]), "model", "prompt")
+        self.cache.put(key, "přepis")
+        self.assertEqual(self.cache.get(cache_key(file_sha256(paths[1]), "model", "prompt")), "přepis")
+
+    def test_prompt_and_model_are_part_of_key(self):
+        """Test, že změna modelu nebo promptu vede k miss."""
+        self.cache.put(cache_key("abc", "model-a", "prompt"), "přepis")
+        self.assertIsNone(self.cache.get(cache_key("abc", "model-b", "prompt")))
+        self.assertIsNone(self.cache.get(cache_key("abc", "model-a", "jiný prompt")))
+
+    def test_stats(self):
+        """Test počítadel hits/misses."""
+        self.cache.put("k", "přepis")
+        self.cache.get("k")
+        self.cache.get("k")
+        self.cache.get("neexistuje")
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 1)
+
+    def test_size_eviction_removes_least_recently_used(self):
+        """Test, že při překročení velikosti se maže nejdéle nepoužitý záznam."""
+        self.cache.put("a", "x" * 400)
+        time.sleep(0.01)
+        self.cache.put("b", "x" * 400)
+        time.sleep(0.01)
+        self.cache.get("a")
+        self.cache.put("c", "x" * 400)
+
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("c"))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_running_size_matches_stored_entries(self):
+        """Test, že průběžná velikost odpovídá uloženým záznamům i po přepsání klíče a znovuotevření."""
+        self.cache.put("a", "x" * 300)
+        self.cache.put("a", "x" * 100)
+        self.cache.put("b", "x" * 200)
+        self.assertEqual(self.cache._total, self.cache.stats()["bytes"])
+        self.assertEqual(self.cache._total, 300)
+
+        self.cache.close()
+        self.cache = TranscriptCache(os.path.join(self.tmpdir.name, "cache.db"),
+                                     max_bytes=1024, max_age_seconds=3600)
+        self.assertEqual(self.cache._total, 300)
+        # Přepsání klíče větším přepisem se do limitu započítá jen rozdílem
+        self.cache.put("a", "x" * 800)
+        self.assertIsNotNone(self.cache.get("b"))
+        self.assertEqual(self.cache.stats()["evictions"], 0)
+
+    def test_age_eviction(self):
+        """Test, že prošlé záznamy se nevrací."""
+        self.cache.put("a", "přepis")
+        self.cache.max_age_seconds = 0
+        time.sleep(0.01)
+        self.assertIsNone(self.cache.get("a"))
+
+
+if __name__ == '__main__':
+    unittest.main()
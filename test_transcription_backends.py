@@ -0,0 +1,184 @@
+import importlib.util
+import io
+import os
+import tempfile
+import threading
+import unittest
+
+# Klíče vyžaduje config.validate_config(), pro testy stačí fiktivní hodnoty
+for _key in ("GEMINI_API_KEY", "WEB_API_KEY", "WEB_API_ENDPOINT"):
+    os.environ.setdefault(_key, "test")
+
+import audio_processor
+import metrics
+import transcriber
+from transcript_cache import TranscriptCache
+from transcription_backends import LocalWhisperBackend, TranscriptionBackend, TranscriptionRouter
+
+
+class _FakeBackend(TranscriptionBackend):
+    """Backend pro testy: zaznamenává přepisy a vrací předem daný výsledek."""
+
+    def __init__(self, name, text="přepis", available=True):
+        self.name = name
+        self.model_id = f"{name}-model"
+        self.text = text
+        self.is_available = available
+        self.depth = 0
+        self.calls = []
+        self.release = None
+
+    def available(self):
+        return self.is_available
+
+    def queue_depth(self):
+        return self.depth
+
+    def transcribe(self, audio, mime_type=None, display_name=None, priority=0, audio_seconds=None):
+        self.calls.append(display_name)
+        if self.release is not None:
+            # Simulace probíhajícího přepisu: fronta je obsazená, dokud ho test neuvolní
+            self.depth += 1
+            self.release.wait(5)
+            self.depth -= 1
+        return self.text
+
+
+class TestTranscriptionRouter(unittest.TestCase):
+    """
+    Testy volby backendu přepisu podle délky audia a fronty lokálního přepisu.
+    """
+
+    def setUp(self):
+        self.local = _FakeBackend("local", text="lokální")
+        self.remote = _FakeBackend("gemini", text="gemini")
+        self.router = TranscriptionRouter(self.local, self.remote, max_local_seconds=120, max_local_queue=1)
+
+    def test_short_audio_goes_local_long_audio_remote(self):
+        """Test, že krátké audio se přepíše lokálně, dlouhé a audio neznámé délky v Gemini."""
+        observed = metrics.TRANSCRIBE_BACKEND_RUNS.value(backend="local")
+
+        self.assertEqual(self.router.transcribe(io.BytesIO(b"x"), display_name="krátké", audio_seconds=60), "lokální")
+        self.assertEqual(self.router.transcribe(io.BytesIO(b"x"), display_name="dlouhé", audio_seconds=600), "gemini")
+        self.assertEqual(self.router.transcribe(io.BytesIO(b"x"), display_name="neznámé"), "gemini")
+
+        self.assertEqual(self.local.calls, ["krátké"])
+        self.assertEqual(self.remote.calls, ["dlouhé", "neznámé"])
+        self.assertEqual(metrics.TRANSCRIBE_BACKEND_RUNS.value(backend="local"), observed + 1)
+
+    def test_reports_model_of_backend_that_transcribed(self):
+        """Test, že pro klíč cache se vrací model backendu, který přepis skutečně vytvořil."""
+        self.assertEqual(self.router.transcribe_with_model(io.BytesIO(b"x"), audio_seconds=60),
+                         ("lokální", "local-model"))
+        self.assertEqual(self.router.transcribe_with_model(io.BytesIO(b"x"), audio_seconds=600),
+                         ("gemini", "gemini-model"))
+        self.local.text = None
+        self.assertEqual(self.router.transcribe_with_model(io.BytesIO(b"x"), audio_seconds=60),
+                         ("gemini", "gemini-model"))
+        self.assertEqual(self.router.model_ids(), ["gemini-model", "local-model"])
+
+    def test_full_local_queue_overflows_to_remote(self):
+        """Test, že při obsazené frontě lokálního přepisu jde další hlášení do Gemini."""
+        self.local.release = threading.Event()
+        busy = threading.Thread(target=self.router.transcribe, args=(io.BytesIO(b"x"),),
+                                kwargs={"display_name": "první", "audio_seconds": 30})
+        busy.start()
+        while self.local.depth == 0:
+            busy.join(0.01)
+
+        self.assertEqual(self.router.transcribe(io.BytesIO(b"x"), display_name="druhé", audio_seconds=30), "gemini")
+        self.local.release.set()
+        busy.join()
+        self.assertEqual(self.local.calls, ["první"])
+
+    def test_failed_or_unavailable_local_falls_back_to_remote(self):
+        """Test, že neúspěšný nebo nedostupný lokální přepis se nahradí přepisem v Gemini."""
+        self.local.text = None
+        self.assertEqual(self.router.transcribe(io.BytesIO(b"x"), display_name="chyba", audio_seconds=30), "gemini")
+
+        self.local.is_available = False
+        self.assertEqual(self.router.transcribe(io.BytesIO(b"x"), display_name="bez", audio_seconds=30), "gemini")
+        self.assertEqual(self.local.calls, ["chyba"])
+        self.assertEqual(self.remote.calls, ["chyba", "bez"])
+
+
+class TestTranscriptionBackendSelection(unittest.TestCase):
+    """
+    Testy výběru backendu podle TRANSCRIBE_BACKEND.
+    """
+
+    def setUp(self):
+        self.original = (transcriber.TRANSCRIBE_BACKEND, transcriber._backend)
+        transcriber._backend = None
+
+    def tearDown(self):
+        transcriber.TRANSCRIBE_BACKEND, transcriber._backend = self.original
+
+    def test_gemini_keeps_cache_model_id(self):
+        """Test, že výchozí backend Gemini zachová klíč cache přepisů podle názvu modelu."""
+        transcriber.TRANSCRIBE_BACKEND = "gemini"
+        self.assertIs(transcriber.get_transcription_backend(), transcriber.get_transcription_client())
+        self.assertEqual(transcriber.transcription_model_ids(), [transcriber.MODEL_NAME])
+
+    def test_auto_routes_between_local_and_gemini(self):
+        """Test, že režim auto sestaví směrování mezi lokálním přepisem a Gemini."""
+        transcriber.TRANSCRIBE_BACKEND = "auto"
+        backend = transcriber.get_transcription_backend()
+
+        self.assertIsInstance(backend, TranscriptionRouter)
+        self.assertIsInstance(backend.local, LocalWhisperBackend)
+        self.assertIs(backend.remote, transcriber.get_transcription_client())
+        self.assertIs(transcriber.get_transcription_backend(), backend)
+        self.assertEqual(transcriber.transcription_model_ids(), [transcriber.MODEL_NAME, backend.local.model_id])
+
+    @unittest.skipIf(importlib.util.find_spec("faster_whisper"), "faster-whisper je nainstalovaný")
+    def test_local_backend_without_engine_fails_cleanly(self):
+        """Test, že bez faster-whisper lokální přepis vrátí None a nespustí pracovní procesy."""
+        backend = LocalWhisperBackend()
+
+        self.assertFalse(backend.available())
+        self.assertIsNone(backend.transcribe(io.BytesIO(b"x"), display_name="audio"))
+        self.assertIsNone(backend._pool)
+
+
+class TestAutoTranscriptCache(unittest.TestCase):
+    """
+    Testy klíčů cache přepisů v režimu auto, kdy přepis může vytvořit kterýkoli z backendů.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = TranscriptCache(os.path.join(self.tmpdir.name, "cache.db"), max_bytes=10**6,
+                                     max_age_seconds=3600)
+        self.original = (audio_processor.get_transcript_cache, audio_processor.transcription_model_ids,
+                         audio_processor.transcribe_audio_with_model, audio_processor.record_item_stage,
+                         audio_processor.remember_fingerprint)
+        audio_processor.get_transcript_cache = lambda: self.cache
+        audio_processor.transcription_model_ids = lambda: ["gemini-model", "local-model"]
+        audio_processor.transcribe_audio_with_model = lambda audio, **kwargs: ("lokální přepis", "local-model")
+        audio_processor.record_item_stage = lambda *args, **kwargs: None
+        audio_processor.remember_fingerprint = lambda item: None
+
+    def tearDown(self):
+        (audio_processor.get_transcript_cache, audio_processor.transcription_model_ids,
+         audio_processor.transcribe_audio_with_model, audio_processor.record_item_stage,
+         audio_processor.remember_fingerprint) = self.original
+        self.cache.close()
+        self.tmpdir.cleanup()
+
+    def test_transcript_is_keyed_by_backend_that_produced_it(self):
+        """Test, že lokální přepis se uloží pod klíčem lokálního modelu a další běh ho najde."""
+        item = audio_processor.AnnouncementItem(url="https://x/a.ogg", filename="a.ogg", audio_hash="abc")
+        item.cache_key, item.transcript = audio_processor.lookup_cached_transcript(item.audio_hash)
+        self.assertIsNone(item.transcript)
+        item.audio = audio_processor.UploadAudio(source=io.BytesIO(b"x"), mime_type="audio/mpeg")
+
+        self.assertTrue(audio_processor.stage_transcribe(item))
+
+        self.assertEqual(item.cache_key, audio_processor.transcript_key("abc", "local-model"))
+        self.assertIsNone(self.cache.get(audio_processor.transcript_key("abc", "gemini-model")))
+        self.assertEqual(audio_processor.lookup_cached_transcript("abc"), (item.cache_key, "lokální přepis"))
+
+
+if __name__ == '__main__':
+    unittest.main()
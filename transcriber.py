@@ -1,72 +1,343 @@
+import atexit
 import logging
-import re
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime
-import google.generativeai as genai
-from config import GEMINI_API_KEY
+from typing import BinaryIO, Dict, List
+from config import (
+    ANNOUNCEMENT_DATE_PATTERN,
+    GEMINI_API_KEY,
+    TRANSCRIBE_INLINE_MAX_MB,
+    RATE_LIMIT_MAX_RETRIES,
+    TRANSCRIBE_BACKEND,
+    validate_config,
+)
+from rate_limiter import get_limiter, parse_retry_after
+from metrics import track_stage
+from date_resolver import resolve_broadcast_dates
+from transcription_backends import TranscriptionBackend, LocalWhisperBackend, TranscriptionRouter
 
-# Konfigurace Gemini API
-genai.configure(api_key=GEMINI_API_KEY)
+# Gemini SDK se načítá až při prvním přepisu (viz _get_genai), jeho import
+# trvá stovky milisekund a běh bez nových hlášení ho vůbec nepotřebuje
+_genai = None
+_genai_lock = threading.Lock()
+_client: "TranscriptionClient | None" = None
+_backend: TranscriptionBackend | None = None
 
-def get_broadcast_datetime(filename: str) -> datetime | None:
+# Model a prompt pro přepis. Obojí je součástí klíče cache přepisů,
+# změna tedy automaticky vede k novému přepisu.
+MODEL_NAME = 'models/gemini-2.5-flash'
+TRANSCRIPTION_PROMPT = "prosím, proved přesný přepis tohoto audio souboru, děkuji"
+
+def get_broadcast_datetime(filename: str, pattern: str = ANNOUNCEMENT_DATE_PATTERN) -> datetime | None:
     """
     Extrahuje datum a čas vysílání z názvu souboru.
-    Předpokládá formát 'Hlášení DD.M..ogg'.
+    Předpokládá formát 'Hlášení DD.M..ogg', jiné obce mohou mít vlastní `pattern`.
+
+    Rok bez uvedení v názvu se odvodí jako u jednoho hlášení na stránce, data
+    celé stránky najednou určuje date_resolver.resolve_broadcast_dates().
 
     Args:
         filename (str): Název souboru.
+        pattern (str): Regulární výraz se skupinami day, month a volitelně year
+            (viz sources.Source.date_pattern).
 
     Returns:
         datetime | None: Objekt datetime, nebo None při neúspěchu.
     """
-    # Regex pro nalezení DD.M. v názvu souboru
-    match = re.search(r'(\d{1,2})\.(\d{1,2})\.', filename)
-    if not match:
-        logging.error(f"Nepodařilo se extrahovat datum z názvu souboru: {filename}")
-        return None
-    
-    day, month = map(int, match.groups())
-    current_year = datetime.now().year
-    
-    try:
-        # Vytvoříme datetime objekt. Čas nastavíme na poledne (12:00).
-        return datetime(current_year, month, day, 12, 0)
-    except ValueError:
-        logging.error(f"Nalezeno neplatné datum: den={day}, měsíc={month}, rok={current_year}")
+    return resolve_broadcast_dates([filename], pattern)[0]
+
+def _get_genai():
+    """
+    Načte a nakonfiguruje Gemini SDK při prvním použití.
+
+    Raises:
+        ValueError: Pokud chybí klíče v konfiguraci (viz config.validate_config).
+    """
+    global _genai
+    with _genai_lock:
+        if _genai is None:
+            validate_config()
+            import google.generativeai as genai
+            genai.configure(api_key=GEMINI_API_KEY)
+            _genai = genai
+        return _genai
+
+
+class TranscriptionClient(TranscriptionBackend):
+    """
+    Klient pro přepis audia v Gemini sdílený všemi hlášeními (backend "gemini").
+
+    Model se vytváří jen jednou. Audio do TRANSCRIBE_INLINE_MAX_MB se posílá
+    přímo v požadavku (bez Files API), větší se nahraje a po získání výsledku
+    se maže na pozadí, takže mazání nezdržuje přepis. Nahraný soubor se smaže
+    i tehdy, když přepis selže. Pro každou fázi (upload, generate, delete) se
+    sleduje latence.
+
+    Použití:
+        client = get_transcription_client()
+        text = client.transcribe("audio.mp3", mime_type="audio/mpeg")
+    """
+    name = "gemini"
+
+    def __init__(self, model_name: str = MODEL_NAME, prompt: str = TRANSCRIPTION_PROMPT,
+                 inline_max_bytes: int = int(TRANSCRIBE_INLINE_MAX_MB * 1024 * 1024)):
+        self.model_name = model_name
+        self.model_id = model_name
+        self.prompt = prompt
+        self.inline_max_bytes = inline_max_bytes
+        self._model = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._latency: Dict[str, Dict[str, float]] = {}
+        self._deleter = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gemini-delete")
+        self._pending_deletes: List[Future] = []
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                self._model = _get_genai().GenerativeModel(self.model_name)
+            return self._model
+
+    def _record(self, phase: str, seconds: float) -> None:
+        with self._stats_lock:
+            stats = self._latency.setdefault(phase, {"count": 0, "total": 0.0, "max": 0.0})
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Vrátí latence jednotlivých fází: počet, celkový, průměrný a maximální čas v sekundách.
+        """
+        with self._stats_lock:
+            return {phase: {**stats, "avg": stats["total"] / stats["count"]}
+                    for phase, stats in self._latency.items()}
+
+    @staticmethod
+    def _audio_size(audio: str | BinaryIO) -> int:
+        if isinstance(audio, str):
+            return os.path.getsize(audio)
+        size = audio.seek(0, os.SEEK_END)
+        audio.seek(0)
+        return size
+
+    @staticmethod
+    def _read_bytes(audio: str | BinaryIO) -> bytes:
+        if isinstance(audio, str):
+            with open(audio, 'rb') as f:
+                return f.read()
+        audio.seek(0)
+        return audio.read()
+
+    def _delete(self, name: str) -> None:
+        start = time.perf_counter()
+        try:
+            _get_genai().delete_file(name)
+            logging.debug(f"Soubor {name} byl smazán z Gemini.")
+        except Exception as e:
+            logging.warning(f"Nepodařilo se smazat soubor {name} z Gemini: {e}")
+        finally:
+            self._record("delete", time.perf_counter() - start)
+
+    def _schedule_delete(self, name: str) -> None:
+        with self._stats_lock:
+            self._pending_deletes = [future for future in self._pending_deletes if not future.done()]
+            self._pending_deletes.append(self._deleter.submit(self._delete, name))
+
+    def _transcribe_once(self, audio: str | BinaryIO, mime_type: str | None, display_name: str | None):
+        uploaded = None
+        try:
+            genai = _get_genai()
+            size = self._audio_size(audio)
+            if 0 <= size <= self.inline_max_bytes and mime_type:
+                # Malé audio posíláme přímo v požadavku, odpadá nahrání i mazání souboru
+                logging.info(f"Posílám '{display_name}' ({size} B) k přepisu do Gemini přímo v požadavku...")
+                content = {"mime_type": mime_type, "data": self._read_bytes(audio)}
+            else:
+                logging.info(f"Nahrávám soubor '{display_name}' pro přepis do Gemini...")
+                start = time.perf_counter()
+                if not isinstance(audio, str):
+                    audio.seek(0)
+                uploaded = genai.upload_file(path=audio, mime_type=mime_type, display_name=display_name)
+                self._record("upload", time.perf_counter() - start)
+                logging.info(f"Soubor úspěšně nahrán: {uploaded.uri}")
+                content = uploaded
+
+            start = time.perf_counter()
+            response = self._get_model().generate_content([self.prompt, content])
+            self._record("generate", time.perf_counter() - start)
+            return response
+        finally:
+            # Nahraný soubor mažeme vždy, ale mimo kritickou cestu přepisu
+            if uploaded is not None:
+                self._schedule_delete(uploaded.name)
+
+    def transcribe(self, audio: str | BinaryIO, mime_type: str | None = None,
+                   display_name: str | None = None, priority: int = 0,
+                   audio_seconds: float | None = None) -> str | None:
+        """
+        Přepíše audio na text.
+
+        Požadavky na Gemini prochází limiterem (GEMINI_RPM/GEMINI_TPM). Při
+        překročení kvóty (429) se přepis po pauze zopakuje nejvýše
+        RATE_LIMIT_MAX_RETRIES-krát.
+
+        Args:
+            audio (str | BinaryIO): Cesta k audio souboru, nebo souborový objekt s daty (např. BytesIO).
+            mime_type (str | None): MIME typ audia. U souborového objektu je povinný,
+                u cesty se bez něj odvodí z přípony.
+            display_name (str | None): Název souboru zobrazený v Gemini. Výchozí je cesta k souboru.
+            priority (int): Priorita při čekání na limiter (vyšší = dřív, např. novější hlášení).
+            audio_seconds (float | None): Délka audia; Gemini ji nepotřebuje (viz TranscriptionBackend).
+
+        Returns:
+            str | None: Přepsaný text, nebo None v případě chyby.
+        """
+        if display_name is None and isinstance(audio, str):
+            display_name = audio
+        if mime_type is None and isinstance(audio, str):
+            mime_type = mimetypes.guess_type(audio)[0]
+
+        requests_limiter, tokens_limiter = get_limiter("gemini"), get_limiter("gemini_tokens")
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            requests_limiter.acquire(priority=priority)
+            tokens_limiter.acquire(cost=0, priority=priority)
+            try:
+                response = self._transcribe_once(audio, mime_type, display_name)
+            except Exception as e:
+                if _is_rate_limit_error(e) and attempt < RATE_LIMIT_MAX_RETRIES:
+                    requests_limiter.penalize(parse_retry_after(e))
+                    continue
+                logging.error(f"Došlo k chybě při komunikaci s Gemini API: {e}")
+                return None
+
+            requests_limiter.record_success()
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None and getattr(usage, "total_token_count", None):
+                tokens_limiter.consume(usage.total_token_count)
+            try:
+                text = response.text if response else None
+            except ValueError as e:
+                # response.text vyvolá ValueError, pokud odpověď neobsahuje žádnou část s textem
+                logging.error(f"Přepis selhal, odpověď z API neobsahuje text: {e}")
+                return None
+            if text:
+                logging.info("Přepis byl úspěšně získán.")
+                return text.strip()
+            logging.error("Přepis selhal, odpověď z API neobsahuje text.")
+            return None
         return None
 
-def transcribe_audio(mp3_path: str) -> str | None:
+    def flush(self, timeout: float | None = None) -> None:
+        """Počká na dokončení naplánovaných mazání souborů z Gemini."""
+        with self._stats_lock:
+            pending, self._pending_deletes = self._pending_deletes, []
+        wait(pending, timeout=timeout)
+
+    def close(self) -> None:
+        """Dokončí mazání nahraných souborů a ukončí vlákno pro mazání."""
+        self.flush()
+        self._deleter.shutdown(wait=True)
+        stats = self.latency_stats()
+        if stats:
+            logging.info("Latence přepisu: " + ", ".join(
+                f"{phase} {values['avg']:.2f} s (n={values['count']:.0f})" for phase, values in stats.items()))
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    """Rozpozná odmítnutí kvůli kvótě (google.api_core.exceptions.ResourceExhausted, HTTP 429)."""
+    return getattr(error, "code", None) == 429 or type(error).__name__ == "ResourceExhausted"
+
+
+def get_transcription_client() -> TranscriptionClient:
+    """
+    Vrátí sdíleného klienta pro přepis. Při ukončení procesu se dokončí mazání nahraných souborů.
+    """
+    global _client
+    with _genai_lock:
+        if _client is None:
+            _client = TranscriptionClient()
+            atexit.register(_client.close)
+        return _client
+
+
+def get_transcription_backend() -> TranscriptionBackend:
+    """
+    Vrátí sdílený backend přepisu podle TRANSCRIBE_BACKEND ("gemini", "local" nebo "auto").
+    """
+    global _backend
+    with _genai_lock:
+        backend = _backend
+    if backend is None:
+        if TRANSCRIBE_BACKEND == "local":
+            backend = LocalWhisperBackend()
+        elif TRANSCRIBE_BACKEND == "auto":
+            backend = TranscriptionRouter(LocalWhisperBackend(), get_transcription_client())
+        else:
+            return get_transcription_client()
+        with _genai_lock:
+            if _backend is None:
+                _backend = backend
+                atexit.register(backend.close)
+            backend = _backend
+    return backend
+
+
+def transcription_model_ids() -> list[str]:
     """
-    Nahraje MP3 soubor do Gemini a provede přepis na text.
+    Modely, jejichž přepisy platí pro aktuální TRANSCRIBE_BACKEND (pro hledání v cache přepisů).
+
+    U Gemini je to název modelu jako dosud, takže dřívější přepisy v cache
+    zůstávají platné; přepisy jiných backendů se ukládají pod vlastním klíčem.
+    V režimu "auto" platí přepis kteréhokoli z obou backendů.
+    """
+    return get_transcription_backend().model_ids()
+
+
+def transcribe_audio_with_model(audio: str | BinaryIO, mime_type: str | None = None,
+                                display_name: str | None = None, priority: int = 0,
+                                audio_seconds: float | None = None) -> tuple[str | None, str]:
+    """
+    Přepíše audio na text backendem podle TRANSCRIBE_BACKEND (výchozí je Gemini).
 
     Args:
-        mp3_path (str): Cesta k MP3 souboru.
+        audio (str | BinaryIO): Cesta k audio souboru, nebo souborový objekt s daty (např. BytesIO).
+        mime_type (str | None): MIME typ audia. U souborového objektu je povinný,
+            u cesty se bez něj odvodí z přípony.
+        display_name (str | None): Název souboru zobrazený v Gemini. Výchozí je cesta k souboru.
+        priority (int): Priorita při čekání na limiter Gemini (vyšší = dřív).
+        audio_seconds (float | None): Délka audia, pokud je známa (pro metriku real-time factor
+            a volbu backendu v režimu "auto").
 
     Returns:
-        str | None: Přepsaný text, nebo None v případě chyby.
+        tuple[str | None, str]: Přepsaný text (None v případě chyby) a model_id backendu,
+            který přepis vytvořil (pro klíč cache přepisů).
     """
-    logging.info(f"Nahrávám soubor '{mp3_path}' pro přepis do Gemini...")
-    try:
-        # Nahrání souboru do Files API Gemini
-        audio_file = genai.upload_file(path=mp3_path, display_name=mp3_path)
-        logging.info(f"Soubor úspěšně nahrán: {audio_file.uri}")
-
-        # Vytvoření instance modelu a odeslání požadavku na přepis
-        model = genai.GenerativeModel('models/gemini-2.5-flash')
-        prompt = "prosím, proved přesný přepis tohoto audio souboru, děkuji"
-        
-        response = model.generate_content([prompt, audio_file])
-        
-        # Uvolnění souboru z Gemini po zpracování
-        genai.delete_file(audio_file.name)
-        logging.info(f"Dočasný soubor '{audio_file.display_name}' byl smazán z Gemini.")
-
-        if response and response.text:
-            logging.info("Přepis byl úspěšně získán.")
-            return response.text.strip()
-        else:
-            logging.error("Přepis selhal, odpověď z API neobsahuje text.")
-            return None
+    with track_stage("transcribe") as observation:
+        try:
+            observation.bytes = TranscriptionClient._audio_size(audio)
+        except OSError:
+            # Chybějící soubor ohlásí až samotný přepis
+            pass
+        observation.audio_seconds = audio_seconds
+        transcript, model_id = get_transcription_backend().transcribe_with_model(
+            audio, mime_type=mime_type, display_name=display_name, priority=priority, audio_seconds=audio_seconds)
+        observation.ok = transcript is not None
+        return transcript, model_id
+
+
+def transcribe_audio(audio: str | BinaryIO, mime_type: str | None = None,
+                     display_name: str | None = None, priority: int = 0,
+                     audio_seconds: float | None = None) -> str | None:
+    """
+    Přepíše audio na text, viz transcribe_audio_with_model().
 
-    except Exception as e:
-        logging.error(f"Došlo k chybě při komunikaci s Gemini API: {e}")
-        return None 
\ No newline at end of file
+    Returns:
+        str | None: Přepsaný text, nebo None v případě chyby.
+    """
+    return transcribe_audio_with_model(audio, mime_type=mime_type, display_name=display_name, priority=priority,
+                                       audio_seconds=audio_seconds)[0]
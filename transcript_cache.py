@@ -0,0 +1,175 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict
+
+from config import (
+    TRANSCRIPT_CACHE_ENABLED,
+    TRANSCRIPT_CACHE_FILE,
+    TRANSCRIPT_CACHE_MAX_MB,
+    TRANSCRIPT_CACHE_MAX_AGE_DAYS,
+)
+
+_cache: "TranscriptCache | None" = None
+_cache_lock = threading.Lock()
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Spočítá SHA-256 hash obsahu souboru.
+
+    Args:
+        path (str): Cesta k souboru.
+        chunk_size (int): Velikost čtených bloků.
+
+    Returns:
+        str: Hash v hexadecimálním tvaru.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(audio_hash: str, model: str, prompt: str) -> str:
+    """
+    Sestaví klíč cache z hashe audia, modelu a promptu.
+
+    Změna modelu nebo promptu tak automaticky znamená nový přepis.
+    """
+    prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+    return f"{audio_hash}:{model}:{prompt_hash}"
+
+
+class TranscriptCache:
+    """
+    Perzistentní cache přepisů v SQLite, adresovaná obsahem audia.
+
+    Záznamy starší než `max_age_seconds` se mažou a při překročení `max_bytes`
+    se odstraňují nejdéle nepoužité záznamy. Celková velikost záznamů se
+    sečte jen při otevření cache a dál se průběžně upravuje, takže uložení
+    přepisu nemusí procházet celou tabulku. Počítadla hits/misses/evictions
+    se ukládají spolu s cache.
+    """
+
+    def __init__(self, path: str, max_bytes: int, max_age_seconds: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS transcripts (
+                    key TEXT PRIMARY KEY,
+                    transcript TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_transcripts_last_access ON transcripts(last_access);
+                CREATE INDEX IF NOT EXISTS idx_transcripts_created_at ON transcripts(created_at);
+                CREATE TABLE IF NOT EXISTS stats (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO stats (name, value) VALUES ('hits', 0), ('misses', 0), ('evictions', 0);
+            """)
+        # Celková velikost uložených přepisů v bajtech
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM transcripts").fetchone()[0]
+
+    def _bump(self, name: str, amount: int = 1) -> None:
+        self._conn.execute("UPDATE stats SET value = value + ? WHERE name = ?", (amount, name))
+
+    def get(self, key: str) -> str | None:
+        """
+        Vrátí uložený přepis, nebo None. Prošlé záznamy se nevrací.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT transcript FROM transcripts WHERE key = ? AND created_at >= ?",
+                (key, now - self.max_age_seconds),
+            ).fetchone()
+            if row is None:
+                self._bump("misses")
+                return None
+            self._conn.execute("UPDATE transcripts SET last_access = ? WHERE key = ?", (now, key))
+            self._bump("hits")
+            return row[0]
+
+    def put(self, key: str, transcript: str) -> None:
+        """
+        Uloží přepis a podle potřeby uvolní místo.
+        """
+        now = time.time()
+        size = len(transcript.encode('utf-8'))
+        with self._lock, self._conn:
+            previous = self._conn.execute("SELECT size FROM transcripts WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transcripts (key, transcript, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, transcript, size, now, now),
+            )
+            self._total += size - (previous[0] if previous else 0)
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        cutoff = now - self.max_age_seconds
+        # Prošlé záznamy najde index podle created_at, obvykle žádné nejsou
+        removed, removed_size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM transcripts WHERE created_at < ?", (cutoff,)
+        ).fetchone()
+        if removed:
+            self._conn.execute("DELETE FROM transcripts WHERE created_at < ?", (cutoff,))
+            self._total -= removed_size
+        if self._total > self.max_bytes:
+            # Mažeme nejdéle nepoužité záznamy, dokud se nevejdeme do limitu;
+            # index podle last_access se čte jen do potřebného počtu záznamů
+            victims = []
+            for key, size in self._conn.execute("SELECT key, size FROM transcripts ORDER BY last_access"):
+                if self._total <= self.max_bytes:
+                    break
+                victims.append((key,))
+                self._total -= size
+            self._conn.executemany("DELETE FROM transcripts WHERE key = ?", victims)
+            removed += len(victims)
+        if removed:
+            self._bump("evictions", removed)
+            logging.info(f"Z cache přepisů odstraněno {removed} záznamů.")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Vrátí počítadla hits/misses/evictions a aktuální počet a velikost záznamů.
+        """
+        with self._lock:
+            stats = dict(self._conn.execute("SELECT name, value FROM stats").fetchall())
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM transcripts").fetchone()
+        stats.update(entries=entries, bytes=size)
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def get_transcript_cache() -> TranscriptCache | None:
+    """
+    Vrátí sdílenou cache přepisů podle konfigurace, nebo None, pokud je vypnutá.
+    """
+    global _cache
+    if not TRANSCRIPT_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = TranscriptCache(
+                TRANSCRIPT_CACHE_FILE,
+                max_bytes=int(TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024),
+                max_age_seconds=TRANSCRIPT_CACHE_MAX_AGE_DAYS * 24 * 3600,
+            )
+        return _cache
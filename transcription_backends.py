@@ -0,0 +1,236 @@
+import importlib.util
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO
+
+from config import (
+    LOCAL_WHISPER_MODEL,
+    LOCAL_WHISPER_LANGUAGE,
+    LOCAL_WHISPER_COMPUTE_TYPE,
+    LOCAL_TRANSCRIBE_WORKERS,
+    LOCAL_TRANSCRIBE_BATCH_SIZE,
+    TRANSCRIBE_LOCAL_MAX_SECONDS,
+    TRANSCRIBE_LOCAL_MAX_QUEUE,
+)
+from metrics import TRANSCRIBE_BACKEND_RUNS
+
+# Model faster-whisper v pracovním procesu (viz _init_worker)
+_worker_model = None
+
+
+class TranscriptionBackend(ABC):
+    """
+    Rozhraní backendu pro přepis audia na text.
+
+    Attributes:
+        name (str): Krátký název backendu (v logu a metrikách).
+        model_id (str): Identifikace modelu, je součástí klíče cache přepisů.
+    """
+    name = ""
+    model_id = ""
+
+    def model_ids(self) -> list[str]:
+        """Modely, které mohou přepis vytvořit (pro hledání v cache přepisů)."""
+        return [self.model_id]
+
+    def transcribe_with_model(self, audio: str | BinaryIO, mime_type: str | None = None,
+                              display_name: str | None = None, priority: int = 0,
+                              audio_seconds: float | None = None) -> tuple[str | None, str]:
+        """
+        Jako transcribe(), navíc vrátí model_id modelu, který přepis skutečně vytvořil.
+        """
+        return self.transcribe(audio, mime_type=mime_type, display_name=display_name, priority=priority,
+                               audio_seconds=audio_seconds), self.model_id
+
+    @abstractmethod
+    def transcribe(self, audio: str | BinaryIO, mime_type: str | None = None, display_name: str | None = None,
+                   priority: int = 0, audio_seconds: float | None = None) -> str | None:
+        """
+        Přepíše audio (cesta nebo souborový objekt) na text, při chybě vrátí None.
+
+        `audio_seconds` (délka audia, je-li známa) slouží ke směrování mezi backendy.
+        """
+
+    def available(self) -> bool:
+        """Zda je backend v tomto prostředí použitelný."""
+        return True
+
+    def queue_depth(self) -> int:
+        """Počet přepisů, které backend právě zpracovává nebo na zpracování čekají."""
+        return 0
+
+    def close(self) -> None:
+        pass
+
+
+def _init_worker(model_name: str, compute_type: str, cpu_threads: int, batch_size: int) -> None:
+    """Načte model jednou pro celý pracovní proces."""
+    global _worker_model
+    from faster_whisper import WhisperModel
+
+    model = WhisperModel(model_name, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+    if batch_size > 1:
+        from faster_whisper import BatchedInferencePipeline
+        model = BatchedInferencePipeline(model=model)
+    _worker_model = model
+
+
+def _transcribe_in_worker(audio: str | bytes, language: str, batch_size: int) -> str:
+    options = {"batch_size": batch_size} if batch_size > 1 else {}
+    segments, _ = _worker_model.transcribe(audio if isinstance(audio, str) else io.BytesIO(audio),
+                                           language=language or None, **options)
+    # Segmenty jsou generátor, dekódování proběhne až při jejich čtení
+    return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    Lokální přepis modelem faster-whisper (CTranslate2) na CPU.
+
+    Přepis běží v ProcessPoolExecutor: každý z `workers` procesů drží vlastní
+    instanci modelu a jádra CPU se mezi procesy rozdělí. Úseky řeči jednoho
+    hlášení (podle VAD) se dekódují v dávkách po `batch_size`. Pool se
+    spouští až při prvním přepisu, faster-whisper se do hlavního procesu
+    vůbec nenačítá.
+    """
+    name = "local"
+
+    def __init__(self, model_name: str = LOCAL_WHISPER_MODEL, language: str = LOCAL_WHISPER_LANGUAGE,
+                 compute_type: str = LOCAL_WHISPER_COMPUTE_TYPE, workers: int = LOCAL_TRANSCRIBE_WORKERS,
+                 batch_size: int = LOCAL_TRANSCRIBE_BATCH_SIZE):
+        self.model_id = f"faster-whisper/{model_name}"
+        self.model_name = model_name
+        self.language = language
+        self.compute_type = compute_type
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self._pool: ProcessPoolExecutor | None = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return importlib.util.find_spec("faster_whisper") is not None
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                cpu_threads = max(1, (os.cpu_count() or 1) // self.workers)
+                logging.info(f"Spouštím lokální přepis {self.model_id} ({self.workers} procesů, "
+                             f"{cpu_threads} vláken, dávka {self.batch_size}).")
+                # "spawn": pracovní procesy nedědí vlákna a spojení hlavního procesu
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, self.compute_type, cpu_threads, self.batch_size),
+                )
+            return self._pool
+
+    def transcribe(self, audio: str | BinaryIO, mime_type: str | None = None, display_name: str | None = None,
+                   priority: int = 0, audio_seconds: float | None = None) -> str | None:
+        if not self.available():
+            logging.error("Lokální přepis vyžaduje balíček faster-whisper (pip install faster-whisper).")
+            return None
+        if not isinstance(audio, str):
+            audio.seek(0)
+            audio = audio.read()
+        logging.info(f"Přepisuji '{display_name}' lokálně ({self.model_id})...")
+        with self._lock:
+            self._pending += 1
+        try:
+            text = self._get_pool().submit(_transcribe_in_worker, audio, self.language, self.batch_size).result()
+        except BrokenProcessPool as e:
+            logging.error(f"Proces lokálního přepisu skončil chybou, pool se při dalším přepisu spustí znovu: {e}")
+            with self._lock:
+                self._pool = None
+            return None
+        except Exception as e:
+            logging.error(f"Lokální přepis selhal: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._pending -= 1
+        if not text:
+            logging.error("Lokální přepis nevrátil žádný text.")
+            return None
+        logging.info("Přepis byl úspěšně získán.")
+        return text
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+class TranscriptionRouter(TranscriptionBackend):
+    """
+    Volí backend přepisu pro každé hlášení zvlášť (TRANSCRIBE_BACKEND=auto).
+
+    Lokálně se přepisuje audio známé délky nejvýše `max_local_seconds`, pokud
+    lokální backend nezpracovává už `max_local_queue` hlášení; dlouhé audio
+    (na CPU by trvalo nepoměrně déle) a přetečení fronty jdou do vzdáleného
+    backendu. Když lokální přepis selže, zkusí se ještě vzdálený. Přepis se
+    v cache ukládá pod model_id backendu, který ho skutečně vytvořil.
+    """
+    name = "auto"
+
+    def __init__(self, local: TranscriptionBackend, remote: TranscriptionBackend,
+                 max_local_seconds: float = TRANSCRIBE_LOCAL_MAX_SECONDS,
+                 max_local_queue: int = TRANSCRIBE_LOCAL_MAX_QUEUE):
+        self.local = local
+        self.remote = remote
+        # Jen pro výpisy, klíče cache přepisů se tvoří podle použitého backendu
+        self.model_id = f"{local.model_id}|{remote.model_id}"
+        self.max_local_seconds = max_local_seconds
+        self.max_local_queue = max_local_queue
+
+    def choose(self, audio_seconds: float | None) -> TranscriptionBackend:
+        """Vybere backend podle délky audia a fronty lokálního přepisu."""
+        if audio_seconds is None or audio_seconds > self.max_local_seconds or not self.local.available():
+            return self.remote
+        if self.local.queue_depth() >= self.max_local_queue:
+            return self.remote
+        return self.local
+
+    def available(self) -> bool:
+        return self.local.available() or self.remote.available()
+
+    def queue_depth(self) -> int:
+        return self.local.queue_depth() + self.remote.queue_depth()
+
+    def model_ids(self) -> list[str]:
+        return self.remote.model_ids() + self.local.model_ids()
+
+    def transcribe_with_model(self, audio: str | BinaryIO, mime_type: str | None = None,
+                              display_name: str | None = None, priority: int = 0,
+                              audio_seconds: float | None = None) -> tuple[str | None, str]:
+        backend = self.choose(audio_seconds)
+        TRANSCRIBE_BACKEND_RUNS.inc(backend=backend.name)
+        text = backend.transcribe(audio, mime_type=mime_type, display_name=display_name, priority=priority,
+                                  audio_seconds=audio_seconds)
+        if text is None and backend is self.local:
+            logging.warning(f"Lokální přepis '{display_name}' selhal, přepisuji přes {self.remote.name}.")
+            TRANSCRIBE_BACKEND_RUNS.inc(backend=self.remote.name)
+            backend = self.remote
+            text = backend.transcribe(audio, mime_type=mime_type, display_name=display_name,
+                                      priority=priority, audio_seconds=audio_seconds)
+        return text, backend.model_id
+
+    def transcribe(self, audio: str | BinaryIO, mime_type: str | None = None, display_name: str | None = None,
+                   priority: int = 0, audio_seconds: float | None = None) -> str | None:
+        return self.transcribe_with_model(audio, mime_type=mime_type, display_name=display_name,
+                                          priority=priority, audio_seconds=audio_seconds)[0]
+
+    def close(self) -> None:
+        # Vzdálený backend je sdílený klient Gemini, ten se zavírá sám (viz transcriber)
+        self.local.close()